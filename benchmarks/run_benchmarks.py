@@ -0,0 +1,214 @@
+"""
+Times discovery, extraction and each output format, and appends the results
+to a JSON Lines file so runs can be compared across changes.
+
+Usage:
+    python -m benchmarks.run_benchmarks --visits 100000 --profiles 4
+    python -m benchmarks.run_benchmarks --root /path/to/evidence --formats csv json
+    python -m benchmarks.run_benchmarks --startup-only
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.synthetic_profiles import generate, add_scale_arguments
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts, ARTIFACT_HEADERS
+from modules.disk_cache import iter_cache_entries
+from modules.records import RecordTable
+from modules.writers import OUTPUT_FORMATS
+from cli import output_data, output_path
+
+DEFAULT_RESULTS_FILE = "benchmark_results.jsonl"
+DEFAULT_STARTUP_RUNS = 5
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(stage, func, track_memory, rows=None, nbytes=None):
+    """
+    Runs func and returns (result, record) where record holds the wall time and,
+    when track_memory is set, the peak traced Python allocation of the stage.
+    func may return a row count to report throughput.
+    """
+    if track_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    record = {"stage": stage, "seconds": round(seconds, 4)}
+    if track_memory:
+        record["peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+
+    count = rows if rows is not None else (result if isinstance(result, int) else None)
+    if count is not None:
+        record["rows"] = count
+        record["rows_per_sec"] = round(count / seconds) if seconds else None
+    if nbytes is not None:
+        record["bytes"] = nbytes
+        record["mb_per_sec"] = round(nbytes / (1024 * 1024) / seconds, 2) if seconds else None
+    return result, record
+
+
+def measure_startup(work_folder, runs=DEFAULT_STARTUP_RUNS):
+    """
+    Times fresh interpreter processes: importing the CLI, and a full CSV run over
+    an empty root, which is all fixed cost. Records the median and best of runs.
+    """
+    root = os.path.join(work_folder, "startup-root")
+    output_folder = os.path.join(work_folder, "startup-output")
+    os.makedirs(root, exist_ok=True)
+    os.makedirs(output_folder, exist_ok=True)
+    commands = {
+        "startup_import": [sys.executable, "-c", "import cli"],
+        "startup_csv": [sys.executable, "cli.py", "--root", root, "--output", output_folder, "--format", "csv"],
+    }
+
+    records = []
+    for stage, command in commands.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=REPO_ROOT, check=True, stdout=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        records.append({"stage": stage, "seconds": round(statistics.median(times), 4), "best_seconds": round(min(times), 4), "runs": runs})
+    return records
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(root, output_folder, formats, workers=1, track_memory=True):
+    records = []
+
+    profile_files, record = measure("discovery", lambda: find_browser_profile_files(root), track_memory)
+    record["files"] = sum(len(files) for files in profile_files.values())
+    records.append(record)
+
+    files = database_files(profile_files)
+    nbytes = sum(os.path.getsize(path) for path in files)
+
+    def consume():
+        counts = dict.fromkeys(ARTIFACT_HEADERS, 0)
+        for dataset, batch in iter_artifacts("Chrome", files, "default_user", workers=workers):
+            counts[dataset] += len(batch)
+        return sum(counts.values()), counts
+
+    (rows, counts), record = measure("extract", consume, track_memory, nbytes=nbytes)
+    record["rows"] = rows
+    record["rows_per_sec"] = round(rows / record["seconds"]) if record["seconds"] else None
+    record["artifacts"] = counts
+    records.append(record)
+
+    cache_dirs = profile_files.get("cache", [])
+    if cache_dirs:
+        def consume_cache():
+            return sum(len(batch) for batch in iter_cache_entries(cache_dirs, "Chrome", "default_user", workers=workers))
+
+        _, record = measure("extract_cache", consume_cache, track_memory)
+        record["cache_dirs"] = len(cache_dirs)
+        records.append(record)
+
+    # Everything extracted is held in memory once as row lists and once as
+    # RecordTables, so the peak_mb of the two stages compares the representations
+    def retain(container):
+        extracted = {dataset: container(headers) for dataset, headers in ARTIFACT_HEADERS.items()}
+        for dataset, batch in iter_artifacts("Chrome", files, "default_user", workers=workers):
+            extracted[dataset].extend(batch)
+        return extracted
+
+    _, record = measure("retain_lists", lambda: retain(lambda headers: []), track_memory, rows=rows)
+    records.append(record)
+    # Kept for the output stages, so writers are timed on their own
+    extracted, record = measure("retain_records", lambda: retain(RecordTable), track_memory, rows=rows)
+    records.append(record)
+
+    for output_format in formats:
+        for dataset, headers in ARTIFACT_HEADERS.items():
+            rows = extracted[dataset]
+            output_file = output_path(output_folder, dataset, output_format)
+            try:
+                _, record = measure(
+                    f"output_{output_format}_{dataset}",
+                    lambda: output_data(rows, headers, output_file, output_format, dataset),
+                    track_memory, rows=len(rows)
+                )
+            except ImportError as e:
+                records.append({"stage": f"output_{output_format}_{dataset}", "skipped": str(e)})
+                continue
+            record["bytes"] = os.path.getsize(output_file)
+            records.append(record)
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser Forensics Toolkit benchmarks")
+    parser.add_argument("--root", help="Existing profile folder to benchmark. Synthetic profiles are generated when omitted.")
+    add_scale_arguments(parser)
+    parser.add_argument("--formats", nargs="+", choices=OUTPUT_FORMATS, default=["csv", "json", "txt"],
+                        help="Output formats to time. Default is csv json txt.")
+    parser.add_argument("--workers", type=int, default=1, help="Extraction workers. Default is 1.")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip tracemalloc peak memory tracking, which slows every stage down.")
+    parser.add_argument("--startup-runs", type=int, default=DEFAULT_STARTUP_RUNS,
+                        help=f"Fresh processes timed for the startup stages. Default is {DEFAULT_STARTUP_RUNS}; 0 skips them.")
+    parser.add_argument("--startup-only", action="store_true",
+                        help="Only time CLI startup, without generating or extracting profiles.")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE,
+                        help=f"JSON Lines file the results are appended to. Default is {DEFAULT_RESULTS_FILE}.")
+    args = parser.parse_args()
+
+    work_folder = tempfile.mkdtemp(prefix="bft-bench-")
+    try:
+        records = measure_startup(work_folder, args.startup_runs) if args.startup_runs > 0 else []
+        root = args.root
+        scale = None
+        if root is None and not args.startup_only:
+            root = os.path.join(work_folder, "profiles")
+            scale = {
+                "visits": args.visits, "profiles": args.profiles, "firefox_profiles": args.firefox_profiles,
+                "users": args.users, "cookies": args.cookies, "downloads": args.downloads, "cache_files": args.cache_files,
+            }
+            print(f"Generating synthetic profiles in {root}...")
+            generate(root, **scale)
+
+        if not args.startup_only:
+            output_folder = os.path.join(work_folder, "output")
+            os.makedirs(output_folder)
+            records += run(root, output_folder, args.formats, args.workers, not args.no_memory)
+    finally:
+        shutil.rmtree(work_folder, ignore_errors=True)
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "root": args.root,
+        "scale": scale,
+        "workers": args.workers,
+        "stages": records,
+    }
+    with open(args.results, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    for record in records:
+        details = ", ".join(f"{key}={value}" for key, value in record.items() if key != "stage")
+        print(f"{record['stage']:<28} {details}")
+    print(f"Results appended to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Generates synthetic Chromium and Firefox profiles for benchmarking.
+
+The databases only contain the tables and columns queried by modules/parsing.py,
+filled with deterministic pseudo-random data so runs at the same scale are
+comparable.
+
+Usage:
+    python -m benchmarks.synthetic_profiles --root /tmp/bench --visits 100000 --profiles 4
+"""
+import argparse
+import os
+import random
+import sqlite3
+import struct
+from urllib.parse import urlsplit
+
+from modules.disk_cache import SIMPLE_HEADER, SIMPLE_EOF, SIMPLE_INITIAL_MAGIC, SIMPLE_FINAL_MAGIC
+
+# 2023-11-14 22:13:20 UTC in WebKit and Firefox (PRTime) microseconds
+WEBKIT_BASE = 13342630400000000
+FIREFOX_BASE = 1700000000000000
+
+# Visits per URL, roughly matching real profiles
+VISITS_PER_URL = 4
+
+HOSTS = ["example.com", "news.example.org", "mail.example.net", "video.example.com", "docs.example.io",
+         "shop.example.co.uk", "search.example.com", "social.example.app", "cdn.example.net", "intranet.corp.local"]
+
+
+def _open(db_file):
+    if os.path.exists(db_file):
+        os.remove(db_file)
+    conn = sqlite3.connect(db_file)
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    return conn
+
+
+def _url(rng, i):
+    return f"https://{rng.choice(HOSTS)}/page/{i}?ref={rng.randrange(1000)}"
+
+
+def create_chromium_history(db_file, visits, downloads, seed=0):
+    rng = random.Random(seed)
+    urls = max(1, visits // VISITS_PER_URL)
+    conn = _open(db_file)
+    conn.executescript('''
+    CREATE TABLE urls (id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR, visit_count INTEGER DEFAULT 0 NOT NULL,
+                       typed_count INTEGER DEFAULT 0 NOT NULL, last_visit_time INTEGER NOT NULL, hidden INTEGER DEFAULT 0 NOT NULL);
+    CREATE TABLE visits (id INTEGER PRIMARY KEY, url INTEGER NOT NULL, visit_time INTEGER NOT NULL, from_visit INTEGER,
+                         transition INTEGER DEFAULT 0 NOT NULL, segment_id INTEGER, visit_duration INTEGER DEFAULT 0 NOT NULL);
+    CREATE INDEX visits_url_index ON visits (url);
+    CREATE TABLE downloads (id INTEGER PRIMARY KEY, guid VARCHAR NOT NULL, current_path LONGVARCHAR NOT NULL,
+                            target_path LONGVARCHAR NOT NULL, start_time INTEGER NOT NULL, received_bytes INTEGER NOT NULL,
+                            total_bytes INTEGER NOT NULL, state INTEGER NOT NULL, danger_type INTEGER NOT NULL,
+                            interrupt_reason INTEGER NOT NULL, end_time INTEGER NOT NULL, opened INTEGER NOT NULL);
+    CREATE TABLE keyword_search_terms (keyword_id INTEGER NOT NULL, url_id INTEGER NOT NULL, term LONGVARCHAR NOT NULL,
+                                       normalized_term LONGVARCHAR NOT NULL);
+    ''')
+    conn.executemany(
+        "INSERT INTO urls (id, url, title, visit_count, last_visit_time) VALUES (?, ?, ?, ?, ?)",
+        ((i, _url(rng, i), f"Synthetic page {i}", VISITS_PER_URL, WEBKIT_BASE + i * 1000000) for i in range(1, urls + 1))
+    )
+    conn.executemany(
+        "INSERT INTO visits (id, url, visit_time, from_visit, transition, visit_duration) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, rng.randint(1, urls), WEBKIT_BASE + i * 250000, 0, 0x30000000 | rng.randrange(11), rng.randrange(120000000))
+         for i in range(1, visits + 1))
+    )
+    conn.executemany(
+        "INSERT INTO downloads VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        ((i, f"guid-{i}", f"C:\\Users\\user\\Downloads\\file{i}.bin", f"C:\\Users\\user\\Downloads\\file{i}.bin",
+          WEBKIT_BASE + i * 5000000, 1024 * i, 1024 * i, 1, rng.randrange(8), rng.choice([0, 0, 0, 11, 40]),
+          0 if i % 10 == 0 else WEBKIT_BASE + i * 5000000 + 2000000, rng.randrange(2))
+         for i in range(1, downloads + 1))
+    )
+    conn.executemany(
+        "INSERT INTO keyword_search_terms VALUES (?, ?, ?, ?)",
+        ((2, rng.randint(1, urls), f"Query {i}", f"query {i}") for i in range(1, max(1, visits // 50) + 1))
+    )
+    conn.commit()
+    conn.close()
+
+
+def create_chromium_cookies(db_file, cookies, seed=0):
+    rng = random.Random(seed)
+    conn = _open(db_file)
+    conn.executescript('''
+    CREATE TABLE cookies (creation_utc INTEGER NOT NULL, host_key TEXT NOT NULL, top_frame_site_key TEXT NOT NULL DEFAULT '',
+                          name TEXT NOT NULL, value TEXT NOT NULL, encrypted_value BLOB NOT NULL DEFAULT '', path TEXT NOT NULL,
+                          expires_utc INTEGER NOT NULL, is_secure INTEGER NOT NULL, is_httponly INTEGER NOT NULL,
+                          last_access_utc INTEGER NOT NULL, has_expires INTEGER NOT NULL, is_persistent INTEGER NOT NULL);
+    ''')
+    conn.executemany(
+        "INSERT INTO cookies (creation_utc, host_key, name, value, path, expires_utc, is_secure, is_httponly, last_access_utc, has_expires, is_persistent) "
+        "VALUES (?, ?, ?, ?, '/', ?, ?, ?, ?, 1, 1)",
+        ((WEBKIT_BASE + i, "." + rng.choice(HOSTS), f"cookie{i}", f"{rng.getrandbits(64):016x}",
+          0 if i % 7 == 0 else WEBKIT_BASE + 31536000000000 + i, rng.randrange(2), rng.randrange(2), WEBKIT_BASE + i * 1000)
+         for i in range(cookies))
+    )
+    conn.commit()
+    conn.close()
+
+
+def _rev_host(url):
+    # Firefox stores the host reversed with a trailing dot: example.com -> moc.elpmaxe.
+    return (urlsplit(url).hostname or "")[::-1] + "."
+
+
+def create_firefox_places(db_file, visits, downloads, seed=0):
+    rng = random.Random(seed)
+    places = max(1, visits // VISITS_PER_URL)
+    conn = _open(db_file)
+    conn.executescript('''
+    CREATE TABLE moz_places (id INTEGER PRIMARY KEY, url LONGVARCHAR, title LONGVARCHAR, rev_host LONGVARCHAR,
+                             visit_count INTEGER DEFAULT 0, hidden INTEGER DEFAULT 0 NOT NULL, last_visit_date INTEGER);
+    CREATE TABLE moz_historyvisits (id INTEGER PRIMARY KEY, from_visit INTEGER, place_id INTEGER, visit_date INTEGER,
+                                    visit_type INTEGER, session INTEGER);
+    CREATE TABLE moz_anno_attributes (id INTEGER PRIMARY KEY, name VARCHAR(32) UNIQUE NOT NULL);
+    CREATE TABLE moz_annos (id INTEGER PRIMARY KEY, place_id INTEGER NOT NULL, anno_attribute_id INTEGER, content LONGVARCHAR,
+                            flags INTEGER DEFAULT 0, expiration INTEGER DEFAULT 0, type INTEGER DEFAULT 0,
+                            dateAdded INTEGER DEFAULT 0, lastModified INTEGER DEFAULT 0);
+    INSERT INTO moz_anno_attributes (id, name) VALUES (1, 'downloads/destinationFileURI'), (2, 'downloads/metaData');
+    ''')
+    urls = [_url(rng, i) for i in range(1, places + 1)]
+    conn.executemany(
+        "INSERT INTO moz_places (id, url, title, rev_host, visit_count, last_visit_date) VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, url, f"Synthetic page {i}", _rev_host(url), VISITS_PER_URL, FIREFOX_BASE + i * 1000000) for i, url in enumerate(urls, 1))
+    )
+    conn.executemany(
+        "INSERT INTO moz_historyvisits (id, from_visit, place_id, visit_date, visit_type) VALUES (?, 0, ?, ?, ?)",
+        ((i, rng.randint(1, places), FIREFOX_BASE + i * 250000, rng.randint(1, 9)) for i in range(1, visits + 1))
+    )
+    for i in range(1, min(downloads, places) + 1):
+        conn.execute(
+            "INSERT INTO moz_annos (place_id, anno_attribute_id, content, dateAdded, lastModified) VALUES (?, 1, ?, ?, ?)",
+            (i, f"file:///home/user/Downloads/file{i}.bin", FIREFOX_BASE + i * 5000000, FIREFOX_BASE + i * 5000000)
+        )
+        conn.execute(
+            "INSERT INTO moz_annos (place_id, anno_attribute_id, content, dateAdded, lastModified) VALUES (?, 2, ?, ?, ?)",
+            (i, f'{{"state":1,"endTime":{(FIREFOX_BASE + i * 5000000) // 1000 + 2000},"fileSize":{1024 * i}}}',
+             FIREFOX_BASE + i * 5000000, FIREFOX_BASE + i * 5000000)
+        )
+    conn.commit()
+    conn.close()
+
+
+# Magic number of the simple cache "index" file
+SIMPLE_INDEX_MAGIC = 0x656e74657220796f
+
+CONTENT_TYPES = ["text/html", "text/css", "application/javascript", "image/png", "image/webp", "application/json"]
+
+
+def _pickle_string(value):
+    return struct.pack("<i", len(value)) + value + b"\0" * (-len(value) % 4)
+
+
+def simple_cache_entry(key, raw_headers, body, request_time, response_time):
+    """
+    Returns the bytes of a simple cache entry file holding an HttpResponseInfo
+    (format version 3) in stream 0 and body in stream 1.
+    """
+    payload = struct.pack("<Iqq", 3, request_time, response_time) + _pickle_string(raw_headers)
+    stream0 = struct.pack("<I", len(payload)) + payload
+    return b"".join([
+        SIMPLE_HEADER.pack(SIMPLE_INITIAL_MAGIC, 5, len(key), 0), key, body,
+        SIMPLE_EOF.pack(SIMPLE_FINAL_MAGIC, 0, 0, 0), stream0,
+        SIMPLE_EOF.pack(SIMPLE_FINAL_MAGIC, 0, 0, len(stream0)),
+    ])
+
+
+def create_simple_cache(folder, files, seed=0):
+    """
+    Fills Cache/Cache_Data with simple cache entries with small bodies, so large
+    cache folders can be benchmarked for both discovery and cache parsing.
+    """
+    rng = random.Random(seed)
+    cache_folder = os.path.join(folder, "Cache", "Cache_Data")
+    os.makedirs(cache_folder, exist_ok=True)
+    with open(os.path.join(cache_folder, "index"), "wb") as f:
+        f.write(struct.pack("<Q", SIMPLE_INDEX_MAGIC))
+    for i in range(files):
+        url = _url(rng, i)
+        key = f"1/0/_dk_https://{HOSTS[0]} https://{HOSTS[0]} {url}".encode("utf-8")
+        request_time = WEBKIT_BASE + rng.randrange(86400 * 30) * 1000000
+        raw_headers = f"HTTP/1.1 200\0content-type: {rng.choice(CONTENT_TYPES)}\0cache-control: max-age=3600\0\0".encode("latin-1")
+        body = bytes(rng.randrange(256) for _ in range(rng.randrange(64, 512)))
+        with open(os.path.join(cache_folder, f"{i:016x}_0"), "wb") as f:
+            f.write(simple_cache_entry(key, raw_headers, body, request_time, request_time + 150000))
+
+
+def generate(root, visits=10000, profiles=1, firefox_profiles=1, users=1, cookies=None, downloads=None, cache_files=0):
+    """
+    Creates users * profiles Chromium profiles and users * firefox_profiles Firefox
+    profiles under root, each with the given number of visits. Returns the list of
+    database files created.
+    """
+    cookies = visits // 2 if cookies is None else cookies
+    downloads = max(1, visits // 100) if downloads is None else downloads
+    created = []
+    seed = 0
+    for user in range(users):
+        user_folder = os.path.join(root, "Users", f"user{user}", "AppData")
+        for profile in range(profiles):
+            name = "Default" if profile == 0 else f"Profile {profile}"
+            folder = os.path.join(user_folder, "Local", "Google", "Chrome", "User Data", name)
+            os.makedirs(folder, exist_ok=True)
+            create_chromium_history(os.path.join(folder, "History"), visits, downloads, seed)
+            create_chromium_cookies(os.path.join(folder, "Cookies"), cookies, seed)
+            create_simple_cache(folder, cache_files, seed)
+            created += [os.path.join(folder, "History"), os.path.join(folder, "Cookies")]
+            seed += 1
+        for profile in range(firefox_profiles):
+            folder = os.path.join(user_folder, "Roaming", "Mozilla", "Firefox", "Profiles", f"bench{profile}.default-release")
+            os.makedirs(folder, exist_ok=True)
+            create_firefox_places(os.path.join(folder, "places.sqlite"), visits, downloads, seed)
+            created.append(os.path.join(folder, "places.sqlite"))
+            seed += 1
+    return created
+
+
+def add_scale_arguments(parser):
+    parser.add_argument("--visits", type=int, default=10000, help="Visits per profile (10k to 10M). Default is 10000.")
+    parser.add_argument("--profiles", type=int, default=1, help="Chromium profiles per user. Default is 1.")
+    parser.add_argument("--firefox-profiles", type=int, default=1, help="Firefox profiles per user. Default is 1.")
+    parser.add_argument("--users", type=int, default=1, help="Number of user folders. Default is 1.")
+    parser.add_argument("--cookies", type=int, help="Cookies per Chromium profile. Default is half the visits.")
+    parser.add_argument("--downloads", type=int, help="Downloads per profile. Default is 1%% of the visits.")
+    parser.add_argument("--cache-files", type=int, default=0, help="Simple cache entries placed in each Chromium Cache folder. Default is 0.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic browser profiles for benchmarking.")
+    parser.add_argument("--root", required=True, help="Folder to create the profiles in.")
+    add_scale_arguments(parser)
+    args = parser.parse_args()
+
+    created = generate(args.root, args.visits, args.profiles, args.firefox_profiles, args.users,
+                       args.cookies, args.downloads, args.cache_files)
+    print(f"Created {len(created)} databases under {args.root}")
+
+
+if __name__ == "__main__":
+    main()
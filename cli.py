@@ -1,9 +1,25 @@
 import argparse
-import os
-from modules.parsing import find_browser_profile_files, extract_history, extract_downloads, extract_cookies
-from modules.utils import write_to_csv
 import json
-from pandas import DataFrame
+import os
+from contextlib import ExitStack, nullcontext
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts, ARTIFACT_HEADERS, TRANSITION_TYPES, DANGER_TYPE_MAP
+from modules.batch import read_manifest, run_batch
+from modules.casedb import CASE_DB_NAME
+from modules.database import SNAPSHOT_MODES
+from modules.dedup import Deduplicator, HostSummary, DEDUP_HEADERS, HOST_SUMMARY_HEADERS, DOMAIN_SUMMARY_HEADERS
+from modules.discovery import browser_for_path
+from modules.disk_cache import iter_cache_entries, CACHE_HEADERS
+from modules.filters import ExtractionFilter, parse_time
+from modules.incremental import ExtractionCache
+from modules.metrics import RunMetrics, file_size
+from modules.scheduler import POOL_TYPES
+from modules.search import filter_rows
+from modules.timeline import TimelineBuilder, TIMELINE_HEADERS
+from modules.writers import OUTPUT_FORMATS, open_writer
+
+
+# Every dataset written per root: the database artifacts, then the disk cache
+OUTPUT_HEADERS = {**ARTIFACT_HEADERS, "cache": CACHE_HEADERS}
 
 
 def detect_browser(profile_files):
@@ -11,39 +27,156 @@ def detect_browser(profile_files):
     Detect the browser type based on profile file paths or folder structure.
     """
     for path in profile_files.get("history", []) + profile_files.get("cookies", []):
-        lower_path = path.lower()
-        if "microsoft" in lower_path and "edge" in lower_path:
-            return "Edge"
-        elif "google" in lower_path and "chrome" in lower_path:
-            return "Chrome"
-        elif "mozilla" in lower_path and "firefox" in lower_path:
-            return "Firefox"
-        elif "opera" in lower_path:
-            return "Opera"
-        elif "bravesoftware" in lower_path and "brave" in lower_path:
-            return "Brave"
+        browser = browser_for_path(path)
+        if browser != "Unknown":
+            return browser
     return "Unknown"
 
 
-def output_data(data, headers, output_file, output_format):
+def detect_browsers(profile_files):
+    """
+    Returns every browser found among the profile files, in discovery order.
+    """
+    browsers = []
+    for path in profile_files.get("history", []) + profile_files.get("cookies", []):
+        browser = browser_for_path(path)
+        if browser not in browsers:
+            browsers.append(browser)
+    return browsers
+
+
+def output_path(output_folder, dataset, output_format):
+    """
+    Returns the output file for a dataset. SQLite output collects every dataset in
+    one case database.
+    """
+    if output_format == "sqlite":
+        return os.path.join(output_folder, CASE_DB_NAME)
+    return os.path.join(output_folder, f"{dataset}.{output_format}")
+
+
+def output_data(data, headers, output_file, output_format, dataset=None, metrics=None):
     """
     Outputs data to the specified file format.
+
+    data can be any iterable of rows, including a generator; rows are written as
+    they are produced. With a RunMetrics the write is timed as the
+    "write_<dataset>" stage.
     """
-    if output_format == "csv":
-        write_to_csv(data, headers, output_file)
-    elif output_format == "json":
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump([dict(zip(headers, row)) for row in data], f, ensure_ascii=False, indent=4)
-    elif output_format == "html":
-        df = DataFrame(data, columns=headers)
-        df.to_html(output_file, index=False)
-    elif output_format == "txt":
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write("\t".join(headers) + "\n")
-            for row in data:
-                f.write("\t".join(map(str, row)) + "\n")
-    else:
-        raise ValueError("Unsupported output format. Choose from 'csv', 'json', 'html', or 'txt'.")
+    rows = len(data) if hasattr(data, "__len__") else None
+    with metrics.stage(f"write_{dataset or 'data'}", rows=rows) if metrics is not None else nullcontext():
+        with open_writer(output_format, headers, output_file, dataset) as writer:
+            writer.write_rows(data)
+
+
+def write_metrics(metrics, metrics_file, profile_file, verbose=False):
+    """
+    Writes the run report and the raw cProfile stats, whichever were requested.
+    """
+    if metrics_file:
+        metrics.write(metrics_file)
+        if verbose:
+            print(f"Metrics report saved to {metrics_file}")
+    if profile_file:
+        metrics.dump_profile(profile_file)
+        if verbose:
+            print(f"Profile stats saved to {profile_file}")
+
+
+def process_root(root_folder, output_folder, output_format="csv", search=None, workers=1, pool="process", snapshot="auto",
+                 index_file=None, rebuild_index=False, cache=None, metrics=None, verbose=False, timeline=False, filters=None,
+                 dedup=False, summary=False):
+    """
+    Discovers and extracts every artifact under one root and writes one output per
+    dataset to output_folder. Browser and user profile are attributed per database
+    from its path. With timeline, the events of every dataset are also merged into
+    a "timeline" output in time order. An ExtractionFilter is applied while
+    extracting. With dedup, rows describing the same record are written once, with
+    Occurrences and Sources columns; with summary, "hosts" and "domains" outputs
+    count visits, cookies and cache entries per host and domain. Returns the number
+    of rows written for each dataset.
+    """
+    metrics = metrics if metrics is not None else RunMetrics()
+
+    # profile files
+    with metrics.stage("discovery") as stage:
+        profile_files = find_browser_profile_files(root_folder, index_file, rebuild_index)
+        stage["files"] = sum(len(files) for files in profile_files.values())
+
+    if verbose:
+        print(f"Detected Browsers: {', '.join(detect_browsers(profile_files)) or 'None'}")
+
+    # History, downloads, searches and cookies are extracted in one pass per
+    # database; each batch goes to the writer of its artifact. Disk cache entries
+    # follow, read from the cache folders.
+    outputs = {dataset: output_path(output_folder, dataset, output_format) for dataset in OUTPUT_HEADERS}
+    written = dict.fromkeys(OUTPUT_HEADERS, 0)
+    with ExitStack() as stack:
+        writers = {
+            dataset: stack.enter_context(open_writer(output_format, headers + DEDUP_HEADERS if dedup else headers, outputs[dataset], dataset))
+            for dataset, headers in OUTPUT_HEADERS.items()
+        }
+        # Collects events and counts from the same batches as the writers
+        builder = stack.enter_context(TimelineBuilder()) if timeline else None
+        host_summary = HostSummary() if summary else None
+        # With dedup, batches are held back until every source has been read
+        deduplicators = {dataset: stack.enter_context(Deduplicator(dataset)) for dataset in OUTPUT_HEADERS} if dedup else None
+
+        def write_rows(dataset, rows):
+            with metrics.stage(f"write_{dataset}", rows=len(rows)):
+                writers[dataset].write_rows(rows)
+            written[dataset] += len(rows)
+            if builder is not None:
+                with metrics.stage("timeline", rows=len(rows)):
+                    builder.add_rows(dataset, rows)
+            if host_summary is not None:
+                with metrics.stage("summary", rows=len(rows)):
+                    host_summary.add_rows(dataset, rows)
+
+        def write_batches(stage, batches, nbytes=None):
+            for dataset, rows in metrics.timed_batches(stage, batches, nbytes):
+                if search:
+                    # Filtered eagerly, one batch at a time, so the time is not
+                    # charged to the writer
+                    with metrics.stage("filter", rows=len(rows)):
+                        rows = list(filter_rows(rows, dataset, OUTPUT_HEADERS[dataset], search))
+                if deduplicators is not None:
+                    with metrics.stage("dedup", rows=len(rows)):
+                        deduplicators[dataset].add_rows(rows)
+                else:
+                    write_rows(dataset, rows)
+
+        files = database_files(profile_files)
+        write_batches(
+            "extract",
+            iter_artifacts(None, files, None, workers=workers, pool=pool, cache=cache, snapshot=snapshot, metrics=metrics, filters=filters),
+            sum(file_size(path) or 0 for path in files)
+        )
+        cache_rows = iter_cache_entries(profile_files.get("cache", []), None, None, workers=workers, pool=pool, filters=filters)
+        write_batches("extract_cache", (("cache", rows) for rows in cache_rows))
+
+        if deduplicators is not None:
+            unique_batches = ((dataset, rows) for dataset, deduplicator in deduplicators.items() for rows in deduplicator.batches())
+            for dataset, rows in metrics.timed_batches("dedup_merge", unique_batches):
+                write_rows(dataset, rows)
+
+        if host_summary is not None:
+            for dataset, headers, rows in (("hosts", HOST_SUMMARY_HEADERS, host_summary.host_rows()), ("domains", DOMAIN_SUMMARY_HEADERS, host_summary.domain_rows())):
+                outputs[dataset] = output_path(output_folder, dataset, output_format)
+                output_data(rows, headers, outputs[dataset], output_format, dataset, metrics)
+                written[dataset] = len(rows)
+
+        if builder is not None:
+            # Written once every dataset has been read, as a k-way merge of the
+            # sorted event runs
+            outputs["timeline"] = output_path(output_folder, "timeline", output_format)
+            output_data(builder, TIMELINE_HEADERS, outputs["timeline"], output_format, "timeline", metrics)
+            written["timeline"] = len(builder)
+
+    if verbose:
+        for dataset, output_file in outputs.items():
+            print(f"{dataset.capitalize()} data saved to {output_file}")
+    return written
 
 
 def validate_folder(folder_path):
@@ -55,97 +188,225 @@ def validate_folder(folder_path):
     return folder_path
 
 
+def validate_workers(value):
+    """
+    Validates the number of extraction workers.
+    """
+    try:
+        workers = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid worker count: {value}")
+    if workers < 1:
+        raise argparse.ArgumentTypeError("The number of workers must be at least 1.")
+    return workers
+
+
+def validate_time(value):
+    """
+    Validates a UTC date or date and time and returns it as Unix seconds.
+    """
+    try:
+        return parse_time(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid time: {value}. Use YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS' (UTC).")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Browser Forensics Toolkit CLI",
         epilog="""
 Example Usage:
-    python cli.py --root /path/to/browser/profiles --output /path/to/output --format csv [--verbose]
+    python cli.py --root /path/to/browser/profiles --output /path/to/output --format csv [--workers 4] [--verbose]
+    python cli.py --manifest roots.txt --output /path/to/output --format csv [--jobs 4]
 
-This tool extracts browsing data (history, downloads, and cookies) from supported browsers.
-Supported Output Formats: CSV, JSON, HTML, TXT.
+This tool extracts browsing data (history, downloads, search terms, cookies, and disk cache entries) from supported browsers.
+Supported Output Formats: CSV, JSON, HTML, TXT, Parquet, Arrow, SQLite (appends to case.sqlite).
         """
     )
-    parser.add_argument(
-        "--root", required=True, type=validate_folder,
+    roots = parser.add_mutually_exclusive_group(required=True)
+    roots.add_argument(
+        "--root", type=validate_folder,
         help="Root folder containing browser profiles (e.g., user data directories)."
     )
+    roots.add_argument(
+        "--manifest",
+        help="Text file listing one root folder per line. Each root is written to its own subfolder of --output."
+    )
     parser.add_argument(
         "--output", required=True, type=validate_folder,
         help="Output folder where the parsed data will be saved."
     )
     parser.add_argument(
-        "--format", choices=["csv", "json", "html", "txt"], default="csv",
+        "--format", choices=OUTPUT_FORMATS, default="csv",
         help="Output format for the data. Default is CSV."
     )
+    parser.add_argument(
+        "--search",
+        help="Only output rows whose URL, title, download path, search term, cookie host, cookie name or cached URL contains this text (case-insensitive)."
+    )
+    parser.add_argument(
+        "--since", type=validate_time,
+        help="Only extract records at or after this UTC time (YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS'). Cookies are kept if last used at or after it."
+    )
+    parser.add_argument(
+        "--until", type=validate_time,
+        help="Only extract records at or before this UTC time. Cookies are kept if created at or before it."
+    )
+    parser.add_argument(
+        "--host", action="append",
+        help="Only extract history, searches, cookies and cache entries for this domain or its subdomains. Can be given more than once."
+    )
+    parser.add_argument(
+        "--visit-type", action="append", choices=list(TRANSITION_TYPES.values()), metavar="TYPE",
+        help="Only extract history visits of this type, e.g. 'Typed URL'. Can be given more than once."
+    )
+    parser.add_argument(
+        "--danger-type", action="append", choices=list(DANGER_TYPE_MAP.values()), metavar="TYPE",
+        help="Only extract downloads with this danger type, e.g. 'Dangerous File'. Can be given more than once."
+    )
+    parser.add_argument(
+        "--timeline", action="store_true",
+        help="Also write a timeline output merging the visits, downloads, searches, cookie and cache events of every dataset in time order."
+    )
+    parser.add_argument(
+        "--dedup", action="store_true",
+        help="Write each record found in several sources (e.g. the same profile collected twice, or shadow copies) once, with Occurrences and Sources columns."
+    )
+    parser.add_argument(
+        "--summary", action="store_true",
+        help="Also write hosts and domains outputs counting visits, cookies and cache entries per host and per domain, most visited first."
+    )
+    parser.add_argument(
+        "--index",
+        help="File index to reuse between runs over the same root. Created on first use."
+    )
+    parser.add_argument(
+        "--rebuild-index", action="store_true",
+        help="Walk the root folder again and overwrite the file index."
+    )
+    parser.add_argument(
+        "--cache",
+        help="Incremental cache file. Databases unchanged since the previous run are served from it instead of being parsed again."
+    )
+    parser.add_argument(
+        "--snapshot", choices=SNAPSHOT_MODES, default="auto",
+        help="Copy databases (with their -wal file) to a temporary folder before reading: 'auto' only when a -wal file is pending. Default is auto."
+    )
+    parser.add_argument(
+        "--workers", type=validate_workers, default=1,
+        help="Number of databases to parse in parallel. Default is 1 (serial)."
+    )
+    parser.add_argument(
+        "--pool", choices=POOL_TYPES, default="process",
+        help="Worker pool used when --workers is greater than 1. Default is process."
+    )
+    parser.add_argument(
+        "--jobs", type=validate_workers, default=1,
+        help="Number of --manifest roots processed in parallel worker processes. Default is 1."
+    )
+    parser.add_argument(
+        "--checkpoint",
+        help="Batch checkpoint file for --manifest runs. Roots it records as done are skipped when the batch is run again. Default is batch_checkpoint.json in the output folder."
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Write a JSON report of per-stage and per-database timings, row rates, bytes read and peak memory to this file."
+    )
+    parser.add_argument(
+        "--profile",
+        help="Profile the run with cProfile and write the stats to this file. The slowest functions are also added to the --metrics report."
+    )
     parser.add_argument(
         "--verbose", action="store_true",
         help="Enable verbose mode for detailed logs."
     )
 
     args = parser.parse_args()
+    if args.since is not None and args.until is not None and args.since > args.until:
+        parser.error("--since must not be later than --until.")
+    args.filters = ExtractionFilter(args.since, args.until, args.host, args.visit_type, args.danger_type) or None
+    if args.manifest:
+        for option in ("index", "cache", "profile"):
+            if getattr(args, option):
+                parser.error(f"--{option} cannot be used with --manifest.")
 
     root_folder = args.root
     output_folder = args.output
     output_format = args.format
+    workers = args.workers
+    pool = args.pool
     verbose = args.verbose
 
     if verbose:
         print(f"Starting Browser Forensics Toolkit...")
-        print(f"Root Folder: {root_folder}")
+        if args.manifest:
+            print(f"Manifest: {args.manifest} ({args.jobs} jobs)")
+        else:
+            print(f"Root Folder: {root_folder}")
         print(f"Output Folder: {output_folder}")
         print(f"Output Format: {output_format}")
+        print(f"Workers: {workers} ({pool} pool)")
 
-    try:
-        # profile files
-        profile_files = find_browser_profile_files(root_folder)
+    if args.manifest:
+        run_manifest(args)
+        return
 
-        # Detect browser name
-        browser_name = detect_browser(profile_files)
-        if verbose:
-            print(f"Detected Browser: {browser_name}")
-
-        # History
-        history_data = extract_history(browser_name, profile_files.get("history", []), "default_user")
-        history_output = os.path.join(output_folder, f"history.{output_format}")
-        output_data(
-            history_data,
-            ["Visit Time", "URL", "Title", "Visit Count", "Visit Type", "Duration", "Browser", "User Profile", "Source"],
-            history_output,
-            output_format
-        )
-        if verbose:
-            print(f"History data saved to {history_output}")
-
-        # Downloads
-        downloads_data = extract_downloads(browser_name, profile_files.get("history", []), "default_user")
-        downloads_output = os.path.join(output_folder, f"downloads.{output_format}")
-        output_data(
-            downloads_data,
-            ["Start Time", "End Time", "File Path", "Total Bytes", "Received Bytes", "Danger Type", "Interrupt Reason", "Opened", "Browser", "User Profile", "Source"],
-            downloads_output,
-            output_format
-        )
-        if verbose:
-            print(f"Downloads data saved to {downloads_output}")
-
-        # Cookies
-        cookies_data = extract_cookies(browser_name, profile_files.get("cookies", []), "default_user")
-        cookies_output = os.path.join(output_folder, f"cookies.{output_format}")
-        output_data(
-            cookies_data,
-            ["Host", "Name", "Value", "Creation Time", "Last Access Time", "Expiry Time", "Secure", "HTTP Only", "Browser", "User Profile", "Source"],
-            cookies_output,
-            output_format
+    cache = ExtractionCache(args.cache) if args.cache else None
+    # Stage timings are cheap enough to always collect; they are only written out
+    # with --metrics
+    metrics = RunMetrics(profile=bool(args.profile))
+
+    try:
+        process_root(
+            root_folder, output_folder, output_format, args.search, workers, pool, args.snapshot,
+            args.index, args.rebuild_index, cache, metrics, verbose, args.timeline, args.filters, args.dedup, args.summary
         )
-        if verbose:
-            print(f"Cookies data saved to {cookies_output}")
+
+        if verbose and cache is not None:
+            print(f"Incremental cache: {cache.hits} databases reused, {cache.misses} parsed")
 
         print(f"Browser Forensics Toolkit completed. Results saved in {output_folder}")
 
     except Exception as e:
         print(f"Error occurred during processing: {e}")
 
+    finally:
+        if cache is not None:
+            cache.close()
+        write_metrics(metrics, args.metrics, args.profile, verbose)
+
+
+def run_manifest(args):
+    """
+    Processes every root listed in --manifest into its own folder under --output,
+    resuming from the batch checkpoint of an earlier run.
+    """
+    roots = read_manifest(args.manifest)
+    missing = [root for root in roots if not os.path.isdir(root)]
+    for root in missing:
+        print(f"Skipping {root}: folder does not exist")
+    roots = [root for root in roots if root not in missing]
+
+    def report(root, result):
+        if result["status"] == "done":
+            print(f"Finished {root}: {sum(result['rows'].values())} rows in {result['seconds']}s -> {result['output']}")
+        else:
+            print(f"Failed {root}: {result['error']}")
+
+    checkpoint = run_batch(
+        process_root, roots, args.output, jobs=args.jobs, checkpoint_file=args.checkpoint,
+        collect_metrics=bool(args.metrics), on_result=report,
+        output_format=args.format, search=args.search, workers=args.workers, pool=args.pool, snapshot=args.snapshot,
+        timeline=args.timeline, filters=args.filters, dedup=args.dedup, summary=args.summary
+    )
+
+    if args.metrics:
+        with open(args.metrics, "w", encoding="utf-8") as f:
+            json.dump({root: result.get("metrics") for root, result in checkpoint.roots.items()}, f, indent=4)
+
+    done = sum(1 for root in roots if checkpoint.is_done(root))
+    print(f"Browser Forensics Toolkit completed {done} of {len(roots)} roots. Results saved in {args.output}")
+
 
 if __name__ == "__main__":
     main()
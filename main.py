@@ -1,16 +1,17 @@
 
 import sys
-import os
 from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, QTableWidget,
-    QTableWidgetItem, QHeaderView, QProgressBar, QPushButton, QComboBox,
+    QApplication, QMainWindow, QTabWidget, QVBoxLayout, QWidget, QTableView,
+    QAbstractItemView, QHeaderView, QProgressBar, QPushButton, QComboBox,
     QLineEdit, QHBoxLayout, QFileDialog, QLabel, QMessageBox
 )
-from PyQt5.QtCore import Qt
-from modules.parsing import find_browser_profile_files, extract_history, extract_downloads, extract_cookies
-from modules.utils import write_to_csv
-import json
-from pandas import DataFrame
+from PyQt5.QtCore import Qt, QThread
+from modules.parse_worker import ParseWorker
+from modules.parsing import HISTORY_HEADERS, DOWNLOADS_HEADERS, SEARCHES_HEADERS, COOKIES_HEADERS
+from modules.disk_cache import CACHE_HEADERS
+from modules.search import search_column_indexes
+from modules.table_model import ColumnTableModel, RowOrderProxyModel
+from modules.writers import open_writer
 
 class BrowserDataParserApp(QMainWindow):
     def __init__(self):
@@ -26,13 +27,31 @@ class BrowserDataParserApp(QMainWindow):
         self.tab_widget = QTabWidget(self.central_widget)
         self.main_layout.addWidget(self.tab_widget)
 
-        self.history_tab = self.create_tab("History", ["Visit Time", "URL", "Title", "Visit Count", "Visit Type", "Duration", "Browser", "User Profile", "Source"])
-        self.downloads_tab = self.create_tab("Downloads", ["Start Time", "End Time", "File Path", "Total Bytes", "Received Bytes", "Danger Type", "Interrupt Reason", "Opened", "Browser", "User Profile", "Source"])
-        self.cookies_tab = self.create_tab("Cookies", ["Host", "Name", "Value", "Creation Time", "Last Access Time", "Expiry Time", "Secure", "HTTP Only", "Browser", "User Profile", "Source"])
+        self.headers = {
+            "history": HISTORY_HEADERS,
+            "downloads": DOWNLOADS_HEADERS,
+            "searches": SEARCHES_HEADERS,
+            "cookies": COOKIES_HEADERS,
+            "cache": CACHE_HEADERS
+        }
+        self.history_tab = self.create_tab("History", self.headers["history"])
+        self.downloads_tab = self.create_tab("Downloads", self.headers["downloads"])
+        self.searches_tab = self.create_tab("Searches", self.headers["searches"])
+        self.cookies_tab = self.create_tab("Cookies", self.headers["cookies"])
+        self.cache_tab = self.create_tab("Cache", self.headers["cache"])
+        self.tables = {
+            "history": self.history_tab.findChild(QTableView, "history_table"),
+            "downloads": self.downloads_tab.findChild(QTableView, "downloads_table"),
+            "searches": self.searches_tab.findChild(QTableView, "searches_table"),
+            "cookies": self.cookies_tab.findChild(QTableView, "cookies_table"),
+            "cache": self.cache_tab.findChild(QTableView, "cache_table")
+        }
 
         self.tab_widget.addTab(self.history_tab, "History")
         self.tab_widget.addTab(self.downloads_tab, "Downloads")
+        self.tab_widget.addTab(self.searches_tab, "Searches")
         self.tab_widget.addTab(self.cookies_tab, "Cookies")
+        self.tab_widget.addTab(self.cache_tab, "Cache")
 
         self.controls_layout = QHBoxLayout()
         self.main_layout.addLayout(self.controls_layout)
@@ -53,6 +72,11 @@ class BrowserDataParserApp(QMainWindow):
         self.start_btn.clicked.connect(self.start_parsing)
         self.controls_layout.addWidget(self.start_btn)
 
+        self.cancel_btn = QPushButton("Cancel", self)
+        self.cancel_btn.setEnabled(False)
+        self.cancel_btn.clicked.connect(self.cancel_parsing)
+        self.controls_layout.addWidget(self.cancel_btn)
+
         self.export_button = QPushButton("Export", self)
         self.export_button.clicked.connect(self.export_results)
         self.file_type_dropdown = QComboBox(self)
@@ -65,6 +89,8 @@ class BrowserDataParserApp(QMainWindow):
 
         self.root_folder = ""
         self.output_folder = ""
+        self.worker = None
+        self.worker_thread = None
 
     def create_tab(self, title, headers):
         tab = QWidget()
@@ -79,34 +105,29 @@ class BrowserDataParserApp(QMainWindow):
         layout.addLayout(search_layout)
 
         # Data Table
-        table = QTableWidget(tab)
-        table.setColumnCount(len(headers))
-        table.setHorizontalHeaderLabels(headers)
+        model = ColumnTableModel(headers, tab, search_column_indexes(title.lower(), headers))
+        proxy = RowOrderProxyModel(tab)
+        proxy.setSourceModel(model)
+        table = QTableView(tab)
+        table.setModel(proxy)
         table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         table.setSortingEnabled(True)
-        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.sortByColumn(-1, Qt.AscendingOrder)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         layout.addWidget(table)
         table.setObjectName(f"{title.lower()}_table")
 
         search_button.clicked.connect(lambda: self.search_table(table, search_bar.text()))
+        search_bar.returnPressed.connect(lambda: self.search_table(table, search_bar.text()))
 
         return tab
 
-    def update_table(self, table_widget, data):
-        table_widget.setRowCount(len(data))
-        for row_idx, row_data in enumerate(data):
-            for col_idx, value in enumerate(row_data):
-                table_widget.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
-
-    def search_table(self, table_widget, keyword):
-        for row in range(table_widget.rowCount()):
-            match = False
-            for col in range(table_widget.columnCount()):
-                item = table_widget.item(row, col)
-                if item and keyword.lower() in item.text().lower():
-                    match = True
-                    break
-            table_widget.setRowHidden(row, not match)
+    def update_table(self, table_view, data):
+        table_view.model().sourceModel().set_rows(data)
+
+    def search_table(self, table_view, keyword):
+        proxy = table_view.model()
+        proxy.set_filter_rows(proxy.sourceModel().find_rows(keyword))
 
     def select_root_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Root Folder")
@@ -120,94 +141,82 @@ class BrowserDataParserApp(QMainWindow):
             self.output_folder = folder
             self.status_label.setText(f"Output Folder: {folder}")
 
-    
     def start_parsing(self):
         if not self.root_folder or not self.output_folder:
             QMessageBox.warning(self, "Error", "Please select both root and output folders!")
             return
+        if self.worker_thread is not None:
+            return
+
+        for dataset in self.headers:
+            self.update_table(self.tables[dataset], [])
 
         self.status_label.setText("Parsing started...")
         self.progress_bar.setValue(0)
-
-        try:
-            # Profile files
-            profile_files = find_browser_profile_files(self.root_folder)
-
-            # Parse History Files
-            history_data = extract_history("chrome", profile_files.get("history", []), "default_user")
-            history_table = self.history_tab.findChild(QTableWidget, "history_table")
-            self.update_table(history_table, history_data)
-            history_output = os.path.join(self.output_folder, "history.csv")
-            write_to_csv(history_data, ["Visit Time", "URL", "Title", "Visit Count", "Visit Type", "Duration", "Browser", "User Profile", "Source"], history_output)
-
-            # Parse Downloads
-            downloads_data = extract_downloads("chrome", profile_files.get("history", []), "default_user")
-            downloads_table = self.downloads_tab.findChild(QTableWidget, "downloads_table")
-            self.update_table(downloads_table, downloads_data)
-            downloads_output = os.path.join(self.output_folder, "downloads.csv")
-            write_to_csv(downloads_data, ["Start Time", "End Time", "File Path", "Total Bytes", "Received Bytes", "Danger Type", "Interrupt Reason", "Opened", "Browser", "User Profile", "Source"], downloads_output)
-
-            # Parse Cookies
-            cookies_data = extract_cookies("chrome", profile_files.get("cookies", []), "default_user")
-            cookies_table = self.cookies_tab.findChild(QTableWidget, "cookies_table")
-            self.update_table(cookies_table, cookies_data)
-            cookies_output = os.path.join(self.output_folder, "cookies.csv")
-            write_to_csv(cookies_data, ["Host", "Name", "Value", "Creation Time", "Last Access Time", "Expiry Time", "Secure", "HTTP Only", "Browser", "User Profile", "Source"], cookies_output)
-
+        self.start_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
+
+        self.worker = ParseWorker(self.root_folder, self.output_folder, self.headers)
+        self.worker_thread = QThread(self)
+        self.worker.moveToThread(self.worker_thread)
+        self.worker_thread.started.connect(self.worker.run)
+        self.worker.status.connect(self.status_label.setText)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.rows_ready.connect(self.append_rows)
+        self.worker.index_ready.connect(self.attach_search_index)
+        self.worker.finished.connect(self.parsing_finished)
+        self.worker.failed.connect(self.parsing_failed)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.failed.connect(self.worker_thread.quit)
+        self.worker_thread.finished.connect(self.cleanup_worker)
+        self.worker_thread.start()
+
+    def cancel_parsing(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_btn.setEnabled(False)
+            self.status_label.setText("Cancelling...")
+
+    def update_progress(self, done, total):
+        self.progress_bar.setValue(int(done * 100 / total) if total else 100)
+
+    def append_rows(self, dataset, rows):
+        self.tables[dataset].model().sourceModel().append_rows(rows)
+
+    def attach_search_index(self, dataset, index):
+        self.tables[dataset].model().sourceModel().search_index = index
+
+    def parsing_finished(self, completed):
+        if completed:
             self.progress_bar.setValue(100)
+            self.status_label.setText("Parsing completed!")
             QMessageBox.information(self, "Success", f"Parsing completed! Default CSV files saved in {self.output_folder}")
+        else:
+            self.status_label.setText("Parsing cancelled.")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-            self.status_label.setText("Parsing failed!")
-
-        if not self.root_folder or not self.output_folder:
-            QMessageBox.warning(self, "Error", "Please select both root and output folders!")
-            return
-
-        self.status_label.setText("Parsing started...")
-        self.progress_bar.setValue(0)
-
-        try:
-            # Profiles files
-            profile_files = find_browser_profile_files(self.root_folder)
-
-            # History Files
-            history_data = extract_history("chrome", profile_files.get("history", []), "default_user")
-            history_table = self.history_tab.findChild(QTableWidget, "history_table")
-            self.update_table(history_table, history_data)
-
-            # Downloads
-            downloads_data = extract_downloads("chrome", profile_files.get("history", []), "default_user")
-            downloads_table = self.downloads_tab.findChild(QTableWidget, "downloads_table")
-            self.update_table(downloads_table, downloads_data)
-
-            # Cookies
-            cookies_data = extract_cookies("chrome", profile_files.get("cookies", []), "default_user")
-            cookies_table = self.cookies_tab.findChild(QTableWidget, "cookies_table")
-            self.update_table(cookies_table, cookies_data)
-
-            self.progress_bar.setValue(100)
-            QMessageBox.information(self, "Success", "Parsing completed!")
+    def parsing_failed(self, message):
+        QMessageBox.critical(self, "Error", message)
+        self.status_label.setText("Parsing failed!")
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
-            self.status_label.setText("Parsing failed!")
+    def cleanup_worker(self):
+        self.worker_thread.deleteLater()
+        self.worker.deleteLater()
+        self.worker_thread = None
+        self.worker = None
+        self.start_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
 
     def export_results(self):
         current_tab = self.tab_widget.currentWidget()
-        table_widget = current_tab.findChild(QTableWidget)
-        if table_widget is None:
+        table_view = current_tab.findChild(QTableView)
+        if table_view is None:
             QMessageBox.warning(self, "Error", "No data to export!")
             return
 
-        # Get data
-        data = []
-        headers = [table_widget.horizontalHeaderItem(col).text() for col in range(table_widget.columnCount())]
-        for row in range(table_widget.rowCount()):
-            if not table_widget.isRowHidden(row):
-                row_data = [table_widget.item(row, col).text() if table_widget.item(row, col) else "" for col in range(table_widget.columnCount())]
-                data.append(row_data)
+        # Get data, in the order and with the filter shown
+        proxy = table_view.model()
+        model = proxy.sourceModel()
+        rows = model.table.take(proxy.source_rows())
 
         # Get file type
         file_type = self.file_type_dropdown.currentText().lower()
@@ -216,23 +225,14 @@ class BrowserDataParserApp(QMainWindow):
         if not file_path:
             return
 
-        # Export data
-        if file_type == "csv":
-            write_to_csv(data, headers, file_path)
-        elif file_type == "json":
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump([dict(zip(headers, row)) for row in data], f, ensure_ascii=False, indent=4)
-        elif file_type == "txt":
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write("    ".join(headers) + "\n")
-                for row in data:
-                    f.write("    ".join(row) + "\n")
-        elif file_type == "html":
-            df = DataFrame(data, columns=headers)
-            df.to_html(file_path, index=False)
-        else:
+        # Export data through the same writers as the CLI
+        try:
+            writer = open_writer(file_type, model.headers, file_path)
+        except ValueError:
             QMessageBox.warning(self, "Error", f"Unsupported file format: {file_type}")
             return
+        with writer:
+            writer.write_rows(rows)
 
         QMessageBox.information(self, "Success", f"Results exported to {file_path}!")
 
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+from modules.metrics import RunMetrics
+
+CHECKPOINT_NAME = "batch_checkpoint.json"
+CHECKPOINT_VERSION = 1
+
+# Suffix of the folder a root is written to until it completes
+PARTIAL_SUFFIX = ".partial"
+
+# Job options that change how a root is processed but not what is written
+EXECUTION_OPTIONS = {"workers", "pool"}
+
+
+def read_manifest(manifest_file):
+    """
+    Returns the roots listed in a manifest file, one path per line. Blank lines and
+    lines starting with # are skipped, and a root listed twice is only kept once.
+    """
+    roots = []
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        for line in f:
+            root = line.strip()
+            if root and not root.startswith("#") and root not in roots:
+                roots.append(root)
+    return roots
+
+
+def root_output_folder(output_folder, root):
+    """
+    Returns the folder the outputs of one root are written to: the root's folder
+    name plus a short hash of its full path, so roots sharing a name do not clash.
+    """
+    name = re.sub(r"[^0-9A-Za-z._-]+", "_", os.path.basename(os.path.normpath(root))).strip("_") or "root"
+    digest = hashlib.sha1(os.path.abspath(root).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(output_folder, f"{name}-{digest}")
+
+
+def output_options(options):
+    """
+    Returns the job options that decide what a root's outputs contain, in the
+    JSON form they are recorded in the checkpoint. Objects such as an
+    ExtractionFilter are recorded by their attributes.
+    """
+    options = {name: value for name, value in options.items() if name not in EXECUTION_OPTIONS}
+    return json.loads(json.dumps(options, sort_keys=True, default=vars))
+
+
+class BatchCheckpoint:
+    """
+    JSON record of the outcome of every root in a batch, rewritten after each root
+    finishes. Roots recorded as done are skipped when the batch is run again;
+    failed or interrupted roots are run again. So are roots done with other
+    options: each entry records the output options of its run, and a root only
+    counts as done for the same ones.
+    """
+
+    def __init__(self, checkpoint_file, options=None):
+        self.checkpoint_file = checkpoint_file
+        self.options = output_options(options or {})
+        self.roots = {}
+        try:
+            with open(checkpoint_file, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return
+        if checkpoint.get("version") == CHECKPOINT_VERSION:
+            self.roots = checkpoint.get("roots", {})
+
+    def is_done(self, root):
+        result = self.roots.get(root, {})
+        return result.get("status") == "done" and result.get("options") == self.options
+
+    def record(self, root, result):
+        self.roots[root] = {**result, "options": self.options}
+        self.save()
+
+    def save(self):
+        # Written to a temporary file and swapped in, so an interrupted write never
+        # leaves a truncated checkpoint behind
+        temp_file = self.checkpoint_file + ".tmp"
+        with open(temp_file, "w", encoding="utf-8") as f:
+            json.dump({"version": CHECKPOINT_VERSION, "roots": self.roots}, f, indent=4, ensure_ascii=False)
+        os.replace(temp_file, self.checkpoint_file)
+
+
+def run_root(job, root, output_folder, collect_metrics, options):
+    """
+    Runs job(root, folder, metrics=..., **options) for one root and returns its
+    checkpoint entry. Outputs go to a .partial folder that is renamed into place
+    only once the job succeeds, so a root interrupted halfway never leaves
+    half-written outputs behind under its final name.
+    """
+    partial_folder = output_folder + PARTIAL_SUFFIX
+    shutil.rmtree(partial_folder, ignore_errors=True)
+    os.makedirs(partial_folder)
+
+    metrics = RunMetrics() if collect_metrics else None
+    start = time.perf_counter()
+    try:
+        rows = job(root, partial_folder, metrics=metrics, **options)
+    except Exception as e:
+        return {"status": "failed", "error": str(e), "seconds": round(time.perf_counter() - start, 4)}
+
+    # Only reached for roots that are not recorded as done, so a folder already
+    # under the final name is left over from an earlier incomplete batch
+    shutil.rmtree(output_folder, ignore_errors=True)
+    os.replace(partial_folder, output_folder)
+    result = {"status": "done", "output": output_folder, "rows": rows, "seconds": round(time.perf_counter() - start, 4)}
+    if metrics is not None:
+        result["metrics"] = metrics.report()
+    return result
+
+
+def run_batch(job, roots, output_folder, jobs=1, checkpoint_file=None, collect_metrics=False, on_result=None, **options):
+    """
+    Runs job over every root of a batch, each into its own folder under
+    output_folder, and returns the checkpoint with the outcome of every root.
+
+    Up to jobs roots run at once in worker processes. A root is only handed to
+    the pool when another one finishes, so the queue stays bounded however long
+    the manifest is and an interrupted batch has at most jobs roots in flight.
+    Roots already done in the checkpoint with the same output options are
+    skipped. on_result(root, result) is called as each root finishes.
+    """
+    checkpoint = BatchCheckpoint(checkpoint_file or os.path.join(output_folder, CHECKPOINT_NAME), options)
+    pending = [root for root in roots if not checkpoint.is_done(root)]
+
+    def finish(root, result):
+        checkpoint.record(root, result)
+        if on_result is not None:
+            on_result(root, result)
+
+    if jobs <= 1 or len(pending) <= 1:
+        for root in pending:
+            finish(root, run_root(job, root, root_output_folder(output_folder, root), collect_metrics, options))
+        return checkpoint
+
+    from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+    pending = iter(pending)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        running = {}
+
+        def submit_next():
+            root = next(pending, None)
+            if root is not None:
+                future = executor.submit(run_root, job, root, root_output_folder(output_folder, root), collect_metrics, options)
+                running[future] = root
+
+        for _ in range(jobs):
+            submit_next()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                root = running.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself died
+                    result = {"status": "failed", "error": str(e)}
+                finish(root, result)
+                submit_next()
+    return checkpoint
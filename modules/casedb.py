@@ -0,0 +1,115 @@
+import re
+import sqlite3
+from itertools import islice
+from urllib.parse import urlsplit
+from modules.columnar import TIMESTAMP_COLUMNS, INTEGER_COLUMNS, FLOAT_COLUMNS
+
+CASE_DB_NAME = "case.sqlite"
+
+# Rows inserted per executemany call
+INSERT_BATCH_SIZE = 10000
+
+
+def column_name(header):
+    """
+    Returns the SQL column name for an output header, e.g. "Visit Time" -> "visit_time".
+    """
+    return re.sub(r"[^0-9a-z]+", "_", header.lower()).strip("_")
+
+
+def column_type(header):
+    if header in INTEGER_COLUMNS:
+        return "INTEGER"
+    if header in FLOAT_COLUMNS:
+        return "REAL"
+    return "TEXT"
+
+
+def url_host(url):
+    try:
+        return urlsplit(url).hostname
+    except (TypeError, ValueError):
+        return None
+
+
+class CaseDbWriter:
+    """
+    Appends rows to one table of a case SQLite database. The table is created on
+    first use and indexed on host, the first time column and the source file, so
+    results from several roots can be loaded into the same database and queried
+    without re-parsing the artifacts.
+
+    Tables of datasets with a URL column get an extra host column derived from it.
+    """
+
+    def __init__(self, headers, output_file, dataset=None):
+        if not dataset:
+            raise ValueError("SQLite output needs a dataset name for the table.")
+        self.headers = headers
+        self.output_file = output_file
+        self.dataset = dataset
+        self.columns = [column_name(header) for header in headers]
+        self.url_index = headers.index("URL") if "URL" in headers else None
+
+        self.conn = sqlite3.connect(output_file)
+        self.create_table()
+
+    def create_table(self):
+        """
+        Creates the dataset's table, or adds the columns an existing table lacks,
+        e.g. Occurrences and Sources when a deduplicated run is appended to a case
+        written without deduplication. Rows written earlier have NULL in them.
+        """
+        definitions = {name: f'"{name}" {column_type(header)}' for name, header in zip(self.columns, self.headers)}
+        if self.url_index is not None:
+            definitions["host"] = '"host" TEXT'
+        with self.conn:
+            self.conn.execute(f'CREATE TABLE IF NOT EXISTS "{self.dataset}" (id INTEGER PRIMARY KEY, {", ".join(definitions.values())})')
+            existing = {row[1] for row in self.conn.execute(f'PRAGMA table_info("{self.dataset}")')}
+            for name, definition in definitions.items():
+                if name not in existing:
+                    self.conn.execute(f'ALTER TABLE "{self.dataset}" ADD COLUMN {definition}')
+
+    def create_indexes(self):
+        indexed = []
+        if "host" in self.columns or self.url_index is not None:
+            indexed.append("host")
+        time_columns = [name for name, header in zip(self.columns, self.headers) if header in TIMESTAMP_COLUMNS]
+        if time_columns:
+            indexed.append(time_columns[0])
+        if "source" in self.columns:
+            indexed.append("source")
+
+        with self.conn:
+            for name in indexed:
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS "idx_{self.dataset}_{name}" ON "{self.dataset}" ("{name}")')
+
+    def write_rows(self, rows):
+        columns = list(self.columns)
+        if self.url_index is not None:
+            columns.append("host")
+        placeholders = ", ".join("?" for _ in columns)
+        column_list = ", ".join(f'"{name}"' for name in columns)
+        query = f'INSERT INTO "{self.dataset}" ({column_list}) VALUES ({placeholders})'
+
+        rows = iter(rows)
+        with self.conn:
+            while True:
+                chunk = list(islice(rows, INSERT_BATCH_SIZE))
+                if not chunk:
+                    break
+                if self.url_index is not None:
+                    chunk = [list(row) + [url_host(row[self.url_index])] for row in chunk]
+                self.conn.executemany(query, chunk)
+
+    def close(self):
+        try:
+            self.create_indexes()
+        finally:
+            self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
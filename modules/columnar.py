@@ -0,0 +1,151 @@
+import warnings
+from itertools import islice
+
+# Rows per Parquet row group / Arrow record batch
+ROW_GROUP_SIZE = 100000
+
+# Output column types by header; anything not listed is written as a string
+TIMESTAMP_COLUMNS = {"Time", "Visit Time", "Last Visit Time", "Start Time", "End Time", "Creation Time", "Last Access Time", "Expiry Time", "Response Time", "Request Time", "First Visit", "Last Visit"}
+INTEGER_COLUMNS = {"Visit Count", "Total Bytes", "Received Bytes", "Status", "Body Size", "Occurrences", "Visits", "Cookies", "Cache Entries", "Hosts"}
+FLOAT_COLUMNS = {"Duration"}
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Parquet and Arrow output require pyarrow. Install it with 'pip install pyarrow'.")
+    return pyarrow
+
+
+def build_schema(headers):
+    """
+    Returns the Arrow schema used for a table with the given headers.
+    """
+    pa = _import_pyarrow()
+    fields = []
+    for header in headers:
+        if header in TIMESTAMP_COLUMNS:
+            fields.append(pa.field(header, pa.timestamp("s", tz="UTC")))
+        elif header in INTEGER_COLUMNS:
+            fields.append(pa.field(header, pa.int64()))
+        elif header in FLOAT_COLUMNS:
+            fields.append(pa.field(header, pa.float64()))
+        else:
+            fields.append(pa.field(header, pa.string()))
+    return pa.schema(fields)
+
+
+class ColumnarWriter:
+    """
+    Base class for typed, compressed columnar output. Incoming rows are buffered
+    in a RecordTable across write_rows() calls until ROW_GROUP_SIZE rows are
+    pending, then converted to an Arrow table and written, so small batches still
+    produce full row groups.
+
+    Timestamp columns are built from the table's Unix seconds. Formatted rows,
+    e.g. from the timeline, are packed into the table first, which parses their
+    times back to seconds.
+    """
+
+    def __init__(self, headers, output_file, dataset=None):
+        # modules.records takes its column sets from this module, so it is
+        # imported only once a writer is opened
+        from modules.records import RecordTable
+        self.pa = _import_pyarrow()
+        self.headers = headers
+        self.output_file = output_file
+        self.dataset = dataset
+        self.schema = build_schema(headers)
+        self.sink = self.open_sink()
+        self.pending = RecordTable(headers)
+
+    def open_sink(self):
+        raise NotImplementedError
+
+    def write_table(self, table):
+        raise NotImplementedError
+
+    def timestamp_array(self, table, index, field):
+        from modules.records import TimestampColumn, parse_timestamp
+        values = table.raw_values(index)
+        if not isinstance(table.columns[index], TimestampColumn):
+            # The fallback column of a damaged database holds formatted times
+            # and values that are not times at all
+            seconds = []
+            for value in values:
+                try:
+                    seconds.append(None if value is None else parse_timestamp(value))
+                except (TypeError, ValueError):
+                    seconds.append(None)
+            dropped = sum(1 for value, second in zip(values, seconds) if value is not None and second is None)
+            if dropped:
+                warnings.warn(f"{dropped} {field.name} values written to {self.output_file} are not timestamps and were stored as NULL")
+            values = seconds
+        return self.pa.array(values, type=field.type)
+
+    def to_table(self, table):
+        arrays = []
+        for index, field in enumerate(self.schema):
+            if field.name in TIMESTAMP_COLUMNS:
+                arrays.append(self.timestamp_array(table, index, field))
+                continue
+            values = table.raw_values(index)
+            if field.type == self.pa.string():
+                arrays.append(self.pa.array([None if value is None else str(value) for value in values], type=field.type))
+            else:
+                arrays.append(self.pa.array(values, type=field.type))
+        return self.pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def write_pending(self):
+        while len(self.pending) >= ROW_GROUP_SIZE:
+            self.write_table(self.to_table(self.pending.take(range(ROW_GROUP_SIZE))))
+            self.pending = self.pending.take(range(ROW_GROUP_SIZE, len(self.pending)))
+
+    def write_rows(self, rows):
+        """
+        Adds rows, given as a RecordTable or as an iterable of formatted rows.
+        """
+        from modules.records import RecordTable
+        if isinstance(rows, RecordTable):
+            self.pending.extend(rows)
+            self.write_pending()
+            return
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, ROW_GROUP_SIZE))
+            if not chunk:
+                break
+            self.pending.extend(chunk)
+            self.write_pending()
+
+    def close(self):
+        if len(self.pending):
+            self.write_table(self.to_table(self.pending))
+            self.pending = self.pending.take([])
+        self.sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ParquetWriter(ColumnarWriter):
+    def open_sink(self):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(self.output_file, self.schema, compression="zstd")
+
+    def write_table(self, table):
+        self.sink.write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+
+class ArrowWriter(ColumnarWriter):
+    def open_sink(self):
+        import pyarrow.ipc
+        options = pyarrow.ipc.IpcWriteOptions(compression="zstd")
+        return pyarrow.ipc.new_file(self.output_file, self.schema, options=options)
+
+    def write_table(self, table):
+        self.sink.write_table(table, max_chunksize=ROW_GROUP_SIZE)
@@ -0,0 +1,76 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+# Pragmas applied to every evidence connection for fast, read-only scans
+SCAN_PRAGMAS = [
+    "PRAGMA query_only = ON",
+    "PRAGMA cache_size = -65536",      # 64 MiB page cache
+    "PRAGMA mmap_size = 268435456",    # map up to 256 MiB of the file
+    "PRAGMA temp_store = MEMORY",
+]
+
+SNAPSHOT_MODES = ("auto", "always", "never")
+
+
+def has_pending_wal(db_file):
+    try:
+        return os.path.getsize(db_file + "-wal") > 0
+    except OSError:
+        return False
+
+
+def _connect_immutable(db_file):
+    # immutable=1 skips locking and never creates journal files next to the evidence
+    uri = Path(db_file).absolute().as_uri() + "?mode=ro&immutable=1"
+    return sqlite3.connect(uri, uri=True)
+
+
+def _connect_snapshot(db_file, snapshot_folder):
+    # Copy the database with its WAL so SQLite replays the pending transactions
+    # into the copy rather than the original
+    copy = os.path.join(snapshot_folder, os.path.basename(db_file))
+    shutil.copy2(db_file, copy)
+    if os.path.exists(db_file + "-wal"):
+        shutil.copy2(db_file + "-wal", copy + "-wal")
+    return sqlite3.connect(copy)
+
+
+@contextmanager
+def open_database(db_file, snapshot="auto"):
+    """
+    Opens an evidence database for reading without touching the original file.
+
+    By default the file is opened through an immutable read-only URI. A pending
+    -wal file is ignored in that mode, so with snapshot="auto" databases that have
+    one are copied together with their WAL into a temporary folder and read from
+    there. snapshot="always" copies every database, snapshot="never" never does.
+    """
+    if snapshot not in SNAPSHOT_MODES:
+        raise ValueError(f"Unsupported snapshot mode '{snapshot}'. Choose from {', '.join(SNAPSHOT_MODES)}.")
+
+    snapshot_folder = None
+    if snapshot == "always" or (snapshot == "auto" and has_pending_wal(db_file)):
+        snapshot_folder = tempfile.mkdtemp(prefix="bft-snapshot-")
+
+    try:
+        try:
+            if snapshot_folder:
+                conn = _connect_snapshot(db_file, snapshot_folder)
+            else:
+                conn = _connect_immutable(db_file)
+        except OSError as e:
+            raise sqlite3.OperationalError(f"unable to snapshot database: {e}")
+
+        try:
+            for pragma in SCAN_PRAGMAS:
+                conn.execute(pragma)
+            yield conn
+        finally:
+            conn.close()
+    finally:
+        if snapshot_folder:
+            shutil.rmtree(snapshot_folder, ignore_errors=True)
@@ -0,0 +1,366 @@
+import hashlib
+import heapq
+import json
+import tempfile
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from urllib.parse import urlsplit
+from modules.parsing import ARTIFACT_HEADERS, BATCH_SIZE
+from modules.disk_cache import CACHE_HEADERS
+from modules.records import RecordTable
+
+# Columns added to each deduplicated row
+DEDUP_HEADERS = ["Occurrences", "Sources"]
+
+# Columns identifying one record, whichever copy of a database it was read from
+DEDUP_KEYS = {
+    "history": ["URL", "Visit Time", "Visit Type"],
+    "downloads": ["File Path", "Start Time"],
+    "searches": ["Search Term", "URL", "Last Visit Time"],
+    "cookies": ["Host", "Name", "Creation Time"],
+    "cache": ["URL", "Request Time", "Response Time"],
+}
+
+DATASET_HEADERS = {**ARTIFACT_HEADERS, "cache": CACHE_HEADERS}
+
+# Unique records kept in memory before a run is spilled to a temporary file
+RUN_SIZE = 50000
+
+HOST_SUMMARY_HEADERS = ["Host", "Domain", "Visits", "Cookies", "Cache Entries", "First Visit", "Last Visit"]
+DOMAIN_SUMMARY_HEADERS = ["Domain", "Hosts", "Visits", "Cookies", "Cache Entries", "First Visit", "Last Visit"]
+
+# Second-level labels registered like top-level domains under country codes,
+# e.g. co.uk and com.au
+SECOND_LEVEL_LABELS = {"co", "com", "net", "org", "gov", "edu", "ac", "or", "ne", "go"}
+
+# Key run entries: (record hash, sequence number, occurrences, source mask)
+KEY_ORDER = itemgetter(0, 1)
+# Record totals: (sequence number, occurrences, source mask)
+TOTAL_ORDER = itemgetter(0)
+
+
+def record_hash(values):
+    """
+    Returns a stable 16-byte hash of the key values of a record. Timestamps are
+    hashed as Unix seconds, so the hash does not depend on output formatting.
+    """
+    return hashlib.blake2b(repr(tuple(values)).encode("utf-8"), digest_size=16).digest()
+
+
+def _spill(entries, temp_dir):
+    # One JSON array per line; the file is read back in order by the merge
+    run = tempfile.TemporaryFile("w+", encoding="utf-8", dir=temp_dir)
+    for entry in entries:
+        run.write(json.dumps(entry, ensure_ascii=False, default=str))
+        run.write("\n")
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    for line in run:
+        yield json.loads(line)
+
+
+class Deduplicator:
+    """
+    Collapses the rows of one dataset that describe the same record, e.g. the
+    same visit read from several collections of a profile or from shadow copies.
+
+    Rows are keyed by record_hash over the DEDUP_KEYS columns of the dataset. The
+    first row seen for a key is kept, with an Occurrences column counting the
+    rows collapsed into it and a Sources column listing every distinct Source
+    they were read from. Records come out in the order they were first seen.
+
+    Rows read from the same Source are never merged: the keys hold times in whole
+    seconds, so one database can have several rows with the same key, such as two
+    visits to a URL within a second. Each stays a record of its own, and a row
+    from another source joins the first of them that does not yet have a row from
+    that source, so copies of a database pair up one to one.
+
+    Unique rows are buffered in a RecordTable, keyed by hash, up to run_size.
+    Past that each run is spilled to two temporary files: its keys sorted by hash
+    and its rows in the order they were seen. Reading merges the key files to
+    total each record over every run, sorts the totals back into first-seen order
+    (spilling again past run_size) and joins them with the row files, which are
+    read once. Memory stays bounded by run_size however large the case.
+
+    batches() can be iterated once. close() removes the temporary files.
+    """
+
+    def __init__(self, dataset, run_size=RUN_SIZE, temp_dir=None):
+        self.dataset = dataset
+        self.headers = DATASET_HEADERS[dataset]
+        self.key_indexes = [self.headers.index(header) for header in DEDUP_KEYS[dataset]]
+        self.source_index = self.headers.index("Source")
+        self.run_size = run_size
+        self.temp_dir = temp_dir
+        # Every Source seen, by bit of the source masks
+        self.sources = []
+        self.source_bits = {}
+        self.source_text = {}
+        self.key_runs = []
+        self.row_runs = []
+        # Unique records in earlier runs, i.e. the sequence number of the first
+        # record of the current one
+        self.spilled = 0
+        self.count = 0
+        self.unique = 0
+        self._new_run()
+
+    def _new_run(self):
+        self.table = RecordTable(self.headers)
+        self.index = {}
+        # Further records sharing a key with the one in index, by key
+        self.repeats = {}
+        self.occurrences = array("Q")
+        self.masks = []
+
+    def add_rows(self, rows):
+        """
+        Adds a batch of rows, given as a RecordTable or as formatted rows.
+        """
+        if not isinstance(rows, RecordTable):
+            rows = RecordTable.from_rows(self.headers, rows)
+        index = self.index
+        repeats = self.repeats
+        occurrences = self.occurrences
+        masks = self.masks
+        source_bits = self.source_bits
+        keys = zip(*(rows.raw_values(column) for column in self.key_indexes))
+        new = []
+        for row, (key, source) in enumerate(zip(keys, rows.raw_values(self.source_index))):
+            bit = source_bits.get(source)
+            if bit is None:
+                bit = source_bits[source] = len(self.sources)
+                self.sources.append(source)
+            flag = 1 << bit
+            digest = record_hash(key)
+            position = index.get(digest)
+            if position is not None and masks[position] & flag:
+                # The source already has a record with this key
+                position = next((other for other in repeats.get(digest, ()) if not masks[other] & flag), None)
+                if position is None:
+                    repeats.setdefault(digest, []).append(len(masks))
+            elif position is None:
+                index[digest] = len(masks)
+            if position is None:
+                occurrences.append(1)
+                masks.append(flag)
+                new.append(row)
+            else:
+                occurrences[position] += 1
+                masks[position] |= flag
+        self.table.extend(rows if len(new) == len(rows) else rows.take(new))
+        self.count += len(rows)
+        if len(self.table) >= self.run_size:
+            self._flush()
+
+    def _flush(self):
+        spilled = self.spilled
+        positions = [(digest, row) for digest, row in self.index.items()]
+        positions += [(digest, row) for digest, rows in self.repeats.items() for row in rows]
+        keys = sorted((digest.hex(), spilled + row, self.occurrences[row], self.masks[row]) for digest, row in positions)
+        self.key_runs.append(_spill(keys, self.temp_dir))
+        # Rows are prefixed with their sequence number, so rows that turn out to
+        # repeat an earlier run are skipped without being decoded
+        rows = tempfile.TemporaryFile("w+", encoding="utf-8", dir=self.temp_dir)
+        for sequence, row in enumerate(self.table.raw_rows(), spilled):
+            rows.write(f"{sequence}\t{json.dumps(row, ensure_ascii=False, default=str)}\n")
+        rows.seek(0)
+        self.row_runs.append(rows)
+        self.spilled += len(self.table)
+        self._new_run()
+
+    def _totals(self):
+        # Yields (sequence number, occurrences, source mask) of every unique
+        # record in first-seen order. Key runs are merged by hash, so the entries
+        # of one key come together in first-seen order; each joins the first
+        # record of the key that shares no source with it, as rows do in add_rows.
+        totals = []
+        runs = []
+        merged = heapq.merge(*(_read_run(run) for run in self.key_runs), key=KEY_ORDER)
+        for _, entries in groupby(merged, key=itemgetter(0)):
+            records = []
+            for _, sequence, occurrences, mask in entries:
+                for record in records:
+                    if not record[2] & mask:
+                        record[1] += occurrences
+                        record[2] |= mask
+                        break
+                else:
+                    records.append([sequence, occurrences, mask])
+            totals.extend(tuple(record) for record in records)
+            if len(totals) >= self.run_size:
+                totals.sort()
+                runs.append(_spill(totals, self.temp_dir))
+                totals = []
+        totals.sort()
+        self.key_runs.extend(runs)
+        return heapq.merge(totals, *(_read_run(run) for run in runs), key=TOTAL_ORDER)
+
+    def _sources(self, mask):
+        text = self.source_text.get(mask)
+        if text is None:
+            text = self.source_text[mask] = "; ".join(str(source) for bit, source in enumerate(self.sources) if mask >> bit & 1)
+        return text
+
+    def _unique_rows(self):
+        if not self.key_runs:
+            for row, occurrences, mask in zip(self.table.raw_rows(), self.occurrences, self.masks):
+                yield row + [occurrences, self._sources(mask)]
+            return
+
+        self._flush()
+        totals = self._totals()
+        pending = next(totals, None)
+        for run in self.row_runs:
+            for line in run:
+                if pending is None:
+                    return
+                sequence, _, row = line.partition("\t")
+                if int(sequence) != pending[0]:
+                    continue
+                yield json.loads(row) + [pending[1], self._sources(pending[2])]
+                pending = next(totals, None)
+
+    def batches(self, batch_size=BATCH_SIZE):
+        """
+        Yields the unique records as RecordTables with DEDUP_HEADERS appended.
+        """
+        headers = self.headers + DEDUP_HEADERS
+        batch = []
+        for row in self._unique_rows():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self.unique += len(batch)
+                yield RecordTable.from_rows(headers, batch)
+                batch = []
+        if batch:
+            self.unique += len(batch)
+            yield RecordTable.from_rows(headers, batch)
+
+    def close(self):
+        for run in self.key_runs + self.row_runs:
+            run.close()
+        self.key_runs = []
+        self.row_runs = []
+        self._new_run()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def registered_domain(host):
+    """
+    Returns the domain a host name belongs to, e.g. "news.example.co.uk" ->
+    "example.co.uk". This is a heuristic without the public suffix list; IP
+    addresses are returned as they are.
+    """
+    if not host:
+        return None
+    host = host.lower().strip(".")
+    labels = host.split(".")
+    if ":" in host or all(label.isdigit() for label in labels):
+        return host
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in SECOND_LEVEL_LABELS:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def url_hostname(url):
+    try:
+        return urlsplit(url).hostname
+    except (TypeError, ValueError):
+        return None
+
+
+class HostSummary:
+    """
+    Per-host and per-domain counts over the rows it is given: history visits,
+    cookies and cache entries, with the first and last visit time. Fed from the
+    same batches as the writers (after deduplication, when enabled), so the counts
+    match the written outputs. Memory grows with the number of distinct hosts, not
+    rows.
+    """
+
+    def __init__(self):
+        # host -> [visits, cookies, cache entries, first visit, last visit]
+        self.hosts = {}
+
+    def _host(self, host):
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = [0, 0, 0, None, None]
+        return stats
+
+    def add_rows(self, dataset, rows):
+        """
+        Counts a batch of dataset rows, given as a RecordTable or as formatted
+        rows. Datasets other than history, cookies and cache are ignored.
+        """
+        if dataset not in ("history", "cookies", "cache"):
+            return
+        headers = DATASET_HEADERS[dataset]
+        if not isinstance(rows, RecordTable):
+            rows = RecordTable.from_rows(headers, rows)
+
+        if dataset == "cookies":
+            for host in rows.raw_values(headers.index("Host")):
+                if host:
+                    self._host(host.lower().strip("."))[1] += 1
+            return
+        if dataset == "cache":
+            for url in rows.raw_values(headers.index("URL")):
+                host = url_hostname(url)
+                if host:
+                    self._host(host)[2] += 1
+            return
+
+        times = rows.raw_values(headers.index("Visit Time"))
+        for url, seconds in zip(rows.raw_values(headers.index("URL")), times):
+            host = url_hostname(url)
+            if not host:
+                continue
+            stats = self._host(host)
+            stats[0] += 1
+            if isinstance(seconds, int):
+                if stats[3] is None or seconds < stats[3]:
+                    stats[3] = seconds
+                if stats[4] is None or seconds > stats[4]:
+                    stats[4] = seconds
+
+    def host_rows(self):
+        """
+        Returns HOST_SUMMARY_HEADERS rows, most visited hosts first.
+        """
+        rows = [[host, registered_domain(host), *stats] for host, stats in self.hosts.items()]
+        rows.sort(key=lambda row: (-row[2], -row[3], -row[4], row[0]))
+        return RecordTable.from_rows(HOST_SUMMARY_HEADERS, rows)
+
+    def domain_rows(self):
+        """
+        Returns DOMAIN_SUMMARY_HEADERS rows, most visited domains first.
+        """
+        domains = {}
+        for host, (visits, cookies, cache_entries, first, last) in self.hosts.items():
+            domain = registered_domain(host)
+            stats = domains.get(domain)
+            if stats is None:
+                domains[domain] = [1, visits, cookies, cache_entries, first, last]
+                continue
+            stats[0] += 1
+            stats[1] += visits
+            stats[2] += cookies
+            stats[3] += cache_entries
+            if first is not None and (stats[4] is None or first < stats[4]):
+                stats[4] = first
+            if last is not None and (stats[5] is None or last > stats[5]):
+                stats[5] = last
+        rows = [[domain, *stats] for domain, stats in domains.items()]
+        rows.sort(key=lambda row: (-row[2], -row[3], -row[4], row[0]))
+        return RecordTable.from_rows(DOMAIN_SUMMARY_HEADERS, rows)
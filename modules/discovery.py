@@ -0,0 +1,197 @@
+import json
+import os
+
+# Artifact file names and the bucket each one is parsed as
+ARTIFACT_FILES = {
+    "History": "history",
+    "Cookies": "cookies",
+    "places.sqlite": "history",  # Firefox
+}
+
+# Profile subfolders that never contain artifacts we parse but can hold tens of
+# thousands of files each
+PRUNED_DIRS = {
+    "Cache",
+    "Code Cache",
+    "GPUCache",
+    "Service Worker",
+    "ShaderCache",
+    "GrShaderCache",
+    "DawnCache",
+    "cache2",
+    "startupCache",
+}
+
+# Pruned folders holding a Chromium disk cache. The cache itself is reported in
+# the "cache" bucket: Cache/Cache_Data in current versions, Cache in older ones.
+CACHE_DIRS = {"Cache"}
+CACHE_DATA_DIR = "Cache_Data"
+
+INDEX_VERSION = 2
+
+# Browser by vendor folders on the artifact path, checked in order
+BROWSER_PATH_MARKERS = [
+    ("Edge", ("microsoft", "edge")),
+    ("Chrome", ("google", "chrome")),
+    ("Firefox", ("mozilla", "firefox")),
+    ("Opera", ("opera",)),
+    ("Brave", ("bravesoftware", "brave")),
+]
+
+# Folders whose child is the account name: C:\Users\<name>, /Users/<name>, /home/<name>
+USER_HOME_FOLDERS = {"users", "home", "documents and settings"}
+
+# Folders inside a browser profile that hold artifacts of the profile above them
+PROFILE_SUBFOLDERS = {"network", "cache"}
+
+
+def detect_artifact_type(file_name):
+    """
+    Returns the artifact bucket for a file name, or None if it is not an artifact.
+    """
+    return ARTIFACT_FILES.get(file_name)
+
+
+def _path_parts(path):
+    return [part for part in path.replace("\\", "/").split("/") if part]
+
+
+def browser_for_path(path):
+    """
+    Returns the browser an artifact belongs to from the vendor folders on its
+    path, or "Unknown".
+    """
+    lower_path = path.lower()
+    for browser, markers in BROWSER_PATH_MARKERS:
+        if all(marker in lower_path for marker in markers):
+            return browser
+    return "Unknown"
+
+
+def user_profile_for_path(path):
+    """
+    Returns a "<user>/<profile>" label for an artifact, e.g. "alice/Default" or
+    "alice/x1y2z3.default-release". The user is the account folder under Users or
+    home and is left out when the path has none; the profile is the folder holding
+    the artifact.
+    """
+    parts = _path_parts(path)[:-1]
+    if parts and parts[-1].lower() in PROFILE_SUBFOLDERS:
+        parts = parts[:-1]
+    profile = parts[-1] if parts else "default"
+
+    user = None
+    for position, part in enumerate(parts[:-1]):
+        if part.lower() in USER_HOME_FOLDERS:
+            user = parts[position + 1]
+    if user is None or user == profile:
+        return profile
+    return f"{user}/{profile}"
+
+
+def find_cache_dir(folder):
+    """
+    Returns the folder holding the entries of the disk cache at folder, or None
+    when it has no cache index.
+    """
+    for cache_dir in (os.path.join(folder, CACHE_DATA_DIR), folder):
+        if os.path.isfile(os.path.join(cache_dir, "index")):
+            return cache_dir
+    return None
+
+
+def scan_artifacts(root_folder, pruned_dirs=PRUNED_DIRS):
+    """
+    Walks root_folder once with os.scandir and returns a list of
+    (path, size, mtime, artifact_type) entries.
+
+    Directories named in pruned_dirs are not descended into. Disk cache folders
+    among them are reported as "cache" entries after checking for their index,
+    without listing their entries. Files are reported in the same order os.walk
+    would visit them.
+    """
+    entries = []
+    stack = [root_folder]
+    while stack:
+        top = stack.pop()
+        try:
+            with os.scandir(top) as it:
+                dir_entries = list(it)
+        except OSError:
+            continue
+
+        subdirs = []
+        for entry in dir_entries:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                if entry.name in CACHE_DIRS and not entry.is_symlink():
+                    cache_dir = find_cache_dir(entry.path)
+                    if cache_dir:
+                        try:
+                            entries.append((cache_dir, 0, entry.stat().st_mtime, "cache"))
+                        except OSError:
+                            pass
+                if entry.name not in pruned_dirs and not entry.is_symlink():
+                    subdirs.append(entry.path)
+                continue
+
+            artifact_type = detect_artifact_type(entry.name)
+            if artifact_type:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.path, stat.st_size, stat.st_mtime, artifact_type))
+
+        # Reversed so the first subfolder is popped (and walked) first
+        stack.extend(reversed(subdirs))
+    return entries
+
+
+def load_index(index_file, root_folder):
+    """
+    Loads a file index written by save_index. Returns None if the index does not
+    exist, cannot be read or was built for a different root folder.
+    """
+    try:
+        with open(index_file, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if index.get("version") != INDEX_VERSION or index.get("root") != os.path.abspath(root_folder):
+        return None
+    return [tuple(entry) for entry in index.get("entries", [])]
+
+
+def save_index(index_file, root_folder, entries):
+    """
+    Writes the discovered entries to index_file so later runs can skip the walk.
+    """
+    index = {
+        "version": INDEX_VERSION,
+        "root": os.path.abspath(root_folder),
+        "entries": entries,
+    }
+    with open(index_file, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+
+
+def discover_artifacts(root_folder, index_file=None, rebuild_index=False):
+    """
+    Returns the artifact entries for root_folder, reusing index_file when it matches
+    the root and writing it after a fresh walk.
+    """
+    if index_file and not rebuild_index:
+        entries = load_index(index_file, root_folder)
+        if entries is not None:
+            return entries
+
+    entries = scan_artifacts(root_folder)
+    if index_file:
+        save_index(index_file, root_folder, entries)
+    return entries
@@ -0,0 +1,409 @@
+import mmap
+import os
+import re
+import struct
+import zlib
+from modules.discovery import browser_for_path, user_profile_for_path
+from modules.scheduler import map_files
+from modules.utils import webkit_to_unix
+from modules.records import RecordTable
+
+CACHE_HEADERS = ["Response Time", "Request Time", "URL", "Status", "Content Type", "Content Encoding", "Body Size", "Cache Format", "Entry", "Browser", "User Profile", "Source"]
+
+# Entries parsed per task when a cache folder is spread across workers
+ENTRY_CHUNK_SIZE = 1000
+
+# Simple cache (net/disk_cache/simple/simple_entry_format.h). Each entry is a
+# <16 hex digit hash>_0 file: header, key, stream 1 (the body), EOF record,
+# stream 0 (the HTTP response info), optional key SHA-256, EOF record.
+SIMPLE_INITIAL_MAGIC = 0xfcfb6d1ba7725c30
+SIMPLE_FINAL_MAGIC = 0xf4fa6f45970d41d8
+SIMPLE_HEADER = struct.Struct("<QIII4x")
+SIMPLE_EOF = struct.Struct("<QIII4x")
+SIMPLE_EOF_HAS_KEY_SHA256 = 2
+SIMPLE_ENTRY_FILE = re.compile(r"^[0-9a-f]{16}_0$")
+
+# Blockfile cache (net/disk_cache/blockfile/disk_format.h). An index file holds
+# a hash table of addresses into data_N block files (or f_XXXXXX files for
+# large streams); each address points at an entry record of one to four 256
+# byte blocks, the count minus one held in bits 24-25 of the address. Keys up
+# to ENTRY_MAX_INLINE_KEY_SIZE bytes follow the record inline; longer ones are
+# stored at a separate long_key address.
+BLOCKFILE_INDEX_MAGIC = 0xc103cac3
+BLOCKFILE_TABLE_OFFSET = 368
+BLOCKFILE_DEFAULT_TABLE_LEN = 0x10000
+BLOCK_FILE_HEADER_SIZE = 8192
+BLOCK_SIZES = {1: 36, 2: 256, 3: 1024, 4: 4096}
+ADDR_INITIALIZED = 0x80000000
+ADDR_NUM_BLOCKS_MASK = 0x03000000
+ADDR_NUM_BLOCKS_OFFSET = 24
+ENTRY_BLOCK_SIZE = 256
+ENTRY_STORE = struct.Struct("<IIIiiiQiI4i4II4iI")
+ENTRY_KEY_OFFSET = ENTRY_STORE.size
+ENTRY_MAX_INLINE_KEY_SIZE = 4 * ENTRY_BLOCK_SIZE - ENTRY_KEY_OFFSET - 1
+
+# HttpResponseInfo pickle flags (net/http/http_response_info.cc)
+RESPONSE_INFO_VERSION_MASK = 0xff
+RESPONSE_INFO_HAS_EXTRA_FLAGS = 1 << 31
+RESPONSE_EXTRA_INFO_HAS_ORIGINAL_RESPONSE_TIME = 1 << 0
+
+# Keys of newer caches carry the network isolation key before the URL, e.g.
+# "1/0/_dk_https://a.com https://a.com https://a.com/app.js"
+KEY_PREFIX = re.compile(r"^\d+/\d+/")
+
+
+def key_url(key):
+    """
+    Returns the resource URL of a cache key.
+    """
+    if " " in key:
+        return key.rsplit(" ", 1)[-1]
+    return KEY_PREFIX.sub("", key)
+
+
+class _PickleReader:
+    """
+    Reads base::Pickle fields: little-endian values aligned to 4 bytes, after a
+    uint32 payload size.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 4
+
+    def read(self, fmt):
+        size = struct.calcsize(fmt)
+        if self.offset + size > len(self.data):
+            raise ValueError("Truncated pickle")
+        value = struct.unpack_from(fmt, self.data, self.offset)[0]
+        self.offset += (size + 3) & ~3
+        return value
+
+    def read_bytes(self):
+        length = self.read("<i")
+        if length < 0 or self.offset + length > len(self.data):
+            raise ValueError("Truncated pickle")
+        value = bytes(self.data[self.offset:self.offset + length])
+        self.offset += (length + 3) & ~3
+        return value
+
+
+def parse_response_info(data):
+    """
+    Returns (request_time, response_time, raw_headers) from a serialized
+    HttpResponseInfo. Times are WebKit microseconds; raw_headers holds the status
+    line and headers separated by NUL bytes. Records written by versions this
+    reader does not know fall back to locating the headers by their status line.
+    """
+    try:
+        reader = _PickleReader(data)
+        flags = reader.read("<I")
+        extra_flags = reader.read("<I") if flags & RESPONSE_INFO_HAS_EXTRA_FLAGS else 0
+        request_time = reader.read("<q")
+        response_time = reader.read("<q")
+        if extra_flags & RESPONSE_EXTRA_INFO_HAS_ORIGINAL_RESPONSE_TIME:
+            reader.read("<q")
+        raw_headers = reader.read_bytes()
+        if raw_headers.startswith(b"HTTP/"):
+            return request_time, response_time, raw_headers
+    except (ValueError, struct.error):
+        pass
+
+    data = bytes(data)
+    start = data.find(b"HTTP/")
+    if start < 0:
+        return None, None, b""
+    end = data.find(b"\0\0", start)
+    return None, None, data[start:end if end >= 0 else len(data)]
+
+
+def parse_headers(raw_headers):
+    """
+    Returns (status code, {lower-case header name: value}) from raw headers.
+    """
+    lines = raw_headers.decode("latin-1").split("\0")
+    status = None
+    parts = lines[0].split(" ", 2) if lines else []
+    if len(parts) > 1 and parts[1].isdigit():
+        status = int(parts[1])
+    headers = {}
+    for line in lines[1:]:
+        name, sep, value = line.partition(":")
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return status, headers
+
+
+def _entry_row(key, response_info, body_size, cache_format, entry, browser, user_profile, cache_dir):
+    request_time, response_time, raw_headers = parse_response_info(response_info) if response_info else (None, None, b"")
+    status, headers = parse_headers(raw_headers)
+    return [
+        webkit_to_unix(response_time), webkit_to_unix(request_time), key_url(key), status,
+        headers.get("content-type"), headers.get("content-encoding"), body_size,
+        cache_format, entry, browser, user_profile, cache_dir,
+    ]
+
+
+def _map_file(path):
+    # mmap cannot map empty files
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class SimpleEntry:
+    """
+    Locates the key and the two streams of a simple cache entry file without
+    reading the body: only the header and the records at the end of the mapped
+    file are touched.
+    """
+
+    def __init__(self, data):
+        if len(data) < SIMPLE_HEADER.size + 2 * SIMPLE_EOF.size:
+            raise ValueError("Entry file too short")
+        magic, _, key_length, _ = SIMPLE_HEADER.unpack_from(data, 0)
+        if magic != SIMPLE_INITIAL_MAGIC:
+            raise ValueError("Not a simple cache entry")
+
+        eof_offset = len(data) - SIMPLE_EOF.size
+        final_magic, flags, _, stream0_size = SIMPLE_EOF.unpack_from(data, eof_offset)
+        if final_magic != SIMPLE_FINAL_MAGIC:
+            raise ValueError("Missing stream 0 EOF record")
+        if flags & SIMPLE_EOF_HAS_KEY_SHA256:
+            eof_offset -= 32
+
+        self.key_start = SIMPLE_HEADER.size
+        self.key_end = self.key_start + key_length
+        self.stream0_start = eof_offset - stream0_size
+        self.stream0_end = eof_offset
+        # Stream 1 runs from the key to the EOF record preceding stream 0
+        self.stream1_end = self.stream0_start - SIMPLE_EOF.size
+        if self.stream1_end < self.key_end:
+            raise ValueError("Corrupt entry layout")
+        self.data = data
+
+    def key(self):
+        return bytes(self.data[self.key_start:self.key_end]).decode("utf-8", "replace")
+
+    def response_info(self):
+        return self.data[self.stream0_start:self.stream0_end]
+
+    def body_size(self):
+        return self.stream1_end - self.key_end
+
+    def body(self):
+        return bytes(self.data[self.key_end:self.stream1_end])
+
+
+def _row_kept(row, filters):
+    # Response Time and URL are the first and third columns
+    return not filters or (filters.time_matches(row[0]) and filters.url_matches(row[2]))
+
+
+def _simple_rows(entry_files, browser, user_profile, cache_dir, filters=None):
+    rows = RecordTable(CACHE_HEADERS)
+    for name in entry_files:
+        try:
+            data = _map_file(os.path.join(cache_dir, name))
+        except OSError:
+            continue
+        try:
+            entry = SimpleEntry(data)
+            row = _entry_row(entry.key(), entry.response_info(), entry.body_size(), "simple", name, browser, user_profile, cache_dir)
+            if _row_kept(row, filters):
+                rows.append(row)
+        except (ValueError, struct.error):
+            continue
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    return rows
+
+
+class BlockfileCache:
+    """
+    Read-only view of a blockfile cache folder. The index and block files are
+    memory-mapped once and entries are read in place.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.index = _map_file(os.path.join(cache_dir, "index"))
+        if len(self.index) < BLOCKFILE_TABLE_OFFSET or struct.unpack_from("<I", self.index, 0)[0] != BLOCKFILE_INDEX_MAGIC:
+            raise ValueError("Not a blockfile cache index")
+        self.table_len = struct.unpack_from("<i", self.index, 28)[0] or BLOCKFILE_DEFAULT_TABLE_LEN
+        self.files = {}
+
+    def close(self):
+        for data in [self.index, *self.files.values()]:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    def _file(self, name):
+        if name not in self.files:
+            self.files[name] = _map_file(os.path.join(self.cache_dir, name))
+        return self.files[name]
+
+    def read(self, addr, size):
+        """
+        Returns size bytes stored at a cache address.
+        """
+        if not addr & ADDR_INITIALIZED or size <= 0:
+            return b""
+        file_type = (addr >> 28) & 0x7
+        if file_type == 0:
+            return self._file(f"f_{addr & 0x0fffffff:06x}")[:size]
+        block_size = BLOCK_SIZES.get(file_type)
+        if block_size is None:
+            raise ValueError(f"Unsupported cache address 0x{addr:08x}")
+        offset = BLOCK_FILE_HEADER_SIZE + (addr & 0xffff) * block_size
+        return self._file(f"data_{(addr >> 16) & 0xff}")[offset:offset + size]
+
+    def addresses(self):
+        """
+        Yields the address of every entry, walking each hash bucket chain.
+        """
+        seen = set()
+        end = min(BLOCKFILE_TABLE_OFFSET + self.table_len * 4, len(self.index))
+        for offset in range(BLOCKFILE_TABLE_OFFSET, end - 3, 4):
+            addr = struct.unpack_from("<I", self.index, offset)[0]
+            while addr & ADDR_INITIALIZED and addr not in seen:
+                seen.add(addr)
+                yield addr
+                try:
+                    addr = ENTRY_STORE.unpack_from(self.read(addr, ENTRY_BLOCK_SIZE), 0)[1]
+                except (ValueError, struct.error, OSError):
+                    break
+
+    def entry(self, addr):
+        """
+        Returns (key, data_sizes, data_addrs) of the entry record at addr.
+        """
+        num_blocks = ((addr & ADDR_NUM_BLOCKS_MASK) >> ADDR_NUM_BLOCKS_OFFSET) + 1
+        record = self.read(addr, num_blocks * ENTRY_BLOCK_SIZE)
+        fields = ENTRY_STORE.unpack_from(record, 0)
+        key_len, long_key = fields[7], fields[8]
+        data_sizes, data_addrs = fields[9:13], fields[13:17]
+        if long_key:
+            key = self.read(long_key, key_len)
+        else:
+            key = record[ENTRY_KEY_OFFSET:ENTRY_KEY_OFFSET + key_len]
+        return bytes(key).decode("utf-8", "replace"), data_sizes, data_addrs
+
+
+def _blockfile_rows(cache_dir, browser, user_profile, batch_size, filters=None):
+    cache = BlockfileCache(cache_dir)
+    try:
+        rows = RecordTable(CACHE_HEADERS)
+        for addr in cache.addresses():
+            try:
+                key, data_sizes, data_addrs = cache.entry(addr)
+                response_info = cache.read(data_addrs[0], data_sizes[0])
+            except (ValueError, struct.error, OSError):
+                continue
+            row = _entry_row(key, response_info, data_sizes[1], "blockfile", f"0x{addr:08x}", browser, user_profile, cache_dir)
+            if not _row_kept(row, filters):
+                continue
+            rows.append(row)
+            if len(rows) >= batch_size:
+                yield rows
+                rows = RecordTable(CACHE_HEADERS)
+        if rows:
+            yield rows
+    finally:
+        cache.close()
+
+
+def is_blockfile_cache(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "index"), "rb") as f:
+            magic = f.read(4)
+    except OSError:
+        return False
+    return len(magic) == 4 and struct.unpack("<I", magic)[0] == BLOCKFILE_INDEX_MAGIC
+
+
+def _parse_chunk(task, browser, user_profile, filters):
+    cache_dir, entry_files = task
+    return _simple_rows(entry_files, browser, user_profile, cache_dir, filters)
+
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def iter_cache_entries(cache_dirs, browser, user_profile, workers=1, pool="process", batch_size=ENTRY_CHUNK_SIZE, filters=None):
+    """
+    Yields RecordTable batches of CACHE_HEADERS rows for every entry of the given Chromium
+    cache folders. Only keys, response headers and stream sizes are read; bodies
+    are left on disk for read_cache_body.
+
+    Simple cache entries are split into chunks of batch_size files that are
+    spread across workers; a blockfile cache keeps its entries in shared block
+    files and is read by the calling process. As with iter_artifacts, a browser
+    or user_profile of None is derived from the path of each cache folder.
+
+    An ExtractionFilter is applied to each entry's response time and URL as it is
+    parsed.
+    """
+    for cache_dir in cache_dirs:
+        cache_browser = browser if browser is not None else browser_for_path(cache_dir)
+        cache_user_profile = user_profile if user_profile is not None else user_profile_for_path(cache_dir)
+        if is_blockfile_cache(cache_dir):
+            try:
+                yield from _blockfile_rows(cache_dir, cache_browser, cache_user_profile, batch_size, filters)
+            except (ValueError, OSError) as e:
+                print(f"Error reading cache {cache_dir}: {e}")
+            continue
+
+        try:
+            entry_files = sorted(name for name in os.listdir(cache_dir) if SIMPLE_ENTRY_FILE.match(name))
+        except OSError as e:
+            print(f"Error reading cache {cache_dir}: {e}")
+            continue
+        tasks = [(cache_dir, chunk) for chunk in _chunks(entry_files, batch_size)]
+        for rows in map_files(_parse_chunk, tasks, cache_browser, cache_user_profile, filters, workers=workers, pool=pool):
+            if rows:
+                yield rows
+
+
+def _decode_body(body, encoding):
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def read_cache_body(cache_dir, entry, decode=True):
+    """
+    Returns the stored body of one cache entry, identified by the Source and Entry
+    columns of its row. With decode set, gzip and deflate bodies are decompressed
+    according to their Content-Encoding; other encodings are returned as stored.
+    """
+    if is_blockfile_cache(cache_dir):
+        cache = BlockfileCache(cache_dir)
+        try:
+            _, data_sizes, data_addrs = cache.entry(int(entry, 16))
+            response_info = bytes(cache.read(data_addrs[0], data_sizes[0]))
+            body = bytes(cache.read(data_addrs[1], data_sizes[1]))
+        finally:
+            cache.close()
+    else:
+        data = _map_file(os.path.join(cache_dir, entry))
+        try:
+            simple_entry = SimpleEntry(data)
+            response_info = bytes(simple_entry.response_info())
+            body = simple_entry.body()
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+
+    if not decode:
+        return body
+    _, headers = parse_headers(parse_response_info(response_info)[2])
+    return _decode_body(body, (headers.get("content-encoding") or "").lower())
@@ -0,0 +1,74 @@
+import calendar
+from datetime import datetime
+from urllib.parse import urlsplit
+
+
+def parse_time(value):
+    """
+    Returns Unix seconds for a UTC date or date and time in ISO format, e.g.
+    "2024-03-01" or "2024-03-01 14:30:00". A time with a UTC offset, e.g.
+    "2024-03-01 16:30:00+02:00", is converted to UTC.
+    """
+    return calendar.timegm(datetime.fromisoformat(value.strip()).utctimetuple())
+
+
+def normalize_host(pattern):
+    """
+    Returns a host pattern in the form it is matched in: lower case, without a
+    leading "*." or "." and without a trailing dot.
+    """
+    pattern = pattern.strip().lower()
+    if pattern.startswith("*."):
+        pattern = pattern[2:]
+    return pattern.strip(".")
+
+
+class ExtractionFilter:
+    """
+    Row filters applied while extracting, so rows outside them never reach Python.
+
+    since and until are Unix seconds and bound the time of each record (both
+    inclusive). hosts are domains: "example.com" matches example.com and every
+    subdomain of it. visit_types and danger_types are names as they appear in the
+    Visit Type and Danger Type columns.
+
+    Each filter applies to the artifacts that have its field: the time window to
+    every artifact, hosts to history, searches, cookies and cache entries, visit
+    types to history and danger types to downloads. The extraction plan turns them
+    into SQL predicates; url_matches and time_matches give the same answer in
+    Python for sources that are not SQLite, such as the disk cache.
+    """
+
+    def __init__(self, since=None, until=None, hosts=None, visit_types=None, danger_types=None):
+        self.since = since
+        self.until = until
+        self.hosts = [normalize_host(host) for host in hosts or [] if normalize_host(host)]
+        self.visit_types = list(visit_types or [])
+        self.danger_types = list(danger_types or [])
+
+    def __bool__(self):
+        return any((self.since is not None, self.until is not None, self.hosts, self.visit_types, self.danger_types))
+
+    def host_matches(self, host):
+        if not self.hosts:
+            return True
+        if not host:
+            return False
+        host = host.lower().strip(".")
+        return any(host == pattern or host.endswith("." + pattern) for pattern in self.hosts)
+
+    def url_matches(self, url):
+        if not self.hosts:
+            return True
+        try:
+            host = urlsplit(url).hostname
+        except (TypeError, ValueError):
+            return False
+        return self.host_matches(host)
+
+    def time_matches(self, seconds):
+        if self.since is None and self.until is None:
+            return True
+        if seconds is None:
+            return False
+        return (self.since is None or seconds >= self.since) and (self.until is None or seconds <= self.until)
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Bumped whenever the layout or formatting of extracted rows changes, so rows
+# cached by an older version are not served back
+CACHE_VERSION = 3
+
+
+def fingerprint(db_file):
+    """
+    Returns (size, mtime, sha256) for a database file. The hash also covers a
+    pending -wal file, since SQLite applies it when the database is read.
+    """
+    stat = os.stat(db_file)
+    digest = hashlib.sha256()
+    for path in (db_file, db_file + "-wal"):
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+    return stat.st_size, stat.st_mtime, digest.hexdigest()
+
+
+class ExtractionCache:
+    """
+    Local SQLite store of extracted rows keyed on the source database.
+
+    Each entry records the fingerprint of the source file at extraction time; rows
+    are only served back while the file still has the same size, mtime and hash.
+    """
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        self.conn = sqlite3.connect(cache_file)
+        if self.conn.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.conn.executescript("DROP TABLE IF EXISTS batches; DROP TABLE IF EXISTS sources;")
+            self.conn.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.conn.executescript('''
+        CREATE TABLE IF NOT EXISTS sources (
+            id INTEGER PRIMARY KEY,
+            artifact TEXT NOT NULL,
+            db_file TEXT NOT NULL,
+            browser TEXT NOT NULL,
+            user_profile TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL,
+            UNIQUE (artifact, db_file, browser, user_profile)
+        );
+        CREATE TABLE IF NOT EXISTS batches (
+            source_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            rows TEXT NOT NULL,
+            PRIMARY KEY (source_id, seq)
+        );
+        ''')
+        # Source databases served whole from the cache, and those parsed again
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, artifact, db_file, browser, user_profile, file_fingerprint):
+        """
+        Returns the cache entry id if rows for this source are cached and the file is
+        unchanged, otherwise None.
+        """
+        row = self.conn.execute(
+            "SELECT id, size, mtime, sha256 FROM sources WHERE artifact = ? AND db_file = ? AND browser = ? AND user_profile = ?",
+            (artifact, db_file, browser, user_profile)
+        ).fetchone()
+        if row is None or tuple(row[1:]) != tuple(file_fingerprint):
+            return None
+        return row[0]
+
+    def lookup_file(self, db_file, artifacts, browser, user_profile, file_fingerprint):
+        """
+        Returns {artifact: cache entry id} when every requested artifact of a
+        database is cached for its current fingerprint, otherwise None, and counts
+        the database as a hit or a miss. A database with only some artifacts
+        cached is parsed again, so it counts as a miss.
+        """
+        sources = None
+        if file_fingerprint:
+            sources = {artifact: self.lookup(artifact, db_file, browser, user_profile, file_fingerprint) for artifact in artifacts}
+        if sources is None or None in sources.values():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return sources
+
+    def iter_batches(self, source_id):
+        """
+        Yields the cached row batches of an entry in their original order.
+        """
+        cursor = self.conn.execute("SELECT rows FROM batches WHERE source_id = ? ORDER BY seq", (source_id,))
+        for (rows,) in cursor:
+            yield json.loads(rows)
+
+    def store(self, artifact, db_file, browser, user_profile, file_fingerprint, batches):
+        """
+        Replaces the cached rows for a source. Rows that cannot be serialized leave
+        the source uncached.
+        """
+        try:
+            encoded = [json.dumps(batch, ensure_ascii=False) for batch in batches]
+        except (TypeError, ValueError):
+            return
+
+        size, mtime, sha256 = file_fingerprint
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM batches WHERE source_id IN (SELECT id FROM sources WHERE artifact = ? AND db_file = ? AND browser = ? AND user_profile = ?)",
+                (artifact, db_file, browser, user_profile)
+            )
+            self.conn.execute(
+                "DELETE FROM sources WHERE artifact = ? AND db_file = ? AND browser = ? AND user_profile = ?",
+                (artifact, db_file, browser, user_profile)
+            )
+            cursor = self.conn.execute(
+                "INSERT INTO sources (artifact, db_file, browser, user_profile, size, mtime, sha256) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (artifact, db_file, browser, user_profile, size, mtime, sha256)
+            )
+            self.conn.executemany(
+                "INSERT INTO batches (source_id, seq, rows) VALUES (?, ?, ?)",
+                ((cursor.lastrowid, seq, rows) for seq, rows in enumerate(encoded))
+            )
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,207 @@
+import io
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Functions listed in the report when profiling is enabled
+PROFILE_TOP = 30
+
+
+def peak_rss_mb():
+    """
+    Returns the peak resident set size of the current process in MiB, or None where
+    the platform does not report it. The value only ever grows, so comparing it
+    between stages shows which stage raised the high-water mark.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return None
+
+
+def _rate(count, seconds):
+    return round(count / seconds) if count is not None and seconds else None
+
+
+class SourceTimer:
+    """
+    Times the work done for one source database. Time spent while the extraction
+    generator is suspended at a yield is excluded by stopping the clock around it,
+    so a slow writer downstream is not blamed on the file being read.
+    """
+
+    def __init__(self, db_file):
+        self.record = {
+            "source": db_file,
+            "bytes": file_size(db_file),
+            "query_seconds": 0.0,
+            "convert_seconds": 0.0,
+            "rows": {},
+        }
+        self.start = time.perf_counter()
+        self.paused = 0.0
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record[f"{name}_seconds"] += time.perf_counter() - start
+
+    @contextmanager
+    def pause(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.paused += time.perf_counter() - start
+
+    def add_rows(self, artifact, count):
+        self.record["rows"][artifact] = self.record["rows"].get(artifact, 0) + count
+
+    def finish(self):
+        seconds = time.perf_counter() - self.start - self.paused
+        record = self.record
+        record["seconds"] = round(seconds, 4)
+        record["query_seconds"] = round(record["query_seconds"], 4)
+        record["convert_seconds"] = round(record["convert_seconds"], 4)
+        record["rows_per_sec"] = _rate(sum(record["rows"].values()), seconds)
+        record["mb_per_sec"] = round(record["bytes"] / (1024 * 1024) / seconds, 2) if record["bytes"] and seconds else None
+        record["peak_rss_mb"] = peak_rss_mb()
+        return record
+
+
+class RunMetrics:
+    """
+    Collects per-stage and per-source timings for one run and renders them as a
+    JSON report.
+
+    Stages are named blocks of work (discovery, extract, filter, write_history...).
+    Entering the same stage again adds to its totals, so a stage can wrap every
+    batch of a streamed run. Sources are the per-database records produced while
+    extracting. With profile set, the run is also profiled with cProfile; only the
+    calling process is covered, not the workers of a process pool.
+    """
+
+    def __init__(self, profile=False):
+        self.stages = {}
+        self.sources = []
+        self.started = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.profiler = None
+        if profile:
+            # Only imported when profiling, to keep it off the startup path
+            import cProfile
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def _stage(self, name):
+        return self.stages.setdefault(name, {"seconds": 0.0, "calls": 0, "rows": 0})
+
+    @contextmanager
+    def stage(self, name, rows=None, nbytes=None):
+        """
+        Times the wrapped block under the given stage. rows and nbytes are added
+        to the stage totals when given. The stage totals are yielded so extra
+        counters can be recorded on them.
+        """
+        stage = self._stage(name)
+        start = time.perf_counter()
+        try:
+            yield stage
+        finally:
+            stage["seconds"] += time.perf_counter() - start
+            stage["calls"] += 1
+            if rows is not None:
+                stage["rows"] += rows
+            if nbytes is not None:
+                stage["bytes"] = stage.get("bytes", 0) + nbytes
+            stage["peak_rss_mb"] = peak_rss_mb()
+
+    def timed_batches(self, name, batches, nbytes=None):
+        """
+        Yields from an iterator of (dataset, rows) batches, charging the time spent
+        producing each batch and its row count to the given stage. nbytes is the
+        input size the stage reads, if known.
+        """
+        if nbytes is not None:
+            stage = self._stage(name)
+            stage["bytes"] = stage.get("bytes", 0) + nbytes
+        batches = iter(batches)
+        while True:
+            with self.stage(name):
+                try:
+                    dataset, rows = next(batches)
+                except StopIteration:
+                    return
+            self._stage(name)["rows"] += len(rows)
+            yield dataset, rows
+
+    def add_source(self, record):
+        self.sources.append(record)
+
+    def report(self):
+        seconds = time.perf_counter() - self.start
+        stages = []
+        for name, totals in self.stages.items():
+            stage = {"stage": name, **totals, "seconds": round(totals["seconds"], 4)}
+            stage["rows_per_sec"] = _rate(totals["rows"], totals["seconds"]) if totals["rows"] else None
+            if "bytes" in totals:
+                stage["mb_per_sec"] = round(totals["bytes"] / (1024 * 1024) / totals["seconds"], 2) if totals["seconds"] else None
+            stages.append(stage)
+
+        report = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "seconds": round(seconds, 4),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+            # Slowest databases first so outliers are at the top
+            "sources": sorted(self.sources, key=lambda record: record.get("seconds") or 0, reverse=True),
+        }
+        if self.profiler is not None:
+            report["profile"] = self.profile_stats()
+        return report
+
+    def profile_stats(self, top=PROFILE_TOP):
+        import pstats
+        self.profiler.disable()
+        stats = pstats.Stats(self.profiler, stream=io.StringIO())
+        functions = []
+        for (file_name, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+            functions.append({
+                "function": f"{file_name}:{line}({function})",
+                "calls": calls,
+                "own_seconds": round(own, 4),
+                "cumulative_seconds": round(cumulative, 4),
+            })
+        functions.sort(key=lambda entry: entry["cumulative_seconds"], reverse=True)
+        return functions[:top]
+
+    def dump_profile(self, profile_file):
+        """
+        Writes the raw cProfile data, readable with pstats or snakeviz.
+        """
+        self.profiler.disable()
+        self.profiler.dump_stats(profile_file)
+
+    def write(self, report_file):
+        with open(report_file, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=4)
@@ -0,0 +1,92 @@
+import os
+from PyQt5.QtCore import QObject, pyqtSignal
+from modules.disk_cache import iter_cache_entries
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts
+from modules.search import SearchIndex
+from modules.writers import CsvWriter
+
+
+class ParseWorker(QObject):
+    """
+    Runs discovery and extraction off the UI thread.
+
+    Each database is parsed once for every dataset in headers, followed by the
+    disk cache folders when headers includes "cache". Rows are emitted
+    batch by batch through rows_ready as they are extracted, and written to the
+    default CSV files in the output folder at the same time. A search index is
+    built per dataset alongside and handed over through index_ready once parsing
+    ends. cancel() stops the run after the current batch. Browser and user
+    profile are taken from each database's path unless given.
+    """
+
+    status = pyqtSignal(str)
+    progress = pyqtSignal(int, int)
+    rows_ready = pyqtSignal(str, object)
+    index_ready = pyqtSignal(str, object)
+    finished = pyqtSignal(bool)
+    failed = pyqtSignal(str)
+
+    def __init__(self, root_folder, output_folder, headers, browser=None, user_profile=None):
+        super().__init__()
+        self.root_folder = root_folder
+        self.output_folder = output_folder
+        self.headers = headers
+        self.browser = browser
+        self.user_profile = user_profile
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        writers = {}
+        try:
+            self.status.emit("Discovering profile files...")
+            profile_files = find_browser_profile_files(self.root_folder)
+            files = database_files(profile_files)
+            cache_dirs = profile_files.get("cache", []) if "cache" in self.headers else []
+            total = len(files) + len(cache_dirs)
+            done = 0
+            self.progress.emit(done, total)
+
+            indexes = {}
+            for dataset, headers in self.headers.items():
+                writers[dataset] = CsvWriter(headers, os.path.join(self.output_folder, f"{dataset}.csv"))
+                indexes[dataset] = SearchIndex(dataset, headers)
+
+            for db_file in files:
+                if self.cancelled:
+                    break
+                self.status.emit(f"Parsing {db_file}")
+                for dataset, rows in iter_artifacts(self.browser, [db_file], self.user_profile, list(self.headers)):
+                    writers[dataset].write_rows(rows)
+                    indexes[dataset].add_rows(rows)
+                    self.rows_ready.emit(dataset, rows)
+                    if self.cancelled:
+                        break
+                done += 1
+                self.progress.emit(done, total)
+
+            for cache_dir in cache_dirs:
+                if self.cancelled:
+                    break
+                self.status.emit(f"Parsing cache {cache_dir}")
+                for rows in iter_cache_entries([cache_dir], self.browser, self.user_profile):
+                    writers["cache"].write_rows(rows)
+                    indexes["cache"].add_rows(rows)
+                    self.rows_ready.emit("cache", rows)
+                    if self.cancelled:
+                        break
+                done += 1
+                self.progress.emit(done, total)
+
+            for dataset, index in indexes.items():
+                self.index_ready.emit(dataset, index)
+            for writer in writers.values():
+                writer.close()
+            self.finished.emit(not self.cancelled)
+
+        except Exception as e:
+            for writer in writers.values():
+                writer.close()
+            self.failed.emit(str(e))
@@ -1,6 +1,14 @@
+import json
 import sqlite3
-import os
-from modules.utils import convert_webkit_time, convert_firefox_time
+from itertools import chain
+from urllib.parse import unquote, urlsplit
+from modules.utils import webkit_time_sql, firefox_time_sql, WEBKIT_EPOCH_OFFSET
+from modules.scheduler import map_files
+from modules.discovery import discover_artifacts, browser_for_path, user_profile_for_path
+from modules.incremental import fingerprint
+from modules.database import open_database
+from modules.metrics import SourceTimer
+from modules.records import RecordTable
 
 TRANSITION_TYPES = {
     0: 'Link',
@@ -39,7 +47,42 @@ INTERRUPT_REASON_MAP = {
     12: "Browser Shutdown"
 }
 
-def find_browser_profile_files(root_folder):
+# Firefox download states (nsIDownloadManager), reported as the interrupt reason
+FIREFOX_DOWNLOAD_STATES = {
+    0: "Downloading",
+    1: "No Interrupt",
+    2: "Failed",
+    3: "Canceled",
+    4: "Paused",
+    5: "Queued",
+    6: "Blocked (Parental Controls)",
+    7: "Scanning",
+    8: "Virus Detected",
+    9: "Blocked (Policy)"
+}
+
+# Rows fetched from SQLite and handed downstream at a time
+BATCH_SIZE = 5000
+
+# Column layout of the rows produced by each extractor
+HISTORY_HEADERS = ["Visit Time", "URL", "Title", "Visit Count", "Visit Type", "Duration", "Browser", "User Profile", "Source"]
+DOWNLOADS_HEADERS = ["Start Time", "End Time", "File Path", "Total Bytes", "Received Bytes", "Danger Type", "Interrupt Reason", "Opened", "Browser", "User Profile", "Source"]
+SEARCHES_HEADERS = ["Last Visit Time", "Search Term", "URL", "Title", "Browser", "User Profile", "Source"]
+COOKIES_HEADERS = ["Host", "Name", "Value", "Creation Time", "Last Access Time", "Expiry Time", "Secure", "HTTP Only", "Browser", "User Profile", "Source"]
+
+# Every artifact the extraction plan produces, in output order
+ARTIFACT_HEADERS = {
+    "history": HISTORY_HEADERS,
+    "downloads": DOWNLOADS_HEADERS,
+    "searches": SEARCHES_HEADERS,
+    "cookies": COOKIES_HEADERS,
+}
+ARTIFACTS = list(ARTIFACT_HEADERS)
+
+# Discovery buckets holding SQLite databases; the plan picks queries by schema
+DATABASE_BUCKETS = ("history", "cookies")
+
+def find_browser_profile_files(root_folder, index_file=None, rebuild_index=False):
     profile_files = {
         "history": [],
         "cookies": [],
@@ -47,102 +90,412 @@ def find_browser_profile_files(root_folder):
         "cache": []
     }
 
-    for dirpath, _, filenames in os.walk(root_folder):
-        for file in filenames:
-            if file == "History":
-                profile_files["history"].append(os.path.join(dirpath, file))
-            elif file == "Cookies":
-                profile_files["cookies"].append(os.path.join(dirpath, file))
-            elif file == "places.sqlite":  # Firefox
-                profile_files["history"].append(os.path.join(dirpath, file))
+    for path, _, _, artifact_type in discover_artifacts(root_folder, index_file, rebuild_index):
+        profile_files[artifact_type].append(path)
 
     return profile_files
 
-def extract_history(browser, files, user_profile):
+def _chromium_history_rows(rows, browser, user_profile, db_file):
     history = []
-    for db_file in files:
-        try:
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
+    for row in rows:
+        url, title, visit_count, last_visit_time, visit_time_utc, visit_duration, from_visit, transition = row
+        visit_duration_sec = visit_duration / 1000000 if visit_duration else 0
+        visit_type = TRANSITION_TYPES.get(transition & 0xFF, 'Unknown')
+        history.append([visit_time_utc, url, title, visit_count, visit_type, visit_duration_sec, browser, user_profile, db_file])
+    return history
 
-            # Check tables in database
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-            tables = [table[0] for table in cursor.fetchall()]
-
-            if 'urls' in tables:
-                # Chromium-based history
-                query = '''
-                SELECT urls.url, urls.title, urls.visit_count, urls.last_visit_time, visits.visit_time, visits.visit_duration, visits.from_visit, visits.transition
-                FROM urls
-                JOIN visits ON urls.id = visits.url
-                '''
-                cursor.execute(query)
-                for row in cursor.fetchall():
-                    url, title, visit_count, last_visit_time, visit_time, visit_duration, from_visit, transition = row
-                    visit_time_utc = convert_webkit_time(visit_time)
-                    visit_duration_sec = visit_duration / 1000000 if visit_duration else 0
-                    visit_type = TRANSITION_TYPES.get(transition & 0xFF, 'Unknown')
-                    history.append([visit_time_utc, url, title, visit_count, visit_type, visit_duration_sec, browser, user_profile, db_file])
-
-            elif 'moz_places' in tables and 'moz_historyvisits' in tables:
-                # Firefox history
-                query = '''
-                SELECT moz_places.url, moz_places.title, moz_places.visit_count, moz_historyvisits.visit_date
-                FROM moz_places
-                JOIN moz_historyvisits ON moz_places.id = moz_historyvisits.place_id
-                '''
-                cursor.execute(query)
-                for row in cursor.fetchall():
-                    url, title, visit_count, visit_time = row
-                    visit_time_utc = convert_firefox_time(visit_time)
-                    history.append([visit_time_utc, url, title, visit_count, None, None, browser, user_profile, db_file])
-            conn.close()
-        except sqlite3.Error as e:
-            print(f"Error extracting history from {db_file}: {e}")
+def _firefox_history_rows(rows, browser, user_profile, db_file):
+    history = []
+    for row in rows:
+        url, title, visit_count, visit_time_utc = row
+        history.append([visit_time_utc, url, title, visit_count, None, None, browser, user_profile, db_file])
     return history
 
-def extract_downloads(browser, files, user_profile):
+def _chromium_downloads_rows(rows, browser, user_profile, db_file):
     downloads = []
-    for db_file in files:
+    for row in rows:
+        target_path, start_time_utc, total_bytes, received_bytes, danger_type, interrupt_reason, end_time_utc, opened = row
+        danger_description = DANGER_TYPE_MAP.get(danger_type, "Unknown")
+        interrupt_description = INTERRUPT_REASON_MAP.get(interrupt_reason, "Unknown")
+        opened_description = "Yes" if opened == 1 else "No"
+        downloads.append([start_time_utc, end_time_utc, target_path, total_bytes, received_bytes, danger_description, interrupt_description, opened_description, browser, user_profile, db_file])
+    return downloads
+
+def _file_uri_path(uri):
+    if not uri or not uri.startswith("file:"):
+        return uri
+    path = unquote(urlsplit(uri).path)
+    # file:///C:/Users/... -> C:/Users/...
+    if len(path) > 2 and path[0] == "/" and path[2] == ":":
+        path = path[1:]
+    return path
+
+def _firefox_downloads_rows(rows, browser, user_profile, db_file):
+    downloads = []
+    for row in rows:
+        destination_uri, start_time_utc, metadata = row
         try:
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-            query = '''
-            SELECT target_path, start_time, total_bytes, received_bytes, danger_type, interrupt_reason, end_time, opened
-            FROM downloads
-            '''
-            cursor.execute(query)
-            for row in cursor.fetchall():
-                target_path, start_time, total_bytes, received_bytes, danger_type, interrupt_reason, end_time, opened = row
-                start_time_utc = convert_webkit_time(start_time)
-                end_time_utc = convert_webkit_time(end_time) if end_time else None
-                danger_description = DANGER_TYPE_MAP.get(danger_type, "Unknown")
-                interrupt_description = INTERRUPT_REASON_MAP.get(interrupt_reason, "Unknown")
-                opened_description = "Yes" if opened == 1 else "No"
-                downloads.append([start_time_utc, end_time_utc, target_path, total_bytes, received_bytes, danger_description, interrupt_description, opened_description, browser, user_profile, db_file])
-            conn.close()
-        except sqlite3.Error as e:
-            print(f"Error extracting downloads from {db_file}: {e}")
+            metadata = json.loads(metadata) if metadata else {}
+        except ValueError:
+            metadata = {}
+        state = metadata.get("state")
+        file_size = metadata.get("fileSize")
+        # endTime is in milliseconds
+        end_time_utc = metadata["endTime"] // 1000 if isinstance(metadata.get("endTime"), int) and metadata["endTime"] else None
+        received_bytes = file_size if state == 1 else None
+        interrupt_description = FIREFOX_DOWNLOAD_STATES.get(state, "Unknown") if state is not None else None
+        downloads.append([start_time_utc, end_time_utc, _file_uri_path(destination_uri), file_size, received_bytes, None, interrupt_description, None, browser, user_profile, db_file])
     return downloads
 
-def extract_cookies(browser, files, user_profile):
+def _chromium_searches_rows(rows, browser, user_profile, db_file):
+    return [[last_visit_time_utc, term, url, title, browser, user_profile, db_file] for term, url, title, last_visit_time_utc in rows]
+
+def _chromium_cookies_rows(rows, browser, user_profile, db_file):
     cookies = []
-    for db_file in files:
-        try:
-            conn = sqlite3.connect(db_file)
-            cursor = conn.cursor()
-            query = '''
-            SELECT host_key, name, value, creation_utc, last_access_utc, expires_utc, is_secure, is_httponly
-            FROM cookies
-            '''
-            cursor.execute(query)
-            for row in cursor.fetchall():
-                host_key, name, value, creation_utc, last_access_utc, expires_utc, is_secure, is_httponly = row
-                creation_time_utc = convert_webkit_time(creation_utc)
-                last_access_time_utc = convert_webkit_time(last_access_utc)
-                expiry_time_utc = convert_webkit_time(expires_utc)
-                cookies.append([host_key, name, value, creation_time_utc, last_access_time_utc, expiry_time_utc, "Yes" if is_secure else "No", "Yes" if is_httponly else "No", browser, user_profile, db_file])
-            conn.close()
-        except sqlite3.Error as e:
-            print(f"Error extracting cookies from {db_file}: {e}")
+    for row in rows:
+        host_key, name, value, creation_time_utc, last_access_time_utc, expiry_time_utc, is_secure, is_httponly = row
+        cookies.append([host_key, name, value, creation_time_utc, last_access_time_utc, expiry_time_utc, "Yes" if is_secure else "No", "Yes" if is_httponly else "No", browser, user_profile, db_file])
     return cookies
+
+# Extraction plan: (artifact, tables the query needs, query, row converter,
+# filter columns). Each database is opened once, its schema is read once, and
+# every entry whose tables are all present runs on that connection, in this order.
+# Supporting a new artifact table only takes a new entry here.
+#
+# Filter columns tell _filter_clause where an ExtractionFilter applies:
+#   "time": (start column, end column, "webkit" or "firefox") bounding each
+#           record; both are the same column for records with a single time
+#   "url": URL column, narrowed with LIKE and checked exactly after conversion
+#   "host": host column; "rev_host": Firefox reversed host (moz_places.rev_host)
+#   "visit_type", "danger_type": code columns, or None when the records carry no
+#           such value and a filter on it can never match
+ARTIFACT_QUERIES = [
+    ("history", {"urls", "visits"}, f'''
+        SELECT urls.url, urls.title, urls.visit_count, urls.last_visit_time, {webkit_time_sql("visits.visit_time")}, visits.visit_duration, visits.from_visit, visits.transition
+        FROM urls
+        JOIN visits ON urls.id = visits.url
+        ''', _chromium_history_rows,
+        {"time": ("visits.visit_time", "visits.visit_time", "webkit"), "url": "urls.url", "visit_type": "(visits.transition & 255)"}),
+    ("history", {"moz_places", "moz_historyvisits"}, f'''
+        SELECT moz_places.url, moz_places.title, moz_places.visit_count, {firefox_time_sql("moz_historyvisits.visit_date")}
+        FROM moz_places
+        JOIN moz_historyvisits ON moz_places.id = moz_historyvisits.place_id
+        ''', _firefox_history_rows,
+        {"time": ("moz_historyvisits.visit_date", "moz_historyvisits.visit_date", "firefox"), "rev_host": "moz_places.rev_host", "visit_type": None}),
+    ("downloads", {"downloads"}, f'''
+        SELECT target_path, {webkit_time_sql("start_time")}, total_bytes, received_bytes, danger_type, interrupt_reason, {webkit_time_sql("end_time")}, opened
+        FROM downloads
+        ''', _chromium_downloads_rows,
+        {"time": ("start_time", "start_time", "webkit"), "danger_type": "danger_type"}),
+    ("downloads", {"moz_annos", "moz_anno_attributes"}, f'''
+        SELECT destination.content, {firefox_time_sql("destination.dateAdded")}, metadata.content
+        FROM moz_annos AS destination
+        JOIN moz_anno_attributes AS destination_name
+            ON destination.anno_attribute_id = destination_name.id AND destination_name.name = 'downloads/destinationFileURI'
+        LEFT JOIN moz_anno_attributes AS metadata_name ON metadata_name.name = 'downloads/metaData'
+        LEFT JOIN moz_annos AS metadata
+            ON metadata.place_id = destination.place_id AND metadata.anno_attribute_id = metadata_name.id
+        ''', _firefox_downloads_rows,
+        {"time": ("destination.dateAdded", "destination.dateAdded", "firefox"), "danger_type": None}),
+    ("searches", {"keyword_search_terms", "urls"}, f'''
+        SELECT keyword_search_terms.term, urls.url, urls.title, {webkit_time_sql("urls.last_visit_time")}
+        FROM keyword_search_terms
+        JOIN urls ON urls.id = keyword_search_terms.url_id
+        ''', _chromium_searches_rows,
+        {"time": ("urls.last_visit_time", "urls.last_visit_time", "webkit"), "url": "urls.url"}),
+    ("cookies", {"cookies"}, f'''
+        SELECT host_key, name, value, {webkit_time_sql("creation_utc")}, {webkit_time_sql("last_access_utc")}, {webkit_time_sql("expires_utc")}, is_secure, is_httponly
+        FROM cookies
+        ''', _chromium_cookies_rows,
+        # A cookie is in the window when it was created before its end and last
+        # used after its start
+        {"time": ("creation_utc", "last_access_utc", "webkit"), "host": "host_key"}),
+]
+
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+def _time_bound(seconds, epoch):
+    # Raw column value for Unix seconds, so the comparison can use an index
+    if epoch == "webkit":
+        return (seconds + WEBKIT_EPOCH_OFFSET) * 1000000
+    return seconds * 1000000
+
+def _filter_clause(filters, columns):
+    """
+    Returns (predicates, params) restricting a plan entry to an ExtractionFilter.
+    Filters the entry has no column for are left out.
+    """
+    predicates = []
+    params = []
+    if "time" in columns:
+        start, end, epoch = columns["time"]
+        if filters.since is not None:
+            predicates.append(f"{end} >= ?")
+            params.append(_time_bound(filters.since, epoch))
+        if filters.until is not None:
+            # 0 means "not set" and is not a time before the window
+            predicates.append(f"{start} > 0 AND {start} < ?")
+            params.append(_time_bound(filters.until + 1, epoch))
+
+    if filters.hosts:
+        alternatives = []
+        for host in filters.hosts:
+            pattern = _like_escape(host)
+            if "host" in columns:
+                alternatives.append(f"{columns['host']} LIKE ? ESCAPE '\\' OR {columns['host']} LIKE ? ESCAPE '\\'")
+                params.extend([pattern, "%." + pattern])
+            elif "rev_host" in columns:
+                # rev_host is the host reversed with a trailing dot: example.com -> moc.elpmaxe.
+                alternatives.append(f"{columns['rev_host']} LIKE ? ESCAPE '\\'")
+                params.append(_like_escape(host[::-1]) + ".%")
+            elif "url" in columns:
+                alternatives.append(f"{columns['url']} LIKE ? ESCAPE '\\'")
+                params.append("%" + pattern + "%")
+        if alternatives:
+            predicates.append("(" + " OR ".join(alternatives) + ")")
+
+    for key, names, type_map in (("visit_type", filters.visit_types, TRANSITION_TYPES), ("danger_type", filters.danger_types, DANGER_TYPE_MAP)):
+        if not names or key not in columns:
+            continue
+        codes = [code for code, name in type_map.items() if name in names]
+        if columns[key] is None or not codes:
+            predicates.append("0")
+        else:
+            predicates.append(f"{columns[key]} IN ({', '.join('?' for _ in codes)})")
+            params.extend(codes)
+    return predicates, params
+
+def database_files(profile_files):
+    """
+    Returns every discovered database the extraction plan runs over.
+    """
+    return [path for bucket in DATABASE_BUCKETS for path in profile_files.get(bucket, [])]
+
+def _iter_database(db_file, browser, user_profile, artifacts, batch_size, snapshot, errors, timer=None, filters=None):
+    """
+    Runs every applicable query of the extraction plan on one connection and
+    yields (artifact, RecordTable) batches. Failures are appended to errors as
+    (artifact, message), with artifact None when the database could not be read
+    at all, and do not stop the remaining queries.
+
+    With an ExtractionFilter, each query gets a WHERE clause so SQLite skips the
+    rows outside it; host matches on URLs are confirmed after conversion.
+
+    With a SourceTimer, time spent in SQLite and in row conversion is recorded on
+    it, and the time the caller holds each batch is left out.
+    """
+    timer = timer or SourceTimer(db_file)
+    try:
+        with open_database(db_file, snapshot) as conn:
+            cursor = conn.cursor()
+            with timer.phase("query"):
+                cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+                tables = {table[0] for table in cursor.fetchall()}
+
+            for artifact, required_tables, query, convert, filter_columns in ARTIFACT_QUERIES:
+                if artifact not in artifacts or not required_tables <= tables:
+                    continue
+                params = []
+                url_index = None
+                if filters:
+                    predicates, params = _filter_clause(filters, filter_columns)
+                    if predicates:
+                        query = f"{query} WHERE {' AND '.join(predicates)}"
+                    if filters.hosts and "url" in filter_columns:
+                        url_index = ARTIFACT_HEADERS[artifact].index("URL")
+                try:
+                    with timer.phase("query"):
+                        cursor.execute(query, params)
+                    while True:
+                        with timer.phase("query"):
+                            rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        with timer.phase("convert"):
+                            rows = convert(rows, browser, user_profile, db_file)
+                            if url_index is not None:
+                                rows = [row for row in rows if filters.url_matches(row[url_index])]
+                            rows = RecordTable.from_rows(ARTIFACT_HEADERS[artifact], rows)
+                        if not rows:
+                            continue
+                        timer.add_rows(artifact, len(rows))
+                        with timer.pause():
+                            yield artifact, rows
+                except sqlite3.Error as e:
+                    errors.append((artifact, str(e)))
+    except sqlite3.Error as e:
+        errors.append((None, str(e)))
+
+def _report_errors(db_file, errors):
+    for artifact, message in errors:
+        if artifact is None:
+            print(f"Error reading {db_file}: {message}")
+        else:
+            print(f"Error extracting {artifact} from {db_file}: {message}")
+
+def _file_fingerprint(db_file):
+    try:
+        return fingerprint(db_file)
+    except OSError:
+        return None
+
+def _store_file(cache, db_file, browser, user_profile, file_fingerprint, batches, errors):
+    # Artifacts that failed are left out so they are retried on the next run;
+    # artifacts the database has no tables for are stored empty
+    failed = {artifact for artifact, _ in errors}
+    if None in failed:
+        return
+    for artifact, artifact_batches in batches.items():
+        if artifact not in failed:
+            cache.store(artifact, db_file, browser, user_profile, file_fingerprint, [list(batch.raw_rows()) for batch in artifact_batches])
+
+def _iter_cached(cache, sources, timer=None):
+    for artifact, source_id in sources.items():
+        for batch in cache.iter_batches(source_id):
+            batch = RecordTable.from_rows(ARTIFACT_HEADERS[artifact], batch)
+            if timer is None:
+                yield artifact, batch
+                continue
+            timer.add_rows(artifact, len(batch))
+            with timer.pause():
+                yield artifact, batch
+
+def _source_record(timer, errors=(), cached=False):
+    record = timer.finish()
+    record["cached"] = cached
+    record["errors"] = len(errors)
+    return record
+
+def _source_labels(db_file, browser, user_profile):
+    # None means the label is taken from the database's own path
+    if browser is None:
+        browser = browser_for_path(db_file)
+    if user_profile is None:
+        user_profile = user_profile_for_path(db_file)
+    return browser, user_profile
+
+def _iter_file(db_file, artifacts, browser, user_profile, batch_size, cache, snapshot, metrics, filters):
+    browser, user_profile = _source_labels(db_file, browser, user_profile)
+    timer = SourceTimer(db_file) if metrics is not None else None
+    file_fingerprint = None
+    if cache is not None:
+        file_fingerprint = _file_fingerprint(db_file)
+        sources = cache.lookup_file(db_file, artifacts, browser, user_profile, file_fingerprint)
+        if sources is not None:
+            yield from _iter_cached(cache, sources, timer)
+            if timer is not None:
+                metrics.add_source(_source_record(timer, cached=True))
+            return
+
+    batches = {artifact: [] for artifact in artifacts}
+    errors = []
+    for artifact, batch in _iter_database(db_file, browser, user_profile, artifacts, batch_size, snapshot, errors, timer, filters):
+        if file_fingerprint:
+            batches[artifact].append(batch)
+        yield artifact, batch
+    _report_errors(db_file, errors)
+
+    if file_fingerprint:
+        _store_file(cache, db_file, browser, user_profile, file_fingerprint, batches, errors)
+    if timer is not None:
+        metrics.add_source(_source_record(timer, errors))
+
+def _collect_file(db_file, artifacts, browser, user_profile, snapshot, filters):
+    # Runs in a pool worker; the timing record travels back with the rows
+    browser, user_profile = _source_labels(db_file, browser, user_profile)
+    timer = SourceTimer(db_file)
+    rows = {artifact: RecordTable(ARTIFACT_HEADERS[artifact]) for artifact in artifacts}
+    errors = []
+    for artifact, batch in _iter_database(db_file, browser, user_profile, artifacts, BATCH_SIZE, snapshot, errors, timer, filters):
+        rows[artifact].extend(batch)
+    return rows, errors, _source_record(timer, errors)
+
+def iter_artifacts(browser, files, user_profile, artifacts=ARTIFACTS, workers=1, pool="process", batch_size=BATCH_SIZE, cache=None, snapshot="auto", metrics=None, filters=None):
+    """
+    Extracts the requested artifacts from each database in one pass and yields
+    (artifact, rows) batches. Batches of one artifact come in file order; batches
+    of different artifacts from the same file may interleave.
+
+    Each batch is a RecordTable: it iterates as formatted rows like a list of
+    lists, but holds timestamps as Unix seconds and repeated labels once, and
+    tables can be combined with RecordTable.extend() to keep results compact.
+
+    browser and user_profile label every row; pass None to derive them from the
+    path of each database instead, so one call can cover several browsers and
+    users.
+
+    With a RunMetrics, a timing record is added for every database once it has
+    been read. In parallel runs the record is taken in the worker, and its peak
+    memory is that of the worker process.
+
+    An ExtractionFilter is pushed down into each query. Filtered runs bypass the
+    incremental cache, which only holds complete extractions.
+    """
+    artifacts = [artifact for artifact in ARTIFACTS if artifact in artifacts]
+    if filters:
+        cache = None
+    if workers <= 1:
+        # Serial runs stream each database batch by batch
+        for db_file in files:
+            yield from _iter_file(db_file, artifacts, browser, user_profile, batch_size, cache, snapshot, metrics, filters)
+        return
+
+    # Unchanged databases are served from the cache; only the rest go to the pool
+    fingerprints = {}
+    cached = {}
+    if cache is not None:
+        for db_file in files:
+            fingerprints[db_file] = _file_fingerprint(db_file)
+            sources = cache.lookup_file(db_file, artifacts, *_source_labels(db_file, browser, user_profile), fingerprints[db_file])
+            if sources is not None:
+                cached[db_file] = sources
+
+    # Parallel runs hand back one batch per artifact and database, merged in input order
+    pending = [db_file for db_file in files if db_file not in cached]
+    results = map_files(_collect_file, pending, artifacts, browser, user_profile, snapshot, filters, workers=workers, pool=pool)
+    for db_file in files:
+        if db_file in cached:
+            timer = SourceTimer(db_file) if metrics is not None else None
+            yield from _iter_cached(cache, cached[db_file], timer)
+            if timer is not None:
+                metrics.add_source(_source_record(timer, cached=True))
+            continue
+
+        rows, errors, record = next(results)
+        if metrics is not None:
+            metrics.add_source(record)
+        _report_errors(db_file, errors)
+        if fingerprints.get(db_file):
+            _store_file(cache, db_file, *_source_labels(db_file, browser, user_profile), fingerprints[db_file], {artifact: [batch] for artifact, batch in rows.items()}, errors)
+        for artifact in artifacts:
+            if rows[artifact]:
+                yield artifact, rows[artifact]
+
+def _iter_artifact(artifact, browser, files, user_profile, workers, pool, batch_size, cache, snapshot, filters):
+    for _, rows in iter_artifacts(browser, files, user_profile, (artifact,), workers, pool, batch_size, cache, snapshot, filters=filters):
+        yield rows
+
+def iter_history(browser, files, user_profile, workers=1, pool="process", batch_size=BATCH_SIZE, cache=None, snapshot="auto", filters=None):
+    return _iter_artifact("history", browser, files, user_profile, workers, pool, batch_size, cache, snapshot, filters)
+
+def iter_downloads(browser, files, user_profile, workers=1, pool="process", batch_size=BATCH_SIZE, cache=None, snapshot="auto", filters=None):
+    return _iter_artifact("downloads", browser, files, user_profile, workers, pool, batch_size, cache, snapshot, filters)
+
+def iter_searches(browser, files, user_profile, workers=1, pool="process", batch_size=BATCH_SIZE, cache=None, snapshot="auto", filters=None):
+    return _iter_artifact("searches", browser, files, user_profile, workers, pool, batch_size, cache, snapshot, filters)
+
+def iter_cookies(browser, files, user_profile, workers=1, pool="process", batch_size=BATCH_SIZE, cache=None, snapshot="auto", filters=None):
+    return _iter_artifact("cookies", browser, files, user_profile, workers, pool, batch_size, cache, snapshot, filters)
+
+def extract_history(browser, files, user_profile, workers=1, pool="process", cache=None, snapshot="auto", filters=None):
+    return list(chain.from_iterable(iter_history(browser, files, user_profile, workers, pool, cache=cache, snapshot=snapshot, filters=filters)))
+
+def extract_downloads(browser, files, user_profile, workers=1, pool="process", cache=None, snapshot="auto", filters=None):
+    return list(chain.from_iterable(iter_downloads(browser, files, user_profile, workers, pool, cache=cache, snapshot=snapshot, filters=filters)))
+
+def extract_searches(browser, files, user_profile, workers=1, pool="process", cache=None, snapshot="auto", filters=None):
+    return list(chain.from_iterable(iter_searches(browser, files, user_profile, workers, pool, cache=cache, snapshot=snapshot, filters=filters)))
+
+def extract_cookies(browser, files, user_profile, workers=1, pool="process", cache=None, snapshot="auto", filters=None):
+    return list(chain.from_iterable(iter_cookies(browser, files, user_profile, workers, pool, cache=cache, snapshot=snapshot, filters=filters)))
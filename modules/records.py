@@ -0,0 +1,359 @@
+import calendar
+from array import array
+from datetime import datetime, timedelta
+from modules.columnar import TIMESTAMP_COLUMNS, INTEGER_COLUMNS, FLOAT_COLUMNS
+
+# Columns with few distinct values per case, stored once and referenced by code
+DICTIONARY_COLUMNS = {
+    "Browser", "User Profile", "Source", "Host", "Visit Type", "Danger Type", "Interrupt Reason",
+    "Opened", "Secure", "HTTP Only", "Content Type", "Content Encoding", "Cache Format",
+}
+
+# Stands for NULL in integer and timestamp columns
+NULL_INT = -2 ** 63
+
+UNIX_EPOCH = datetime(1970, 1, 1)
+
+
+def format_timestamp(seconds):
+    """
+    Formats Unix seconds as UTC text ("%Y-%m-%d %H:%M:%S"). Returns None for NULL
+    and for values outside the years 1-9999, as SQLite's datetime() does.
+    """
+    if seconds is None:
+        return None
+    try:
+        return (UNIX_EPOCH + timedelta(seconds=seconds)).isoformat(" ")
+    except (OverflowError, ValueError):
+        return None
+
+
+def parse_timestamp(value):
+    """
+    Returns Unix seconds for a timestamp formatted by format_timestamp, so rows
+    that were already formatted can be packed again.
+    """
+    return calendar.timegm((int(value[0:4]), int(value[5:7]), int(value[8:10]), int(value[11:13]), int(value[14:16]), int(value[17:19])))
+
+
+class ListColumn:
+    """
+    Fallback column holding any Python value.
+    """
+
+    def __init__(self, values=None):
+        self.data = values if values is not None else []
+
+    def append(self, value):
+        self.data.append(value)
+
+    def __getitem__(self, row):
+        return self.data[row]
+
+    def __len__(self):
+        return len(self.data)
+
+    def formatted(self):
+        return self.data
+
+    values = formatted
+
+    def extend_values(self, values):
+        self.data.extend(values)
+
+    def extend_column(self, other):
+        self.data.extend(other[row] for row in range(len(other)))
+
+
+class IntColumn:
+    """
+    64-bit integers in an array, with NULL_INT for missing values.
+    """
+
+    def __init__(self):
+        self.data = array("q")
+
+    def append(self, value):
+        self.data.append(NULL_INT if value is None else value)
+
+    def __getitem__(self, row):
+        value = self.data[row]
+        return None if value == NULL_INT else value
+
+    def __len__(self):
+        return len(self.data)
+
+    def values(self):
+        return [None if value == NULL_INT else value for value in self.data]
+
+    formatted = values
+
+    def extend_values(self, values):
+        # Built as a new array first so a bad value leaves the column unchanged
+        self.data.extend(array("q", [NULL_INT if value is None else value for value in values]))
+
+    def extend_column(self, other):
+        if type(other) is type(self):
+            self.data.extend(other.data)
+        else:
+            for row in range(len(other)):
+                self.append(other[row])
+
+
+class TimestampColumn(IntColumn):
+    """
+    Unix seconds, formatted as text only when rows are read out. Formatted values
+    are accepted too and parsed back to seconds.
+    """
+
+    def append(self, value):
+        if isinstance(value, str):
+            value = parse_timestamp(value)
+        elif isinstance(value, float):
+            value = int(value)
+        super().append(value)
+
+    def extend_values(self, values):
+        try:
+            super().extend_values(values)
+        except TypeError:
+            for value in values:
+                self.append(value)
+
+    def formatted(self):
+        return [None if value == NULL_INT else format_timestamp(value) for value in self.data]
+
+
+class TextTimestampColumn(ListColumn):
+    """
+    Fallback for a timestamp column holding values that are not timestamps; numbers
+    are formatted as they arrive and anything else is kept as is.
+    """
+
+    def append(self, value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = format_timestamp(int(value))
+        self.data.append(value)
+
+    def extend_values(self, values):
+        for value in values:
+            self.append(value)
+
+    def extend_column(self, other):
+        for row in range(len(other)):
+            self.append(other[row])
+
+
+class FloatColumn:
+    """
+    Doubles in an array; NaN stands for a missing value.
+    """
+
+    def __init__(self):
+        self.data = array("d")
+
+    def append(self, value):
+        self.data.append(float("nan") if value is None else value)
+
+    def __getitem__(self, row):
+        value = self.data[row]
+        return None if value != value else value
+
+    def __len__(self):
+        return len(self.data)
+
+    def formatted(self):
+        return [None if value != value else value for value in self.data]
+
+    values = formatted
+
+    def extend_values(self, values):
+        self.data.extend(array("d", [float("nan") if value is None else value for value in values]))
+
+    def extend_column(self, other):
+        if type(other) is type(self):
+            self.data.extend(other.data)
+        else:
+            for row in range(len(other)):
+                self.append(other[row])
+
+
+class DictionaryColumn:
+    """
+    Dictionary-encoded values: each distinct value is kept once and rows hold a
+    32-bit code into the dictionary.
+    """
+
+    def __init__(self):
+        self.codes = array("I")
+        self.dictionary = []
+        self.lookup = {}
+
+    def code(self, value):
+        code = self.lookup.get(value)
+        if code is None:
+            code = self.lookup[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return code
+
+    def append(self, value):
+        self.codes.append(self.code(value))
+
+    def __getitem__(self, row):
+        return self.dictionary[self.codes[row]]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def formatted(self):
+        dictionary = self.dictionary
+        return [dictionary[code] for code in self.codes]
+
+    values = formatted
+
+    def extend_values(self, values):
+        lookup = self.lookup
+        self.codes.extend(array("I", [lookup[value] if value in lookup else self.code(value) for value in values]))
+
+    def extend_column(self, other):
+        if type(other) is type(self):
+            mapping = [self.code(value) for value in other.dictionary]
+            self.codes.extend(mapping[code] for code in other.codes)
+        else:
+            for row in range(len(other)):
+                self.append(other[row])
+
+
+def new_column(header):
+    if header in TIMESTAMP_COLUMNS:
+        return TimestampColumn()
+    if header in DICTIONARY_COLUMNS:
+        return DictionaryColumn()
+    if header in INTEGER_COLUMNS:
+        return IntColumn()
+    if header in FLOAT_COLUMNS:
+        return FloatColumn()
+    return ListColumn()
+
+
+class RecordTable:
+    """
+    Compact column store for extracted records.
+
+    Timestamps are kept as Unix seconds and numbers in typed arrays, and repeated
+    strings such as Browser, User Profile and Source are dictionary-encoded, so a
+    row costs a few bytes per column instead of a list of Python objects.
+    Iterating yields rows as lists with timestamps formatted, which is what the
+    writers, the search index and the GUI consume. Raw rows (timestamps as Unix
+    seconds) are appended with append()/extend() and read back with raw_rows().
+
+    A typed column that receives a value it cannot hold, such as text in a count
+    column of a damaged database, falls back to a plain list for that column.
+    """
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.columns = [new_column(header) for header in headers]
+        self.length = 0
+
+    @classmethod
+    def from_rows(cls, headers, rows):
+        table = cls(headers)
+        table.extend(rows)
+        return table
+
+    def _fallback(self, index, count):
+        # Replaces a typed column with a list column holding its first count rows
+        column = self.columns[index]
+        if isinstance(column, TimestampColumn):
+            fallback = TextTimestampColumn(column.formatted()[:count])
+        else:
+            fallback = ListColumn([column[row] for row in range(count)])
+        self.columns[index] = fallback
+        return fallback
+
+    def append(self, row):
+        for index, (column, value) in enumerate(zip(self.columns, row)):
+            try:
+                column.append(value)
+            except (TypeError, ValueError, OverflowError):
+                self._fallback(index, self.length).append(value)
+        self.length += 1
+
+    def extend(self, rows):
+        """
+        Appends raw rows, or every row of another RecordTable with the same headers.
+        """
+        if isinstance(rows, RecordTable):
+            for index, (column, other) in enumerate(zip(self.columns, rows.columns)):
+                try:
+                    column.extend_column(other)
+                except (TypeError, ValueError, OverflowError):
+                    # Rows the failed extend already copied are dropped and added again
+                    self._fallback(index, self.length).extend_column(other)
+            self.length += rows.length
+            return
+        rows = rows if isinstance(rows, list) else list(rows)
+        if not rows:
+            return
+        for index, values in enumerate(zip(*rows)):
+            try:
+                self.columns[index].extend_values(values)
+            except (TypeError, ValueError, OverflowError):
+                self._fallback(index, self.length).extend_values(values)
+        self.length += len(rows)
+
+    def take(self, rows):
+        """
+        Returns a new RecordTable holding the given rows of this one, in that order.
+        """
+        table = RecordTable(self.headers)
+        for index, column in enumerate(self.columns):
+            values = [column[row] for row in rows]
+            try:
+                table.columns[index].extend_values(values)
+            except (TypeError, ValueError, OverflowError):
+                table._fallback(index, 0).extend_values(values)
+        table.length = len(rows)
+        return table
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return map(list, zip(*(column.formatted() for column in self.columns)))
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self.length
+        if not 0 <= row < self.length:
+            raise IndexError("RecordTable index out of range")
+        return [self.cell(row, index) for index in range(len(self.columns))]
+
+    def cell(self, row, index):
+        """
+        Returns one value as it is written out, i.e. with timestamps formatted.
+        """
+        column = self.columns[index]
+        if isinstance(column, TimestampColumn):
+            return format_timestamp(column[row])
+        return column[row]
+
+    def raw_rows(self):
+        """
+        Yields rows with timestamps as Unix seconds, e.g. for serialization.
+        """
+        for row in range(self.length):
+            yield [column[row] for column in self.columns]
+
+    def column_values(self, index):
+        """
+        Returns the formatted values of one column.
+        """
+        return self.columns[index].formatted()
+
+    def raw_values(self, index):
+        """
+        Returns the raw values of one column, with timestamps as Unix seconds.
+        """
+        return self.columns[index].values()
@@ -0,0 +1,25 @@
+POOL_TYPES = ("process", "thread")
+
+
+def map_files(func, files, *args, workers=1, pool="process"):
+    """
+    Yields func(db_file, *args) for every file, in the order the files were given.
+
+    With more than one worker the files are spread across a process or thread pool;
+    results are still yielded in input order so the merged output matches a serial run.
+    """
+    files = list(files)
+    if workers <= 1 or len(files) <= 1:
+        for db_file in files:
+            yield func(db_file, *args)
+        return
+
+    if pool not in POOL_TYPES:
+        raise ValueError(f"Unsupported pool type '{pool}'. Choose from {', '.join(POOL_TYPES)}.")
+
+    # Imported here: the pools pull in multiprocessing, which serial runs never need
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    executor_class = ProcessPoolExecutor if pool == "process" else ThreadPoolExecutor
+    repeated_args = [[arg] * len(files) for arg in args]
+    with executor_class(max_workers=min(workers, len(files))) as executor:
+        yield from executor.map(func, files, *repeated_args)
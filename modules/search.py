@@ -0,0 +1,102 @@
+import sqlite3
+
+# Columns covered by search, per dataset
+SEARCH_COLUMNS = {
+    "history": ["URL", "Title"],
+    "downloads": ["File Path"],
+    "searches": ["Search Term", "URL"],
+    "cookies": ["Host", "Name"],
+    "cache": ["URL"],
+    "timeline": ["Location", "Description"],
+}
+
+# Shortest query the trigram index can answer; shorter ones fall back to a scan
+MIN_INDEXED_QUERY = 3
+
+
+def search_column_indexes(dataset, headers):
+    return [headers.index(header) for header in SEARCH_COLUMNS.get(dataset, []) if header in headers]
+
+
+def row_texts(row, column_indexes):
+    """
+    Returns the searchable values of a row, case-folded by Python as row_matches
+    folds them.
+    """
+    return [None if row[i] is None else str(row[i]).lower() for i in column_indexes]
+
+
+def row_matches(row, column_indexes, query):
+    """
+    Case-insensitive substring match of query against the searchable columns of a row.
+    """
+    query = query.lower()
+    return any(row[i] is not None and query in str(row[i]).lower() for i in column_indexes)
+
+
+def filter_rows(rows, dataset, headers, query):
+    """
+    Yields the rows matching query, using the same rules as SearchIndex.
+    """
+    column_indexes = search_column_indexes(dataset, headers)
+    for row in rows:
+        if row_matches(row, column_indexes, query):
+            yield row
+
+
+class SearchIndex:
+    """
+    In-memory full-text index over the searchable columns of one dataset.
+
+    Rows are identified by their position in the order they were added, which is
+    also their row number in the GUI table model. Substring queries are answered by
+    an SQLite FTS5 trigram index when available, so a search does not have to visit
+    every row.
+
+    Each searchable column is indexed on its own, so a query never matches across
+    two of them. Values and queries are case-folded in Python rather than by
+    SQLite, whose lower() only folds ASCII, so the index, the scan used without
+    FTS5 and row_matches agree on non-ASCII text too.
+    """
+
+    def __init__(self, dataset, headers):
+        self.column_indexes = search_column_indexes(dataset, headers)
+        self.columns = [f"c{position}" for position in range(len(self.column_indexes))] or ["c0"]
+        self.row_count = 0
+        # Built on the parser thread and queried from the UI thread afterwards
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        columns = ", ".join(self.columns)
+        try:
+            self.conn.execute(f"CREATE VIRTUAL TABLE rows USING fts5({columns}, tokenize='trigram case_sensitive 1')")
+            self.fts = True
+        except sqlite3.OperationalError:
+            self.conn.execute(f"CREATE TABLE rows ({columns})")
+            self.fts = False
+
+    def add_rows(self, rows):
+        first = self.row_count
+        # A dataset without searchable columns still gets one, always NULL
+        entries = [(first + offset, *(row_texts(row, self.column_indexes) or [None])) for offset, row in enumerate(rows)]
+        placeholders = ", ".join("?" for _ in self.columns)
+        with self.conn:
+            self.conn.executemany(f"INSERT INTO rows (rowid, {', '.join(self.columns)}) VALUES (?, {placeholders})", entries)
+        self.row_count += len(entries)
+
+    def search(self, query):
+        """
+        Returns the ids of matching rows in ascending order, or None for an empty query.
+        """
+        if not query:
+            return None
+        query = query.lower()
+        if self.fts and len(query) >= MIN_INDEXED_QUERY:
+            # A phrase matches within one column
+            phrase = '"' + query.replace('"', '""') + '"'
+            cursor = self.conn.execute("SELECT rowid FROM rows WHERE rows MATCH ? ORDER BY rowid", (phrase,))
+        else:
+            condition = " OR ".join(f"instr({column}, ?) > 0" for column in self.columns)
+            cursor = self.conn.execute(f"SELECT rowid FROM rows WHERE {condition} ORDER BY rowid", (query,) * len(self.columns))
+        return [row_id for (row_id,) in cursor]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,347 @@
+import asyncio
+import itertools
+import json
+import lzma
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts, ARTIFACT_HEADERS, TRANSITION_TYPES, DANGER_TYPE_MAP
+from modules.disk_cache import iter_cache_entries, CACHE_HEADERS
+from modules.filters import ExtractionFilter, parse_time
+
+# Every dataset streamed per job: the database artifacts, then the disk cache
+OUTPUT_HEADERS = {**ARTIFACT_HEADERS, "cache": CACHE_HEADERS}
+
+# Request bodies are read and written to disk in chunks of this size
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Seconds a client gets to send the request line and headers
+HEADER_TIMEOUT = 30
+MAX_HEADER_SIZE = 64 * 1024
+
+# Encoded result batches buffered per job before extraction waits for the client
+RESULT_QUEUE_SIZE = 4
+
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+# Raised while unpacking a damaged, encrypted or unsupported archive. gzip and
+# bz2 data errors are OSErrors too, told apart from I/O errors by having no errno.
+ARCHIVE_ERRORS = (zipfile.BadZipFile, zlib.error, lzma.LZMAError, EOFError, tarfile.TarError, NotImplementedError, RuntimeError)
+
+# Marks the end of a job's results on its queue
+_DONE = object()
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _safe_path(root, name):
+    path = os.path.realpath(os.path.join(root, name))
+    if path != root and not path.startswith(root + os.sep):
+        raise RequestError(400, f"Archive member escapes the upload folder: {name}")
+    return path
+
+
+def extract_archive(archive_file, destination, max_bytes):
+    """
+    Unpacks a zip or tar (optionally compressed) archive into destination.
+    Members with absolute paths or .. components, links and device files are
+    rejected, as are archives that unpack to more than max_bytes. Tar members are
+    unpacked with the "data" filter, so no file gets a setuid bit or is left
+    writable by others. Archives that cannot be read raise RequestError(400).
+    """
+    try:
+        _unpack(archive_file, destination, max_bytes)
+    except ARCHIVE_ERRORS as e:
+        raise RequestError(400, f"Archive could not be unpacked: {e}")
+    except OSError as e:
+        if e.errno is not None:
+            raise
+        raise RequestError(400, f"Archive could not be unpacked: {e}")
+
+
+def _unpack(archive_file, destination, max_bytes):
+    destination = os.path.realpath(destination)
+    if zipfile.is_zipfile(archive_file):
+        with zipfile.ZipFile(archive_file) as archive:
+            members = archive.infolist()
+            if sum(member.file_size for member in members) > max_bytes:
+                raise RequestError(413, "Archive unpacks to more than the size limit.")
+            for member in members:
+                _safe_path(destination, member.filename)
+            archive.extractall(destination)
+        return
+
+    try:
+        archive = tarfile.open(archive_file)
+    except tarfile.TarError:
+        raise RequestError(400, "Upload is not a zip or tar archive.")
+    with archive:
+        members = archive.getmembers()
+        total = 0
+        for member in members:
+            if not (member.isfile() or member.isdir()):
+                raise RequestError(400, f"Archive member is not a regular file or folder: {member.name}")
+            _safe_path(destination, member.name)
+            total += member.size
+        if total > max_bytes:
+            raise RequestError(413, "Archive unpacks to more than the size limit.")
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(destination, members=members, filter="data")
+        else:
+            # Python without extraction filters: the members were checked above,
+            # and their modes and owners are not applied
+            for member in members:
+                archive.extract(member, destination, set_attrs=False)
+
+
+def parse_filters(query):
+    """
+    Builds an ExtractionFilter from the query string of an upload: since, until,
+    host, visit_type and danger_type, the last three repeatable. Returns None
+    when no filter is given.
+    """
+    params = parse_qs(query)
+    try:
+        since = parse_time(params["since"][0]) if "since" in params else None
+        until = parse_time(params["until"][0]) if "until" in params else None
+    except ValueError:
+        raise RequestError(400, "since and until must be YYYY-MM-DD or 'YYYY-MM-DD HH:MM:SS' (UTC).")
+    for key, choices in (("visit_type", TRANSITION_TYPES.values()), ("danger_type", DANGER_TYPE_MAP.values())):
+        unknown = [value for value in params.get(key, []) if value not in choices]
+        if unknown:
+            raise RequestError(400, f"Unknown {key}: {', '.join(unknown)}")
+    filters = ExtractionFilter(since, until, params.get("host"), params.get("visit_type"), params.get("danger_type"))
+    return filters or None
+
+
+def _json_line(record):
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+def _encode_batch(dataset, rows):
+    headers = OUTPUT_HEADERS[dataset]
+    return "".join(_json_line({"dataset": dataset, "row": dict(zip(headers, row))}) for row in rows).encode("utf-8")
+
+
+class Job:
+    def __init__(self, job_id, folder, filters):
+        self.id = job_id
+        self.folder = folder
+        self.filters = filters
+        self.cancelled = False
+
+
+class ExtractionService:
+    """
+    Local HTTP service that extracts uploaded profile bundles.
+
+    POST /extract takes a zip or tar archive of profile folders as the request
+    body and answers with NDJSON streamed while the job runs: a "queued" event,
+    a "started" event, one {"dataset": ..., "row": {...}} line per extracted row
+    and a final "done" (or "error") event with the row counts. GET /health
+    reports the load.
+
+    At most jobs extractions run at once on a thread pool; up to max_pending more
+    wait for a slot, and uploads beyond that are refused with 503 and a
+    Retry-After header before their body is read. Each job hands its results to
+    the connection through a queue of RESULT_QUEUE_SIZE batches, so a slow client
+    holds up its own extraction instead of letting results pile up in memory. A
+    job whose client disconnects is stopped after the current batch.
+    """
+
+    def __init__(self, jobs=2, max_pending=8, max_upload_bytes=1024 ** 3, max_extract_bytes=4 * 1024 ** 3, workers=1, work_folder=None):
+        self.jobs = jobs
+        self.max_pending = max_pending
+        self.max_upload_bytes = max_upload_bytes
+        self.max_extract_bytes = max_extract_bytes
+        self.workers = workers
+        self.work_folder = work_folder
+        self.executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="extract")
+        self.slots = None
+        self.admitted = 0
+        self.running = 0
+        self.completed = 0
+        self.job_ids = itertools.count(1)
+
+    async def handle(self, reader, writer):
+        try:
+            try:
+                method, target, headers = await asyncio.wait_for(self.read_head(reader), HEADER_TIMEOUT)
+                path = urlsplit(target).path
+                if path == "/health":
+                    if method != "GET":
+                        raise RequestError(405, "Use GET.")
+                    await self.send_json(writer, 200, self.health())
+                elif path == "/extract":
+                    if method != "POST":
+                        raise RequestError(405, "Use POST with the archive as the body.")
+                    await self.extract(reader, writer, urlsplit(target).query, headers)
+                else:
+                    raise RequestError(404, f"No such endpoint: {path}")
+            except RequestError as e:
+                await self.send_json(writer, e.status, {"error": str(e)},
+                                     {"Retry-After": "5"} if e.status == 503 else None)
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                pass
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def read_head(self, reader):
+        head = await reader.readuntil(b"\r\n\r\n")
+        if len(head) > MAX_HEADER_SIZE:
+            raise RequestError(400, "Request headers too large.")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise RequestError(400, "Malformed request line.")
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+        return method.upper(), target, headers
+
+    def health(self):
+        return {
+            "running": self.running, "waiting": self.admitted - self.running, "completed": self.completed,
+            "jobs": self.jobs, "max_pending": self.max_pending,
+        }
+
+    async def send_json(self, writer, status, body, extra_headers=None):
+        data = json.dumps(body).encode("utf-8")
+        head = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}", "Content-Type: application/json",
+                f"Content-Length: {len(data)}", "Connection: close"]
+        head += [f"{name}: {value}" for name, value in (extra_headers or {}).items()]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + data)
+        await writer.drain()
+
+    async def send_chunk(self, writer, data):
+        if data:
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+
+    async def read_upload(self, reader, headers, archive_file):
+        if "chunked" in headers.get("transfer-encoding", "").lower():
+            raise RequestError(411, "Send the archive with a Content-Length.")
+        try:
+            remaining = int(headers["content-length"])
+        except (KeyError, ValueError):
+            raise RequestError(411, "Send the archive with a Content-Length.")
+        if remaining > self.max_upload_bytes:
+            raise RequestError(413, f"Uploads are limited to {self.max_upload_bytes} bytes.")
+        with open(archive_file, "wb") as f:
+            while remaining > 0:
+                chunk = await reader.read(min(UPLOAD_CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise asyncio.IncompleteReadError(b"", remaining)
+                f.write(chunk)
+                remaining -= len(chunk)
+
+    async def extract(self, reader, writer, query, headers):
+        filters = parse_filters(query)
+        # Admission is decided before the body is read, so a full service costs
+        # a refused upload nothing
+        if self.admitted >= self.jobs + self.max_pending:
+            raise RequestError(503, "Too many extraction jobs; retry later.")
+        self.admitted += 1
+        folder = tempfile.mkdtemp(prefix="bft-job-", dir=self.work_folder)
+        job = Job(next(self.job_ids), folder, filters)
+        try:
+            archive_file = os.path.join(folder, "upload")
+            await self.read_upload(reader, headers, archive_file)
+            root = os.path.join(folder, "root")
+            loop = asyncio.get_running_loop()
+            # On the job threads, so unpacking counts against the same limit as extracting
+            await loop.run_in_executor(self.executor, extract_archive, archive_file, root, self.max_extract_bytes)
+            os.remove(archive_file)
+
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                         b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            await self.send_chunk(writer, _json_line({"event": "queued", "job": job.id, "waiting": self.admitted - self.running - 1}).encode("utf-8"))
+            async with self.slots:
+                self.running += 1
+                try:
+                    await self.send_chunk(writer, _json_line({"event": "started", "job": job.id}).encode("utf-8"))
+                    await self.stream_job(job, root, writer)
+                finally:
+                    self.running -= 1
+                    self.completed += 1
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.admitted -= 1
+            shutil.rmtree(folder, ignore_errors=True)
+
+    async def stream_job(self, job, root, writer):
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=RESULT_QUEUE_SIZE)
+        future = loop.run_in_executor(self.executor, self.run_job, job, root, loop, queue)
+        try:
+            while True:
+                item = await queue.get()
+                if item is _DONE:
+                    break
+                await self.send_chunk(writer, item)
+        except (ConnectionError, OSError):
+            # The client is gone: stop the job and let it run out
+            job.cancelled = True
+            while await queue.get() is not _DONE:
+                pass
+            raise
+        finally:
+            await future
+
+    def run_job(self, job, root, loop, queue):
+        # Runs on the extraction pool; put() blocks while the queue is full
+        def put(item):
+            asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+        start = time.perf_counter()
+        counts = dict.fromkeys(OUTPUT_HEADERS, 0)
+        try:
+            profile_files = find_browser_profile_files(root)
+            files = database_files(profile_files)
+            batches = itertools.chain(
+                iter_artifacts(None, files, None, workers=self.workers, filters=job.filters),
+                (("cache", rows) for rows in iter_cache_entries(profile_files.get("cache", []), None, None, workers=self.workers, filters=job.filters)),
+            )
+            for dataset, rows in batches:
+                if job.cancelled:
+                    break
+                put(_encode_batch(dataset, rows))
+                counts[dataset] += len(rows)
+            put(_json_line({"event": "done", "job": job.id, "rows": counts, "seconds": round(time.perf_counter() - start, 4)}).encode("utf-8"))
+        except Exception as e:
+            put(_json_line({"event": "error", "job": job.id, "message": str(e)}).encode("utf-8"))
+        finally:
+            put(_DONE)
+
+    async def serve(self, host="127.0.0.1", port=8765, ready=None):
+        """
+        Serves until cancelled. ready, if given, is called with the bound
+        (host, port), which is useful with port 0.
+        """
+        self.slots = asyncio.Semaphore(self.jobs)
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_SIZE)
+        if ready is not None:
+            ready(server.sockets[0].getsockname()[:2])
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
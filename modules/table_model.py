@@ -0,0 +1,203 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QAbstractProxyModel, QModelIndex
+from modules.records import RecordTable
+
+
+class ColumnTableModel(QAbstractTableModel):
+    """
+    Read-only table model backed by a RecordTable.
+
+    Cells are only turned into display text when the view asks for them, so
+    loading a result set costs a few typed arrays instead of one Qt item per cell.
+    columns exposes the raw column values (timestamps as Unix seconds), which
+    sort the same way as their formatted text.
+    """
+
+    def __init__(self, headers, parent=None, search_columns=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.table = RecordTable(headers)
+        self.search_columns = search_columns
+        self.search_index = None
+
+    @property
+    def columns(self):
+        return self.table.columns
+
+    @property
+    def row_count(self):
+        return len(self.table)
+
+    def set_rows(self, rows):
+        self.beginResetModel()
+        self.table = RecordTable(self.headers)
+        self.search_index = None
+        self.table.extend(rows)
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        if not isinstance(rows, RecordTable):
+            rows = RecordTable.from_rows(self.headers, rows)
+        if not rows:
+            return
+        self.beginInsertRows(QModelIndex(), self.row_count, self.row_count + len(rows) - 1)
+        self.table.extend(rows)
+        self.endInsertRows()
+
+    def row(self, row):
+        return self.table[row]
+
+    def find_rows(self, keyword):
+        """
+        Returns the rows with a searchable cell containing keyword (case-insensitive),
+        or None when keyword is empty. Uses the search index once one has been
+        attached and scans the columns otherwise.
+        """
+        if not keyword:
+            return None
+        if self.search_index is not None and self.search_index.row_count == self.row_count:
+            return self.search_index.search(keyword)
+
+        keyword = keyword.lower()
+        matches = set()
+        indexes = range(len(self.headers)) if self.search_columns is None else self.search_columns
+        for index in indexes:
+            for row, value in enumerate(self.table.column_values(index)):
+                if value is not None and keyword in str(value).lower():
+                    matches.add(row)
+        return matches
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.row_count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return str(self.table.cell(index.row(), index.column()))
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        if orientation == Qt.Horizontal:
+            return self.headers[section]
+        return str(section + 1)
+
+
+class RowOrderProxyModel(QAbstractProxyModel):
+    """
+    Proxy that sorts and filters a ColumnTableModel by keeping a list of source row
+    numbers. Sorting runs over the column lists directly instead of comparing
+    cells through the model, which keeps it fast on large tables.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.rows = []
+        self.positions = None
+        self.filter_rows = None
+        self.sort_column = -1
+        self.sort_order = Qt.AscendingOrder
+
+    def setSourceModel(self, model):
+        self.beginResetModel()
+        super().setSourceModel(model)
+        model.modelReset.connect(self.refresh)
+        model.rowsInserted.connect(self.source_rows_inserted)
+        self._rebuild()
+        self.endResetModel()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.filter_rows = None
+        self._rebuild()
+        self.endResetModel()
+
+    def source_rows_inserted(self, parent, first, last):
+        if self.sort_column < 0 and self.filter_rows is None:
+            # Unsorted and unfiltered: new rows simply go at the end
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + last - first)
+            self.rows.extend(range(first, last + 1))
+            self.positions = None
+            self.endInsertRows()
+        else:
+            self.beginResetModel()
+            self._rebuild()
+            self.endResetModel()
+
+    def set_filter_rows(self, rows):
+        """
+        Shows only the given source rows. None shows every row.
+        """
+        self.beginResetModel()
+        self.filter_rows = None if rows is None else set(rows)
+        self._rebuild()
+        self.endResetModel()
+
+    def _rebuild(self):
+        model = self.sourceModel()
+        count = model.rowCount() if model is not None else 0
+        if self.filter_rows is None:
+            rows = range(count)
+        else:
+            rows = sorted(row for row in self.filter_rows if row < count)
+
+        if model is not None and 0 <= self.sort_column < len(model.columns):
+            column = model.columns[self.sort_column]
+            # (is None, value) keeps empty cells together without comparing None to values
+            self.rows = sorted(rows, key=lambda row: (column[row] is None, column[row]),
+                               reverse=self.sort_order == Qt.DescendingOrder)
+        else:
+            self.rows = list(rows)
+        self.positions = None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.layoutAboutToBeChanged.emit()
+        self.sort_column = column
+        self.sort_order = order
+        self._rebuild()
+        self.layoutChanged.emit()
+
+    def source_rows(self):
+        """
+        Returns the visible source rows in display order.
+        """
+        return self.rows
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.rows)) or not (0 <= column < self.columnCount()):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        model = self.sourceModel()
+        return 0 if parent.isValid() or model is None else model.columnCount()
+
+    def mapToSource(self, proxy_index):
+        if not proxy_index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[proxy_index.row()], proxy_index.column())
+
+    def mapFromSource(self, source_index):
+        if not source_index.isValid():
+            return QModelIndex()
+        if self.positions is None:
+            self.positions = {row: position for position, row in enumerate(self.rows)}
+        position = self.positions.get(source_index.row())
+        if position is None:
+            return QModelIndex()
+        return self.createIndex(position, source_index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        if role != Qt.DisplayRole:
+            return None
+        return str(section + 1)
@@ -0,0 +1,139 @@
+import heapq
+import json
+import tempfile
+from operator import itemgetter
+from modules.parsing import ARTIFACT_HEADERS
+from modules.disk_cache import CACHE_HEADERS
+from modules.records import RecordTable, format_timestamp
+
+TIMELINE_HEADERS = ["Time", "Event", "Artifact", "Location", "Description", "Browser", "User Profile", "Source"]
+
+# Events taken from each dataset: (time column, event, location column,
+# description column). A row gives one event per time column that is set.
+TIMELINE_EVENTS = {
+    "history": [("Visit Time", "Page Visited", "URL", "Title")],
+    "downloads": [
+        ("Start Time", "Download Started", "File Path", "Total Bytes"),
+        ("End Time", "Download Finished", "File Path", "Interrupt Reason"),
+    ],
+    "searches": [("Last Visit Time", "Searched", "URL", "Search Term")],
+    "cookies": [
+        ("Creation Time", "Cookie Created", "Host", "Name"),
+        ("Last Access Time", "Cookie Accessed", "Host", "Name"),
+        ("Expiry Time", "Cookie Expires", "Host", "Name"),
+    ],
+    "cache": [("Response Time", "Response Cached", "URL", "Content Type")],
+}
+
+DATASET_HEADERS = {**ARTIFACT_HEADERS, "cache": CACHE_HEADERS}
+
+# Events sorted in memory before a run is spilled to a temporary file
+RUN_SIZE = 200000
+
+# Sort key of an event: its time, then the order it was added in
+EVENT_ORDER = itemgetter(0, 1)
+
+
+def _spill(events, temp_dir):
+    # One JSON array per line; the file is read back in order by the merge
+    run = tempfile.TemporaryFile("w+", encoding="utf-8", dir=temp_dir)
+    for event in events:
+        run.write(json.dumps(event, ensure_ascii=False, default=str))
+        run.write("\n")
+    run.seek(0)
+    return run
+
+
+def _read_run(run):
+    for line in run:
+        yield json.loads(line)
+
+
+class TimelineBuilder:
+    """
+    Merges the rows of several datasets into one stream of events in time order.
+
+    Rows are turned into events as they are added. Events are buffered and sorted
+    in runs of run_size; once more than one run is needed, each sorted run is
+    written to a temporary file and the runs are merged with a k-way heap merge
+    when the timeline is read, so memory stays bounded by run_size however large
+    the case. Events at the same second keep the order they were added in.
+
+    Iterating yields TIMELINE_HEADERS rows and can be done once; the builder can
+    be handed straight to a writer. close() removes the temporary files.
+    """
+
+    def __init__(self, run_size=RUN_SIZE, temp_dir=None):
+        self.run_size = run_size
+        self.temp_dir = temp_dir
+        self.events = []
+        self.runs = []
+        self.count = 0
+
+    def add_rows(self, dataset, rows):
+        """
+        Adds the events of a batch of dataset rows, given as a RecordTable or as
+        formatted rows. Datasets without timestamps are ignored.
+        """
+        events = TIMELINE_EVENTS.get(dataset)
+        if not events:
+            return
+        headers = DATASET_HEADERS[dataset]
+        if not isinstance(rows, RecordTable):
+            rows = RecordTable.from_rows(headers, rows)
+        if not rows:
+            return
+
+        labels = [rows.raw_values(headers.index(header)) for header in ("Browser", "User Profile", "Source")]
+        for time_column, event, location_column, description_column in events:
+            times = rows.raw_values(headers.index(time_column))
+            locations = rows.column_values(headers.index(location_column))
+            descriptions = rows.column_values(headers.index(description_column))
+            for seconds, location, description, browser, user_profile, source in zip(times, locations, descriptions, *labels):
+                if not isinstance(seconds, int):
+                    # Unset, or text left by a damaged timestamp column
+                    continue
+                self.events.append((seconds, self.count, event, dataset, location, description, browser, user_profile, source))
+                self.count += 1
+            if len(self.events) >= self.run_size:
+                self._flush()
+
+    def _flush(self):
+        self.events.sort(key=EVENT_ORDER)
+        self.runs.append(_spill(self.events, self.temp_dir))
+        self.events = []
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        self.events.sort(key=EVENT_ORDER)
+        if self.runs:
+            merged = heapq.merge(self.events, *(_read_run(run) for run in self.runs), key=EVENT_ORDER)
+        else:
+            merged = self.events
+        for seconds, _, *event in merged:
+            yield [format_timestamp(seconds), *event]
+
+    def close(self):
+        for run in self.runs:
+            run.close()
+        self.runs = []
+        self.events = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def build_timeline(datasets, run_size=RUN_SIZE, temp_dir=None):
+    """
+    Returns a TimelineBuilder over {dataset: rows}, e.g. the results of
+    extract_history, extract_downloads and extract_cookies.
+    """
+    builder = TimelineBuilder(run_size, temp_dir)
+    for dataset, rows in datasets.items():
+        builder.add_rows(dataset, rows)
+    return builder
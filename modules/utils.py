@@ -1,17 +1,26 @@
 
-import csv
-from datetime import datetime, timedelta
+# Seconds between the WebKit epoch (1601-01-01) and the Unix epoch (1970-01-01)
+WEBKIT_EPOCH_OFFSET = 11644473600
 
-def convert_webkit_time(microseconds):
-    epoch_start = datetime(1601, 1, 1)
-    delta = timedelta(microseconds=microseconds)
-    return (epoch_start + delta).strftime('%Y-%m-%d %H:%M:%S')
+def webkit_to_unix(microseconds):
+    """
+    Converts a WebKit timestamp to Unix seconds, the form timestamps are kept in
+    until output. 0 and NULL come back as None.
+    """
+    if not microseconds:
+        return None
+    return microseconds // 1000000 - WEBKIT_EPOCH_OFFSET
 
-def convert_firefox_time(milliseconds):
-    return datetime.utcfromtimestamp(milliseconds / 1000000).strftime('%Y-%m-%d %H:%M:%S')
+def webkit_time_sql(column):
+    """
+    SQL expression converting a WebKit timestamp column to Unix seconds, so
+    SQLite converts whole columns while scanning. 0/NULL come back as NULL.
+    Values are formatted as text only when rows are read out of a RecordTable.
+    """
+    return f"NULLIF({column}, 0) / 1000000 - {WEBKIT_EPOCH_OFFSET}"
 
-def write_to_csv(data, headers, output_file):
-    with open(output_file, mode='w', newline='', encoding='utf-8') as file:
-        writer = csv.writer(file)
-        writer.writerow(headers)
-        writer.writerows(data)
+def firefox_time_sql(column):
+    """
+    SQL expression converting a Firefox (PRTime) timestamp column to Unix seconds.
+    """
+    return f"NULLIF({column}, 0) / 1000000"
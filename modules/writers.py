@@ -0,0 +1,157 @@
+import csv
+import json
+from html import escape
+from importlib import import_module
+
+OUTPUT_FORMATS = ["csv", "json", "html", "txt", "parquet", "arrow", "sqlite"]
+
+
+class RowWriter:
+    """
+    Base class for output writers that receive rows incrementally.
+
+    Rows can be passed to write_rows() in as many batches as needed; nothing is
+    kept in memory beyond what the concrete format requires.
+    """
+    newline = None
+
+    def __init__(self, headers, output_file, dataset=None):
+        self.headers = headers
+        self.output_file = output_file
+        self.dataset = dataset
+        self.file = open(output_file, "w", newline=self.newline, encoding="utf-8")
+
+    def write_rows(self, rows):
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CsvWriter(RowWriter):
+    newline = ""
+
+    def __init__(self, headers, output_file, dataset=None):
+        super().__init__(headers, output_file, dataset)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(headers)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+
+class JsonWriter(RowWriter):
+    """
+    Writes a JSON array of objects one record at a time. The result is identical to
+    json.dump(records, indent=4) without building the list of records first.
+    """
+
+    def __init__(self, headers, output_file, dataset=None):
+        super().__init__(headers, output_file, dataset)
+        self.file.write("[")
+        self.empty = True
+
+    def write_rows(self, rows):
+        for row in rows:
+            record = json.dumps(dict(zip(self.headers, row)), ensure_ascii=False, indent=4)
+            self.file.write("\n    " if self.empty else ",\n    ")
+            self.file.write(record.replace("\n", "\n    "))
+            self.empty = False
+
+    def close(self):
+        self.file.write("]" if self.empty else "\n]")
+        super().close()
+
+
+class TxtWriter(RowWriter):
+    def __init__(self, headers, output_file, dataset=None):
+        super().__init__(headers, output_file, dataset)
+        self.file.write("\t".join(headers) + "\n")
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.file.write("\t".join(map(str, row)) + "\n")
+
+
+# Control characters DataFrame.to_html writes as escape sequences
+HTML_CELL_ESCAPES = str.maketrans({"\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def html_cell(value):
+    return escape(str(value).translate(HTML_CELL_ESCAPES), quote=False)
+
+
+class HtmlWriter(RowWriter):
+    """
+    Streams an HTML table one row at a time, in the same layout as
+    DataFrame.to_html(index=False), so no row is held in memory.
+
+    Each cell is written as str() renders it, with tabs and line breaks escaped
+    as pandas escapes them. pandas formats a whole column at once instead, so
+    there integers in a column with missing values become floats, NULL shows as
+    NaN and floats share one precision.
+    """
+
+    def __init__(self, headers, output_file, dataset=None):
+        super().__init__(headers, output_file, dataset)
+        self.file.write('<table border="1" class="dataframe">\n  <thead>\n    <tr style="text-align: right;">\n')
+        for header in headers:
+            self.file.write(f"      <th>{html_cell(header)}</th>\n")
+        self.file.write("    </tr>\n  </thead>\n  <tbody>\n")
+
+    def write_rows(self, rows):
+        for row in rows:
+            cells = "".join(f"      <td>{html_cell(value)}</td>\n" for value in row)
+            self.file.write(f"    <tr>\n{cells}    </tr>\n")
+
+    def close(self):
+        self.file.write("  </tbody>\n</table>")
+        super().close()
+
+
+# Output backends by format, as (module, class). A backend's module is only
+# imported when that format is opened, so heavy dependencies such as pyarrow
+# cost nothing for runs that do not use them.
+WRITERS = {
+    "csv": ("modules.writers", "CsvWriter"),
+    "json": ("modules.writers", "JsonWriter"),
+    "html": ("modules.writers", "HtmlWriter"),
+    "txt": ("modules.writers", "TxtWriter"),
+    "parquet": ("modules.columnar", "ParquetWriter"),
+    "arrow": ("modules.columnar", "ArrowWriter"),
+    "sqlite": ("modules.casedb", "CaseDbWriter"),
+}
+
+
+def register_writer(output_format, module, class_name):
+    """
+    Adds an output backend, loaded from module on first use.
+    """
+    WRITERS[output_format] = (module, class_name)
+    if output_format not in OUTPUT_FORMATS:
+        OUTPUT_FORMATS.append(output_format)
+
+
+def load_writer(output_format):
+    """
+    Returns the writer class for an output format, importing its module.
+    """
+    if output_format not in WRITERS:
+        raise ValueError(f"Unsupported output format. Choose from {', '.join(OUTPUT_FORMATS)}.")
+    module, class_name = WRITERS[output_format]
+    return getattr(import_module(module), class_name)
+
+
+def open_writer(output_format, headers, output_file, dataset=None):
+    """
+    Returns a writer for the given output format. dataset names the artifact being
+    written ("history", "downloads", "searches", "cookies") for formats that store several
+    artifacts in one file.
+    """
+    return load_writer(output_format)(headers, output_file, dataset)
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+from cli import validate_workers
+from modules.service import ExtractionService
+
+
+def validate_size(value):
+    """
+    Validates a size in megabytes and returns it in bytes.
+    """
+    try:
+        size = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid size: {value}")
+    if size < 1:
+        raise argparse.ArgumentTypeError("Sizes must be at least 1 MB.")
+    return size * 1024 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Browser Forensics Toolkit extraction service",
+        epilog="""
+Example Usage:
+    python service.py --port 8765 [--jobs 2] [--max-pending 8]
+    curl --data-binary @profiles.zip "http://127.0.0.1:8765/extract?since=2024-01-01"
+
+POST /extract takes a zip or tar archive of browser profiles and streams the extracted rows back as NDJSON.
+GET /health reports the running and waiting jobs.
+        """
+    )
+    parser.add_argument(
+        "--host", default="127.0.0.1",
+        help="Address to listen on. Default is 127.0.0.1 (local connections only)."
+    )
+    parser.add_argument(
+        "--port", type=int, default=8765,
+        help="Port to listen on. Default is 8765."
+    )
+    parser.add_argument(
+        "--jobs", type=validate_workers, default=2,
+        help="Number of uploads extracted at the same time. Default is 2."
+    )
+    parser.add_argument(
+        "--max-pending", type=int, default=8,
+        help="Uploads allowed to wait for a free job slot; further uploads are refused with 503. Default is 8."
+    )
+    parser.add_argument(
+        "--workers", type=validate_workers, default=1,
+        help="Number of databases each job parses in parallel. Default is 1 (serial)."
+    )
+    parser.add_argument(
+        "--max-upload", type=validate_size, default="1024",
+        help="Largest archive accepted, in MB. Default is 1024."
+    )
+    parser.add_argument(
+        "--max-extract", type=validate_size, default="4096",
+        help="Largest total size an archive may unpack to, in MB. Default is 4096."
+    )
+    parser.add_argument(
+        "--work-folder",
+        help="Folder uploads are unpacked in. Default is the system temporary folder."
+    )
+
+    args = parser.parse_args()
+    if args.max_pending < 0:
+        parser.error("--max-pending must not be negative.")
+
+    service = ExtractionService(args.jobs, args.max_pending, args.max_upload, args.max_extract, args.workers, args.work_folder)
+    print(f"Serving on http://{args.host}:{args.port} ({args.jobs} jobs, {args.max_pending} pending)")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
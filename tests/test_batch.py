@@ -0,0 +1,58 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from cli import process_root
+from modules.batch import run_batch, root_output_folder
+from modules.filters import ExtractionFilter
+
+
+class BatchCheckpointTest(unittest.TestCase):
+    """
+    A root recorded as done is only skipped when the batch is run again with the
+    same output options.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        self.roots = []
+        for name in ("first", "second"):
+            root = os.path.join(self.folder, name)
+            generate(root, visits=50, profiles=1, firefox_profiles=0)
+            self.roots.append(root)
+        self.output = os.path.join(self.folder, "output")
+        os.makedirs(self.output)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def run_batch(self, **options):
+        ran = []
+        options = {"output_format": "csv", "search": None, "workers": 1, "pool": "process", "snapshot": "auto",
+                   "timeline": False, "filters": None, **options}
+        checkpoint = run_batch(process_root, self.roots, self.output, on_result=lambda root, result: ran.append(root), **options)
+        self.assertTrue(all(checkpoint.is_done(root) for root in self.roots))
+        return ran
+
+    def test_same_options_are_skipped(self):
+        self.assertEqual(self.run_batch(), self.roots)
+        self.assertEqual(self.run_batch(), [])
+        # Workers and pool do not change the outputs
+        self.assertEqual(self.run_batch(workers=2, pool="thread"), [])
+
+    def test_changed_options_run_again(self):
+        self.run_batch()
+        self.assertEqual(self.run_batch(output_format="sqlite"), self.roots)
+        for root in self.roots:
+            self.assertTrue(os.path.isfile(os.path.join(root_output_folder(self.output, root), "case.sqlite")))
+        self.assertEqual(self.run_batch(output_format="sqlite"), [])
+
+        self.assertEqual(self.run_batch(output_format="sqlite", filters=ExtractionFilter(hosts=["example.com"])), self.roots)
+        self.assertEqual(self.run_batch(output_format="sqlite", filters=ExtractionFilter(hosts=["example.org"])), self.roots)
+        self.assertEqual(self.run_batch(output_format="sqlite", filters=ExtractionFilter(hosts=["example.org"]), search="page"), self.roots)
+
+
+if __name__ == "__main__":
+    unittest.main()
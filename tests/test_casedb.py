@@ -0,0 +1,47 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from modules.casedb import CaseDbWriter
+from modules.dedup import DEDUP_HEADERS
+from modules.parsing import ARTIFACT_HEADERS
+
+HEADERS = ARTIFACT_HEADERS["history"]
+
+
+def history_row(url, visit_time):
+    values = {header: None for header in HEADERS}
+    values.update({"URL": url, "Visit Time": visit_time, "Source": "/case/History"})
+    return [values[header] for header in HEADERS]
+
+
+class CaseDbWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        self.output_file = os.path.join(self.folder, "case.sqlite")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_appends_deduplicated_rows_to_existing_case(self):
+        with CaseDbWriter(HEADERS, self.output_file, "history") as writer:
+            writer.write_rows([history_row("https://example.com/", 1700000000)])
+        with CaseDbWriter(HEADERS + DEDUP_HEADERS, self.output_file, "history") as writer:
+            writer.write_rows([history_row("https://news.example.org/a", 1700000100) + [2, "/case/History; /copy/History"]])
+
+        conn = sqlite3.connect(self.output_file)
+        self.addCleanup(conn.close)
+        rows = conn.execute('SELECT url, host, occurrences, sources FROM history ORDER BY id').fetchall()
+        self.assertEqual(rows, [
+            ("https://example.com/", "example.com", None, None),
+            ("https://news.example.org/a", "news.example.org", 2, "/case/History; /copy/History"),
+        ])
+        indexes = {row[1] for row in conn.execute('PRAGMA index_list("history")')}
+        self.assertEqual(indexes, {"idx_history_host", "idx_history_visit_time", "idx_history_source"})
+
+
+if __name__ == "__main__":
+    unittest.main()
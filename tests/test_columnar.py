@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from modules import columnar
+from modules.parsing import ARTIFACT_HEADERS
+from modules.records import RecordTable
+from modules.writers import open_writer
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+HEADERS = ARTIFACT_HEADERS["history"]
+
+# Past the year 9999, so it has no formatted form
+FAR_FUTURE = 300000000000
+
+
+def history_rows():
+    rows = []
+    for i, visit_time in enumerate([1700000000, None, FAR_FUTURE, 0, 1700000123]):
+        values = {header: None for header in HEADERS}
+        values.update({"URL": f"https://example.com/{i}", "Visit Time": visit_time, "Browser": "Chrome", "Source": "/case/History"})
+        rows.append([values[header] for header in HEADERS])
+    return rows
+
+
+@unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+class ColumnarWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def read_back(self, output_format):
+        path = os.path.join(self.folder, f"history.{output_format}")
+        if output_format == "parquet":
+            table = pyarrow.parquet.read_table(path)
+        else:
+            with pyarrow.ipc.open_file(path) as reader:
+                table = reader.read_all()
+        self.assertEqual(table.schema.names, HEADERS)
+        times = table.column("Visit Time").cast(pyarrow.timestamp("s", tz="UTC")).cast(pyarrow.int64()).to_pylist()
+        return times, table.column("URL").to_pylist()
+
+    def write(self, output_format, *batches):
+        with open_writer(output_format, HEADERS, os.path.join(self.folder, f"history.{output_format}"), "history") as writer:
+            for batch in batches:
+                writer.write_rows(batch)
+
+    def test_round_trip(self):
+        rows = history_rows()
+        for output_format in ("parquet", "arrow"):
+            with self.subTest(output_format=output_format):
+                # Row groups smaller than the batches, so buffered rows are split
+                with mock.patch.object(columnar, "ROW_GROUP_SIZE", 2):
+                    self.write(output_format, RecordTable.from_rows(HEADERS, rows[:3]), RecordTable.from_rows(HEADERS, rows[3:]))
+                times, urls = self.read_back(output_format)
+                self.assertEqual(times, [row[0] for row in rows])
+                self.assertEqual(urls, [row[1] for row in rows])
+
+    def test_formatted_rows(self):
+        # The timeline writes formatted rows; their times are parsed back to seconds
+        table = RecordTable.from_rows(HEADERS, history_rows()[:2])
+        self.write("parquet", iter(list(table)))
+        times, _ = self.read_back("parquet")
+        self.assertEqual(times, [1700000000, None])
+
+    def test_values_that_are_not_times(self):
+        rows = history_rows()[:2]
+        rows[1][0] = "not a time"
+        table = RecordTable.from_rows(HEADERS, rows)
+        with self.assertWarns(UserWarning):
+            self.write("arrow", table)
+        times, _ = self.read_back("arrow")
+        self.assertEqual(times, [1700000000, None])
+
+
+if __name__ == "__main__":
+    unittest.main()
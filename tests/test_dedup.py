@@ -0,0 +1,83 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate, FIREFOX_BASE
+from modules.dedup import Deduplicator, DEDUP_HEADERS
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts, ARTIFACT_HEADERS
+
+# Two visits to one URL with one visit type, 250 ms apart: the same key in whole seconds
+PAIR_TIME = FIREFOX_BASE - 10000000
+PAIR_URL = "https://example.com/same-second"
+
+
+class DeduplicatorTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        root = os.path.join(cls.folder, "root")
+        places, = generate(root, visits=2000, profiles=0, firefox_profiles=1)
+        conn = sqlite3.connect(places)
+        with conn:
+            conn.execute("INSERT INTO moz_places (id, url, title) VALUES (100000, ?, 'Same second')", (PAIR_URL,))
+            conn.executemany(
+                "INSERT INTO moz_historyvisits (from_visit, place_id, visit_date, visit_type) VALUES (0, 100000, ?, 1)",
+                [(PAIR_TIME,), (PAIR_TIME + 250000,)]
+            )
+        conn.close()
+        cls.places = places
+        # A copy of the profile, as found in a backup or shadow copy
+        profile = os.path.dirname(places)
+        shutil.copytree(profile, os.path.join(os.path.dirname(profile), "copy.default-release"))
+        cls.files = database_files(find_browser_profile_files(root))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def deduplicate(self, files, run_size):
+        rows = {dataset: [] for dataset in ARTIFACT_HEADERS}
+        deduplicators = {dataset: Deduplicator(dataset, run_size=run_size, temp_dir=self.folder) for dataset in ARTIFACT_HEADERS}
+        for dataset, batch in iter_artifacts(None, files, None):
+            deduplicators[dataset].add_rows(batch)
+        for dataset, deduplicator in deduplicators.items():
+            with deduplicator:
+                for batch in deduplicator.batches():
+                    rows[dataset] += batch.raw_rows()
+        return rows
+
+    def pair(self, history):
+        headers = ARTIFACT_HEADERS["history"] + DEDUP_HEADERS
+        return [dict(zip(headers, row)) for row in history if row[headers.index("URL")] == PAIR_URL]
+
+    def test_same_source_rows_are_kept(self):
+        pair = self.pair(self.deduplicate([self.places], 100000)["history"])
+        self.assertEqual(len(pair), 2)
+        self.assertEqual(pair[0]["Visit Time"], pair[1]["Visit Time"])
+        self.assertEqual([row["Occurrences"] for row in pair], [1, 1])
+
+    def test_copies_pair_up(self):
+        rows = self.deduplicate(self.files, 100000)
+        pair = self.pair(rows["history"])
+        self.assertEqual(len(pair), 2)
+        for row in pair:
+            self.assertEqual(row["Occurrences"], 2)
+            self.assertEqual(len(row["Sources"].split("; ")), 2)
+        # Every record of the two identical databases is read exactly twice
+        for dataset in ("history", "downloads"):
+            with self.subTest(dataset=dataset):
+                self.assertTrue(rows[dataset])
+                self.assertEqual({row[-2] for row in rows[dataset]}, {2})
+
+    def test_spilled_runs_match_memory(self):
+        in_memory = self.deduplicate(self.files, 100000)
+        for run_size in (7, 97):
+            with self.subTest(run_size=run_size):
+                self.assertEqual(self.deduplicate(self.files, run_size), in_memory)
+
+
+if __name__ == "__main__":
+    unittest.main()
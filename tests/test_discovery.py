@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from modules.discovery import scan_artifacts, discover_artifacts, PRUNED_DIRS
+
+
+def touch(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class DiscoveryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        self.root = os.path.join(self.folder, "root")
+        self.profile = os.path.join(self.root, "Users", "alice", "AppData", "Local", "Google", "Chrome", "User Data", "Default")
+        touch(os.path.join(self.profile, "History"))
+        touch(os.path.join(self.profile, "Network", "Cookies"))
+        touch(os.path.join(self.profile, "Cache", "Cache_Data", "index"))
+        touch(os.path.join(self.root, "Users", "alice", "AppData", "Roaming", "Mozilla", "Firefox", "Profiles", "a.default", "places.sqlite"))
+        # Artifact names inside pruned folders are never reported
+        for name in PRUNED_DIRS:
+            touch(os.path.join(self.profile, name, "History"))
+        touch(os.path.join(self.profile, "Code Cache", "js", "Cookies"))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def paths(self, entries):
+        return sorted((os.path.relpath(path, self.root), artifact_type) for path, _, _, artifact_type in entries)
+
+    def test_skips_pruned_folders(self):
+        profile = os.path.relpath(self.profile, self.root)
+        self.assertEqual(self.paths(scan_artifacts(self.root)), sorted([
+            (os.path.join(profile, "History"), "history"),
+            (os.path.join(profile, "Network", "Cookies"), "cookies"),
+            (os.path.join(profile, "Cache", "Cache_Data"), "cache"),
+            (os.path.join("Users", "alice", "AppData", "Roaming", "Mozilla", "Firefox", "Profiles", "a.default", "places.sqlite"), "history"),
+        ]))
+
+    def test_reuses_index(self):
+        index_file = os.path.join(self.folder, "index.json")
+        entries = discover_artifacts(self.root, index_file)
+        self.assertTrue(os.path.exists(index_file))
+        self.assertEqual(entries, scan_artifacts(self.root))
+
+        # A later run reads the index instead of walking the tree again
+        os.remove(os.path.join(self.profile, "History"))
+        self.assertEqual(discover_artifacts(self.root, index_file), entries)
+
+        # Rebuilding, or an index of another root, walks the tree
+        rebuilt = discover_artifacts(self.root, index_file, rebuild_index=True)
+        self.assertEqual(len(rebuilt), len(entries) - 1)
+        self.assertEqual(discover_artifacts(self.root, index_file), rebuilt)
+        other_root = os.path.join(self.root, "Users")
+        self.assertEqual(discover_artifacts(other_root, index_file), scan_artifacts(other_root))
+
+        # A damaged index is ignored and written again
+        with open(index_file, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertEqual(discover_artifacts(self.root, index_file), rebuilt)
+        self.assertEqual(discover_artifacts(self.root, index_file), rebuilt)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+import gzip
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import simple_cache_entry
+from modules.disk_cache import (
+    iter_cache_entries, read_cache_body, CACHE_HEADERS, ADDR_INITIALIZED, BLOCKFILE_INDEX_MAGIC,
+    BLOCKFILE_TABLE_OFFSET, BLOCK_FILE_HEADER_SIZE, BLOCK_SIZES, ENTRY_STORE, ENTRY_MAX_INLINE_KEY_SIZE,
+    ADDR_NUM_BLOCKS_OFFSET,
+)
+from modules.filters import ExtractionFilter
+
+# 2024-03-01 12:00:00 UTC in WebKit microseconds and Unix seconds
+REQUEST_SECONDS = 1709294400
+REQUEST_TIME = (REQUEST_SECONDS + 11644473600) * 1000000
+
+
+def response_info(raw_headers, request_time, response_time):
+    payload = struct.pack("<Iqq", 3, request_time, response_time)
+    payload += struct.pack("<i", len(raw_headers)) + raw_headers + b"\0" * (-len(raw_headers) % 4)
+    return struct.pack("<I", len(payload)) + payload
+
+
+def block_addr(file_type, file_number, block, num_blocks=1):
+    return ADDR_INITIALIZED | file_type << 28 | (num_blocks - 1) << ADDR_NUM_BLOCKS_OFFSET | file_number << 16 | block
+
+
+class BlockfileBuilder:
+    """
+    Writes a minimal blockfile cache: an index with a small hash table, entry
+    records in data_1 (256 byte blocks, up to four per record with the key
+    inline), keys past the inline limit and response info in data_2 (1024 byte
+    blocks) and bodies in f_ files.
+    """
+
+    def __init__(self, table_len=4):
+        self.table = [0] * table_len
+        self.blocks = {1: [], 2: []}
+        self.external = []
+
+    def store(self, file_number, data):
+        block_size = BLOCK_SIZES[file_number + 1]
+        blocks = self.blocks[file_number]
+        first = len(blocks)
+        for start in range(0, max(len(data), 1), block_size):
+            blocks.append(data[start:start + block_size].ljust(block_size, b"\0"))
+        return block_addr(file_number + 1, file_number, first, len(blocks) - first)
+
+    def add(self, bucket, key, info, body):
+        info_addr = self.store(2, info)
+        self.external.append(body)
+        body_addr = ADDR_INITIALIZED | len(self.external)
+        long_key = self.store(2, key) if len(key) > ENTRY_MAX_INLINE_KEY_SIZE else 0
+        # Chained in front of the bucket's current first entry
+        record = ENTRY_STORE.pack(
+            0, self.table[bucket], 0, 0, 0, 0, 0, len(key), long_key,
+            len(info), len(body), 0, 0, info_addr, body_addr, 0, 0, 0, 0, 0, 0, 0, 0,
+        )
+        record += b"" if long_key else key + b"\0"
+        addr = self.store(1, record)
+        self.table[bucket] = addr
+        return addr
+
+    def write(self, folder):
+        os.makedirs(folder, exist_ok=True)
+        index = bytearray(BLOCKFILE_TABLE_OFFSET)
+        struct.pack_into("<I", index, 0, BLOCKFILE_INDEX_MAGIC)
+        struct.pack_into("<i", index, 28, len(self.table))
+        index += struct.pack(f"<{len(self.table)}I", *self.table)
+        with open(os.path.join(folder, "index"), "wb") as f:
+            f.write(index)
+        for file_number, blocks in self.blocks.items():
+            with open(os.path.join(folder, f"data_{file_number}"), "wb") as f:
+                f.write(b"\0" * BLOCK_FILE_HEADER_SIZE + b"".join(blocks))
+        for number, body in enumerate(self.external, 1):
+            with open(os.path.join(folder, f"f_{number:06x}"), "wb") as f:
+                f.write(body)
+
+
+def entry_rows(cache_dir, filters=None):
+    rows = []
+    for batch in iter_cache_entries([cache_dir], "Chrome", "user/Default", filters=filters):
+        rows += batch.raw_rows()
+    return [dict(zip(CACHE_HEADERS, row)) for row in rows]
+
+
+class DiskCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def test_simple_cache(self):
+        cache_dir = os.path.join(self.folder, "Cache_Data")
+        os.makedirs(cache_dir)
+        body = b"<html>" + b"x" * 500 + b"</html>"
+        entries = {
+            "0000000000000001_0": simple_cache_entry(
+                b"1/0/_dk_https://example.com https://example.com https://example.com/index.html",
+                b"HTTP/1.1 200 OK\0Content-Type: text/html\0Content-Encoding: gzip\0\0",
+                gzip.compress(body), REQUEST_TIME, REQUEST_TIME + 2000000),
+            "0000000000000002_0": simple_cache_entry(
+                b"https://cdn.example.net/app.js", b"HTTP/1.1 404 Not Found\0\0", b"", REQUEST_TIME + 60000000, REQUEST_TIME + 61000000),
+            # Damaged entries and other files are skipped
+            "0000000000000003_0": b"not a cache entry",
+            "index": b"\0" * 8,
+        }
+        for name, data in entries.items():
+            with open(os.path.join(cache_dir, name), "wb") as f:
+                f.write(data)
+
+        rows = entry_rows(cache_dir)
+        self.assertEqual([row["Entry"] for row in rows], ["0000000000000001_0", "0000000000000002_0"])
+        first, second = rows
+        self.assertEqual(first["URL"], "https://example.com/index.html")
+        self.assertEqual((first["Request Time"], first["Response Time"]), (REQUEST_SECONDS, REQUEST_SECONDS + 2))
+        self.assertEqual((first["Status"], first["Content Type"], first["Content Encoding"]), (200, "text/html", "gzip"))
+        self.assertEqual(first["Body Size"], len(gzip.compress(body)))
+        self.assertEqual((first["Cache Format"], first["Browser"], first["Source"]), ("simple", "Chrome", cache_dir))
+        self.assertEqual((second["URL"], second["Status"], second["Body Size"]), ("https://cdn.example.net/app.js", 404, 0))
+
+        self.assertEqual(read_cache_body(cache_dir, first["Entry"]), body)
+        self.assertEqual(read_cache_body(cache_dir, first["Entry"], decode=False), gzip.compress(body))
+
+        only_cdn = entry_rows(cache_dir, ExtractionFilter(hosts=["example.net"]))
+        self.assertEqual([row["Entry"] for row in only_cdn], ["0000000000000002_0"])
+
+    def test_blockfile_cache(self):
+        cache_dir = os.path.join(self.folder, "Cache")
+        builder = BlockfileBuilder()
+        long_url = "https://example.org/search?q=" + "a" * 300
+        first = builder.add(1, b"https://example.org/", response_info(
+            b"HTTP/1.1 200\0content-type: text/html\0\0", REQUEST_TIME, REQUEST_TIME + 1000000), b"<p>hello</p>")
+        # Same bucket, so it is reached through the first entry's chain
+        second = builder.add(1, long_url.encode("utf-8"), response_info(
+            b"HTTP/1.1 301\0location: /\0\0", REQUEST_TIME + 5000000, REQUEST_TIME + 6000000), b"")
+        third = builder.add(3, b"https://static.example.org/logo.png", response_info(
+            b"HTTP/1.1 200\0content-type: image/png\0\0", REQUEST_TIME, REQUEST_TIME), b"\x89PNG" + b"\0" * 60)
+        longer_url = "https://example.org/track?id=" + "b" * 1000
+        fourth = builder.add(2, longer_url.encode("utf-8"), response_info(
+            b"HTTP/1.1 204\0\0", REQUEST_TIME, REQUEST_TIME), b"")
+        builder.write(cache_dir)
+        # The 300 byte key is inline across two blocks, the 1029 byte one stored apart
+        self.assertEqual(second >> ADDR_NUM_BLOCKS_OFFSET & 3, 1)
+        self.assertEqual(fourth >> ADDR_NUM_BLOCKS_OFFSET & 3, 0)
+
+        rows = {row["Entry"]: row for row in entry_rows(cache_dir)}
+        self.assertEqual(set(rows), {f"0x{addr:08x}" for addr in (first, second, third, fourth)})
+        row = rows[f"0x{first:08x}"]
+        self.assertEqual((row["URL"], row["Status"], row["Content Type"], row["Body Size"]), ("https://example.org/", 200, "text/html", 12))
+        self.assertEqual((row["Request Time"], row["Response Time"], row["Cache Format"]), (REQUEST_SECONDS, REQUEST_SECONDS + 1, "blockfile"))
+        row = rows[f"0x{second:08x}"]
+        self.assertEqual((row["URL"], row["Status"], row["Response Time"]), (long_url, 301, REQUEST_SECONDS + 6))
+        self.assertEqual(rows[f"0x{third:08x}"]["Content Type"], "image/png")
+        self.assertEqual((rows[f"0x{fourth:08x}"]["URL"], rows[f"0x{fourth:08x}"]["Status"]), (longer_url, 204))
+
+        self.assertEqual(read_cache_body(cache_dir, f"0x{first:08x}"), b"<p>hello</p>")
+        self.assertEqual(read_cache_body(cache_dir, f"0x{third:08x}"), b"\x89PNG" + b"\0" * 60)
+
+        later = entry_rows(cache_dir, ExtractionFilter(since=REQUEST_SECONDS + 3))
+        self.assertEqual([row["Entry"] for row in later], [f"0x{second:08x}"])
+
+
+if __name__ == "__main__":
+    unittest.main()
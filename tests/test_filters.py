@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from modules.disk_cache import iter_cache_entries, CACHE_HEADERS
+from modules.filters import ExtractionFilter, parse_time
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts, ARTIFACT_HEADERS
+
+DATASET_HEADERS = {**ARTIFACT_HEADERS, "cache": CACHE_HEADERS}
+
+# Time columns bounding each record: (start, end). A cookie is in a window it
+# overlaps, from creation to last access.
+TIME_COLUMNS = {
+    "history": ("Visit Time", "Visit Time"),
+    "downloads": ("Start Time", "Start Time"),
+    "searches": ("Last Visit Time", "Last Visit Time"),
+    "cookies": ("Creation Time", "Last Access Time"),
+    "cache": ("Response Time", "Response Time"),
+}
+
+
+def expected(dataset, row, filters):
+    """
+    The filter semantics, applied in Python to an unfiltered row with raw times.
+    """
+    values = dict(zip(DATASET_HEADERS[dataset], row))
+    start, end = (values[column] for column in TIME_COLUMNS[dataset])
+    if filters.since is not None and (end is None or end < filters.since):
+        return False
+    if filters.until is not None and (start is None or start > filters.until):
+        return False
+    if dataset in ("history", "searches", "cache") and not filters.url_matches(values["URL"]):
+        return False
+    if dataset == "cookies" and not filters.host_matches(values["Host"]):
+        return False
+    if filters.visit_types and dataset == "history" and values["Visit Type"] not in filters.visit_types:
+        return False
+    if filters.danger_types and dataset == "downloads" and values["Danger Type"] not in filters.danger_types:
+        return False
+    return True
+
+
+class FilterPushdownTest(unittest.TestCase):
+    """
+    Filters pushed into the extractor SQL (and into the cache parser) must keep
+    exactly the rows that filtering the full extraction in Python keeps.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        root = os.path.join(cls.folder, "root")
+        generate(root, visits=600, profiles=1, firefox_profiles=1, users=2, cache_files=60)
+        profile_files = find_browser_profile_files(root)
+        cls.files = database_files(profile_files)
+        cls.cache_dirs = profile_files["cache"]
+        cls.full = cls.extract(None)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    @classmethod
+    def extract(cls, filters, workers=1):
+        rows = {dataset: [] for dataset in DATASET_HEADERS}
+        for dataset, batch in iter_artifacts(None, cls.files, None, workers=workers, filters=filters):
+            rows[dataset] += batch.raw_rows()
+        for batch in iter_cache_entries(cls.cache_dirs, None, None, workers=workers, filters=filters):
+            rows["cache"] += batch.raw_rows()
+        return rows
+
+    def filter_cases(self):
+        times = sorted(row[0] for row in self.full["history"])
+        first, middle = times[0], times[len(times) // 2]
+        return [
+            ExtractionFilter(since=middle),
+            ExtractionFilter(until=middle),
+            ExtractionFilter(since=first + 30, until=middle),
+            ExtractionFilter(hosts=["example.com"]),
+            ExtractionFilter(hosts=["*.example.io", "news.example.org"]),
+            ExtractionFilter(hosts=["ample.com"]),
+            ExtractionFilter(visit_types=["Typed URL", "Link"]),
+            ExtractionFilter(danger_types=["Dangerous File"]),
+            ExtractionFilter(since=first + 30, until=middle, hosts=["example.org"], visit_types=["Link"]),
+        ]
+
+    def test_pushdown_matches_python(self):
+        self.assertTrue(all(self.full.values()))
+        for filters in self.filter_cases():
+            want = {dataset: [row for row in rows if expected(dataset, row, filters)] for dataset, rows in self.full.items()}
+            kept = sum(len(rows) for rows in want.values())
+            # Every case keeps some rows and drops others, so none passes trivially
+            self.assertTrue(0 < kept < sum(len(rows) for rows in self.full.values()), vars(filters))
+            for workers in (1, 2):
+                with self.subTest(filters=vars(filters), workers=workers):
+                    self.assertEqual(self.extract(filters, workers), want)
+
+
+class ParseTimeTest(unittest.TestCase):
+
+    def test_offsets_convert_to_utc(self):
+        utc = 1709303400
+        for value in ("2024-03-01 14:30:00", " 2024-03-01T14:30:00 ", "2024-03-01 14:30:00+00:00", "2024-03-01 16:30:00+02:00",
+                      "2024-03-01T09:30:00-05:00", "2024-03-01T14:30:00Z"):
+            with self.subTest(value=value):
+                self.assertEqual(parse_time(value), utc)
+        self.assertEqual(parse_time("2024-03-01"), utc - 14 * 3600 - 30 * 60)
+        with self.assertRaises(ValueError):
+            parse_time("01/03/2024")
+
+
+if __name__ == "__main__":
+    unittest.main()
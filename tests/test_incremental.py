@@ -0,0 +1,65 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from modules.incremental import ExtractionCache
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts
+
+
+class ExtractionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        root = os.path.join(self.folder, "root")
+        generate(root, visits=300, profiles=1, firefox_profiles=1)
+        self.files = database_files(find_browser_profile_files(root))
+        self.cache = ExtractionCache(os.path.join(self.folder, "case.cache"))
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def extract(self, artifacts=None, workers=1):
+        self.cache.hits = self.cache.misses = 0
+        rows = {}
+        options = {"artifacts": artifacts} if artifacts else {}
+        for artifact, batch in iter_artifacts(None, self.files, None, workers=workers, cache=self.cache, **options):
+            rows.setdefault(artifact, []).extend(batch.raw_rows())
+        return rows, (self.cache.hits, self.cache.misses)
+
+    def test_counts_sources(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.cache.conn.executescript("DELETE FROM batches; DELETE FROM sources;")
+                parsed, counts = self.extract(workers=workers)
+                self.assertEqual(counts, (0, len(self.files)))
+
+                # Unchanged databases are served whole from the cache
+                cached, counts = self.extract(workers=workers)
+                self.assertEqual(counts, (len(self.files), 0))
+                self.assertEqual(cached, parsed)
+
+    def test_changed_and_partly_cached_sources(self):
+        # Only history is cached, so every database that has more is parsed again
+        self.extract(artifacts=("history",))
+        _, counts = self.extract(artifacts=("history",))
+        self.assertEqual(counts, (len(self.files), 0))
+        parsed, counts = self.extract()
+        self.assertEqual(counts, (0, len(self.files)))
+
+        history = next(path for path in self.files if os.path.basename(path) == "History")
+        conn = sqlite3.connect(history)
+        with conn:
+            conn.execute("INSERT INTO visits (url, visit_time, transition) SELECT url, visit_time + 1000000, transition FROM visits LIMIT 1")
+        conn.close()
+        changed, counts = self.extract()
+        self.assertEqual(counts, (len(self.files) - 1, 1))
+        self.assertEqual(len(changed["history"]), len(parsed["history"]) + 1)
+        self.assertEqual(self.extract()[1], (len(self.files), 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import json
+import os
+import pstats
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from cli import process_root, write_metrics
+from modules.metrics import RunMetrics
+from modules.parsing import ARTIFACT_HEADERS
+
+
+class RunMetricsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        cls.root = os.path.join(cls.folder, "root")
+        cls.files = generate(cls.root, visits=300, profiles=1, firefox_profiles=1, cache_files=10)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def run_with_metrics(self, workers):
+        output_folder = tempfile.mkdtemp(dir=self.folder)
+        metrics = RunMetrics(profile=True)
+        written = process_root(self.root, output_folder, "csv", workers=workers, metrics=metrics)
+        report_file = os.path.join(output_folder, "metrics.json")
+        profile_file = os.path.join(output_folder, "run.prof")
+        write_metrics(metrics, report_file, profile_file)
+        with open(report_file, encoding="utf-8") as f:
+            return written, json.load(f), profile_file
+
+    def test_report(self):
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                written, report, profile_file = self.run_with_metrics(workers)
+                stages = {stage["stage"]: stage for stage in report["stages"]}
+                self.assertLessEqual({"discovery", "extract", "extract_cache"} | {f"write_{dataset}" for dataset in written}, set(stages))
+                self.assertEqual(stages["discovery"]["files"], len(self.files) + 1)
+
+                # One record per database, whose rows add up to what was extracted and written
+                self.assertEqual(sorted(record["source"] for record in report["sources"]), sorted(self.files))
+                for artifact in ARTIFACT_HEADERS:
+                    self.assertEqual(sum(record["rows"].get(artifact, 0) for record in report["sources"]), written[artifact], artifact)
+                self.assertEqual(stages["extract"]["rows"], sum(written[artifact] for artifact in ARTIFACT_HEADERS))
+                self.assertEqual(stages["extract_cache"]["rows"], written["cache"])
+                for dataset, rows in written.items():
+                    self.assertEqual(stages[f"write_{dataset}"]["rows"], rows)
+                self.assertEqual(stages["extract"]["bytes"], sum(os.path.getsize(path) for path in self.files))
+
+                self.assertTrue(report["profile"])
+                self.assertTrue(pstats.Stats(profile_file).stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
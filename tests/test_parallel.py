@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from cli import process_root, OUTPUT_HEADERS
+
+
+def read_outputs(folder):
+    outputs = {}
+    for dataset in OUTPUT_HEADERS:
+        with open(os.path.join(folder, f"{dataset}.csv"), "r", encoding="utf-8") as f:
+            outputs[dataset] = f.read()
+    return outputs
+
+
+class ParallelExtractionTest(unittest.TestCase):
+    """
+    Parsing databases on several workers must write exactly what a serial run
+    writes, in the same order.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        cls.root = os.path.join(cls.folder, "root")
+        generate(cls.root, visits=400, profiles=2, firefox_profiles=1, users=2, cache_files=30)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def extract(self, name, workers=1, pool="process"):
+        output_folder = os.path.join(self.folder, name)
+        os.makedirs(output_folder)
+        written = process_root(self.root, output_folder, "csv", workers=workers, pool=pool)
+        return written, read_outputs(output_folder)
+
+    def test_workers_match_serial(self):
+        serial_written, serial = self.extract("serial")
+        self.assertGreater(serial_written["history"], 0)
+        self.assertGreater(serial_written["cache"], 0)
+        for pool in ("process", "thread"):
+            with self.subTest(pool=pool):
+                written, outputs = self.extract(f"workers-{pool}", workers=3, pool=pool)
+                self.assertEqual(written, serial_written)
+                self.assertEqual(outputs, serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import hashlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from modules.parsing import iter_artifacts
+
+ADDED_VISITS = 5
+
+
+def file_digests(db_file):
+    digests = {}
+    for path in (db_file, db_file + "-wal", db_file + "-shm"):
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                digests[path] = hashlib.sha256(f.read()).hexdigest()
+    return digests
+
+
+class SnapshotTest(unittest.TestCase):
+    """
+    A database whose last transactions are still in its -wal file, as left by a
+    browser that was running, is read with them when it is snapshotted.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        self.history, _ = generate(os.path.join(self.folder, "root"), visits=200, profiles=1, firefox_profiles=0)
+        self.visits = self.count_history("never")
+
+        # The browser's connection stays open, so the WAL is never checkpointed
+        self.browser = sqlite3.connect(self.history)
+        self.browser.execute("PRAGMA journal_mode = WAL")
+        self.browser.execute("PRAGMA wal_autocheckpoint = 0")
+        with self.browser:
+            self.browser.execute(f"INSERT INTO visits (url, visit_time, transition) SELECT url, visit_time + 1, transition FROM visits LIMIT {ADDED_VISITS}")
+
+    def tearDown(self):
+        self.browser.close()
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def count_history(self, snapshot):
+        return sum(len(batch) for _, batch in iter_artifacts(None, [self.history], None, ("history",), snapshot=snapshot))
+
+    def test_reads_committed_wal_rows(self):
+        self.assertGreater(os.path.getsize(self.history + "-wal"), 0)
+        before = file_digests(self.history)
+        for snapshot in ("auto", "always"):
+            with self.subTest(snapshot=snapshot):
+                self.assertEqual(self.count_history(snapshot), self.visits + ADDED_VISITS)
+        # The immutable connection does not see the WAL
+        self.assertEqual(self.count_history("never"), self.visits)
+        self.assertEqual(file_digests(self.history), before)
+
+
+class BatchSizeTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        cls.files = generate(os.path.join(cls.folder, "root"), visits=300, profiles=1, firefox_profiles=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def extract(self, **options):
+        rows = {}
+        sizes = []
+        for artifact, batch in iter_artifacts(None, self.files, None, **options):
+            rows.setdefault(artifact, []).extend(batch.raw_rows())
+            sizes.append(len(batch))
+        return rows, sizes
+
+    def test_batches_keep_every_row(self):
+        whole, _ = self.extract()
+        for batch_size in (1, 7, 100):
+            with self.subTest(batch_size=batch_size):
+                rows, sizes = self.extract(batch_size=batch_size)
+                self.assertEqual(rows, whole)
+                self.assertLessEqual(max(sizes), batch_size)
+                self.assertGreater(len(sizes), len(whole))
+                self.assertNotIn(0, sizes)
+
+
+if __name__ == "__main__":
+    unittest.main()
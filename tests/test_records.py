@@ -0,0 +1,80 @@
+import unittest
+
+from modules.parsing import ARTIFACT_HEADERS
+from modules.records import RecordTable, ListColumn, TextTimestampColumn, format_timestamp
+
+HEADERS = ARTIFACT_HEADERS["history"]
+
+# Past the year 9999, so it has no formatted form
+FAR_FUTURE = 300000000000
+
+
+def history_row(url, visit_time, visit_count=1, browser="Chrome", source="/case/History"):
+    values = {header: None for header in HEADERS}
+    values.update({"URL": url, "Visit Time": visit_time, "Visit Count": visit_count, "Browser": browser, "Source": source})
+    return [values[header] for header in HEADERS]
+
+
+class RecordTableTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        rows = [history_row(f"https://example.com/{i}", 1700000000 + i, i) for i in range(6)]
+        table = RecordTable(HEADERS)
+        table.append(rows[0])
+        table.extend(rows[1:3])
+        table.extend(iter(rows[3:]))
+        self.assertEqual(len(table), 6)
+        self.assertEqual(list(table.raw_rows()), rows)
+        self.assertEqual(list(table.take([4, 0, 2]).raw_rows()), [rows[4], rows[0], rows[2]])
+        self.assertEqual(list(table.take([]).raw_rows()), [])
+
+        # Iterating formats timestamps, as the writers receive them
+        formatted = list(table)
+        self.assertEqual(formatted[0][HEADERS.index("Visit Time")], "2023-11-14 22:13:20")
+        self.assertEqual(table[-1], formatted[-1])
+        self.assertEqual(RecordTable.from_rows(HEADERS, formatted).raw_values(HEADERS.index("Visit Time")), [row[0] for row in rows])
+
+    def test_null_and_out_of_range_timestamps(self):
+        table = RecordTable.from_rows(HEADERS, [history_row("a", None), history_row("b", FAR_FUTURE), history_row("c", 0)])
+        index = HEADERS.index("Visit Time")
+        self.assertEqual(table.raw_values(index), [None, FAR_FUTURE, 0])
+        self.assertEqual(table.column_values(index), [None, None, "1970-01-01 00:00:00"])
+        self.assertIsNone(format_timestamp(FAR_FUTURE))
+        self.assertEqual(table.cell(1, index), None)
+
+    def test_falls_back_to_list_column(self):
+        count = HEADERS.index("Visit Count")
+        table = RecordTable.from_rows(HEADERS, [history_row("a", 1, 3)])
+        table.append(history_row("b", 2, "three"))
+        table.extend([history_row("c", 3, 4)])
+        self.assertIsInstance(table.columns[count], ListColumn)
+        self.assertEqual(table.raw_values(count), [3, "three", 4])
+
+        # Text in a timestamp column keeps the times before it formatted
+        time = HEADERS.index("Visit Time")
+        table.extend([history_row("d", "yesterday")])
+        self.assertIsInstance(table.columns[time], TextTimestampColumn)
+        self.assertEqual(table.column_values(time), ["1970-01-01 00:00:01", "1970-01-01 00:00:02", "1970-01-01 00:00:03", "yesterday"])
+        self.assertEqual(len(table), 4)
+
+    def test_extend_with_other_dictionaries(self):
+        first = RecordTable.from_rows(HEADERS, [history_row("a", 1, browser="Chrome"), history_row("b", 2, browser="Firefox")])
+        second = RecordTable.from_rows(HEADERS, [
+            history_row("c", 3, browser="Firefox", source="/copy/History"),
+            history_row("d", 4, browser="Edge", source="/case/History"),
+        ])
+        first.extend(second)
+        browser, source = HEADERS.index("Browser"), HEADERS.index("Source")
+        self.assertEqual(first.raw_values(browser), ["Chrome", "Firefox", "Firefox", "Edge"])
+        self.assertEqual(first.raw_values(source), ["/case/History", "/case/History", "/copy/History", "/case/History"])
+        self.assertEqual(first.columns[browser].dictionary, ["Chrome", "Firefox", "Edge"])
+
+        # A typed column extended with a fallback column falls back too
+        other = RecordTable.from_rows(HEADERS, [history_row("e", 5, "many")])
+        first.extend(other)
+        self.assertEqual(first.raw_values(HEADERS.index("Visit Count")), [1, 1, 1, 1, "many"])
+        self.assertEqual(len(first), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import sqlite3
+import unittest
+from unittest import mock
+
+from modules.parsing import ARTIFACT_HEADERS
+from modules.search import SearchIndex, filter_rows
+
+HEADERS = ARTIFACT_HEADERS["history"]
+
+CONNECT = sqlite3.connect
+
+
+def history_row(url, title):
+    values = {header: None for header in HEADERS}
+    values.update({"URL": url, "Title": title})
+    return [values[header] for header in HEADERS]
+
+
+ROWS = [
+    history_row("https://example.com/news", "Daily News"),
+    history_row("https://example.org/", "Straße und Café"),
+    history_row("https://shop.example.net/cart", None),
+    # "cart" ends the URL and starts the title, but no single column has "cart\ncart"
+    history_row("https://example.com/cart", "Cart contents"),
+    history_row("https://ÉCOLE.example.fr/", "École"),
+]
+
+QUERIES = ["news", "NEWS", "example", "café", "CAFÉ", "straße", "cart", "cart\ncart", "t\nc", "école", "É", "ée", "/", "xyz"]
+
+
+def connect_without_fts(*args, **kwargs):
+    # An SQLite build without FTS5 rejects the virtual table
+    conn = CONNECT(*args, **kwargs)
+
+    class Connection:
+        def execute(self, sql, *parameters):
+            if "fts5" in sql:
+                raise sqlite3.OperationalError("no such module: fts5")
+            return conn.execute(sql, *parameters)
+
+        def __getattr__(self, name):
+            return getattr(conn, name)
+
+        def __enter__(self):
+            return conn.__enter__()
+
+        def __exit__(self, *exc_info):
+            return conn.__exit__(*exc_info)
+
+    return Connection()
+
+
+class SearchIndexTest(unittest.TestCase):
+
+    def build(self, fts=True):
+        if fts:
+            index = SearchIndex("history", HEADERS)
+        else:
+            with mock.patch("modules.search.sqlite3.connect", connect_without_fts):
+                index = SearchIndex("history", HEADERS)
+        self.addCleanup(index.close)
+        self.assertEqual(index.fts, fts)
+        index.add_rows(ROWS[:2])
+        index.add_rows(ROWS[2:])
+        return index
+
+    def expected(self, query):
+        return [position for position, row in enumerate(ROWS) if list(filter_rows([row], "history", HEADERS, query))]
+
+    def test_matches_filter_rows(self):
+        for fts in (True, False):
+            index = self.build(fts)
+            for query in QUERIES:
+                with self.subTest(fts=fts, query=query):
+                    self.assertEqual(index.search(query), self.expected(query))
+            self.assertIsNone(index.search(""))
+
+    def test_queries_stay_within_a_column(self):
+        for fts in (True, False):
+            with self.subTest(fts=fts):
+                index = self.build(fts)
+                self.assertEqual(index.search("cart\ncart"), [])
+                self.assertEqual(index.search("cart"), [2, 3])
+                self.assertEqual(index.search("CAFÉ"), [1])
+                self.assertEqual(index.search("école"), [4])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,254 @@
+import asyncio
+import http.client
+import io
+import json
+import os
+import shutil
+import socket
+import tarfile
+import tempfile
+import threading
+import time
+import unittest
+import zipfile
+from unittest import mock
+
+from benchmarks.synthetic_profiles import generate
+from cli import process_root
+from modules import service
+from modules.service import ExtractionService, extract_archive
+
+
+class ServiceThread:
+    """
+    Runs an ExtractionService on a free localhost port in a background thread.
+    """
+
+    def __init__(self, **options):
+        self.service = ExtractionService(**options)
+        self.address = None
+        ready = threading.Event()
+
+        def ready_callback(address):
+            self.address = address
+            ready.set()
+
+        def run():
+            self.loop = asyncio.new_event_loop()
+            self.task = self.loop.create_task(self.service.serve("127.0.0.1", 0, ready_callback))
+            try:
+                self.loop.run_until_complete(self.task)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        if not ready.wait(10):
+            raise RuntimeError("Service did not start")
+
+    def request(self, method, path, body=None, headers=None):
+        connection = http.client.HTTPConnection(*self.address, timeout=60)
+        connection.request(method, path, body=body, headers=headers or {})
+        return connection.getresponse()
+
+    def health(self):
+        return json.loads(self.request("GET", "/health").read())
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.task.cancel)
+        self.thread.join(10)
+
+
+def zip_folder(folder):
+    data = io.BytesIO()
+    with zipfile.ZipFile(data, "w", zipfile.ZIP_DEFLATED) as archive:
+        for parent, _, names in os.walk(folder):
+            for name in names:
+                path = os.path.join(parent, name)
+                archive.write(path, os.path.relpath(path, folder))
+    return data.getvalue()
+
+
+def tar_with(member, data=b""):
+    archive_data = io.BytesIO()
+    with tarfile.open(fileobj=archive_data, mode="w") as archive:
+        archive.addfile(member, io.BytesIO(data))
+    return archive_data.getvalue()
+
+
+def read_ndjson(response):
+    return [json.loads(line) for line in response]
+
+
+class ServiceTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        cls.root = os.path.join(cls.folder, "root")
+        generate(cls.root, visits=300, profiles=1, firefox_profiles=1, cache_files=20)
+        cls.archive = zip_folder(cls.root)
+        output_folder = os.path.join(cls.folder, "output")
+        os.makedirs(output_folder)
+        cls.expected_rows = process_root(cls.root, output_folder, "csv")
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def start(self, **options):
+        server = ServiceThread(work_folder=self.folder, **options)
+        self.addCleanup(server.stop)
+        return server
+
+    def test_streams_ndjson(self):
+        server = self.start()
+        response = server.request("POST", "/extract", self.archive)
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader("Content-Type"), "application/x-ndjson")
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        lines = read_ndjson(response)
+
+        self.assertEqual([line["event"] for line in lines[:2]], ["queued", "started"])
+        self.assertEqual(lines[-1]["event"], "done")
+        rows = lines[2:-1]
+        counts = dict.fromkeys(self.expected_rows, 0)
+        for line in rows:
+            counts[line["dataset"]] += 1
+        self.assertEqual(counts, self.expected_rows)
+        self.assertEqual(lines[-1]["rows"], self.expected_rows)
+        self.assertIn("URL", rows[0]["row"])
+        self.assertEqual(server.health()["completed"], 1)
+
+    def test_extracts_on_job_threads(self):
+        server = self.start()
+        threads = []
+
+        def recording_extract(*args):
+            threads.append(threading.current_thread().name)
+            return extract_archive(*args)
+
+        with mock.patch.object(service, "extract_archive", recording_extract):
+            lines = read_ndjson(server.request("POST", "/extract", self.archive))
+        self.assertEqual(lines[-1]["event"], "done")
+        self.assertEqual(len(threads), 1)
+        self.assertTrue(threads[0].startswith("extract"), threads[0])
+
+    def test_filters_from_query(self):
+        server = self.start()
+        lines = read_ndjson(server.request("POST", "/extract?host=example.com&visit_type=Link", self.archive))
+        history = [line["row"] for line in lines if line.get("dataset") == "history"]
+        self.assertTrue(history)
+        self.assertLess(len(history), self.expected_rows["history"])
+        self.assertTrue(all(row["Visit Type"] == "Link" and "example.com/" in row["URL"] for row in history))
+
+        response = server.request("POST", "/extract?visit_type=Bogus", self.archive)
+        self.assertEqual(response.status, 400)
+
+    def test_refuses_uploads_past_the_limit(self):
+        server = self.start(jobs=1, max_pending=0)
+        # Headers without the body take the only slot until the body arrives
+        held = socket.create_connection(server.address)
+        self.addCleanup(held.close)
+        held.sendall(f"POST /extract HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(self.archive)}\r\n\r\n".encode("ascii"))
+        deadline = time.monotonic() + 10
+        while server.health()["waiting"] < 1:
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+        response = server.request("POST", "/extract", self.archive)
+        self.assertEqual(response.status, 503)
+        self.assertEqual(response.getheader("Retry-After"), "5")
+        self.assertIn("error", json.loads(response.read()))
+
+        # Once the held upload finishes, the slot is free again
+        held.sendall(self.archive)
+        with held.makefile("rb") as f:
+            self.assertIn(b" 200 ", f.readline())
+            self.assertTrue(f.read().rstrip().endswith(b"0"))
+        lines = read_ndjson(server.request("POST", "/extract", self.archive))
+        self.assertEqual(lines[-1]["event"], "done")
+
+    def test_rejects_bad_archives(self):
+        server = self.start(max_upload_bytes=len(self.archive), max_extract_bytes=10 * 1024 * 1024)
+
+        # Corrupt compressed data behind a valid zip directory
+        corrupt = bytearray(self.archive)
+        with zipfile.ZipFile(io.BytesIO(self.archive)) as archive:
+            member = max(archive.infolist(), key=lambda info: info.compress_size)
+        start = member.header_offset + 30 + len(member.filename.encode("utf-8")) + len(member.extra)
+        corrupt[start:start + 64] = bytes(64)
+
+        link = tarfile.TarInfo("History")
+        link.type = tarfile.SYMTYPE
+        link.linkname = "/etc/passwd"
+        escape = tarfile.TarInfo("../escape.txt")
+        escape.size = 1
+        bomb = io.BytesIO()
+        with zipfile.ZipFile(bomb, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("History", bytes(11 * 1024 * 1024))
+
+        cases = {
+            "not an archive": (b"plain text upload", 400),
+            "corrupt zip": (bytes(corrupt), 400),
+            "truncated tar.gz": (b"\x1f\x8b\x08\x00" + bytes(60), 400),
+            "symlink": (tar_with(link), 400),
+            "path traversal": (tar_with(escape, b"x"), 400),
+            "unpacks too large": (bomb.getvalue(), 413),
+            "upload too large": (self.archive + b"\0", 413),
+        }
+        for name, (body, status) in cases.items():
+            with self.subTest(name):
+                response = server.request("POST", "/extract", body)
+                self.assertEqual(response.status, status)
+                self.assertIn("error", json.loads(response.read()))
+        self.assertFalse(os.path.exists(os.path.join(self.folder, "escape.txt")))
+
+        connection = socket.create_connection(server.address)
+        with connection, connection.makefile("rb") as f:
+            connection.sendall(b"POST /extract HTTP/1.1\r\nHost: localhost\r\n\r\n")
+            self.assertIn(b" 411 ", f.readline())
+
+        # The service is still healthy after every rejection
+        self.assertEqual(server.health(), {"running": 0, "waiting": 0, "completed": 0, "jobs": 2, "max_pending": 8})
+
+
+
+class ExtractArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+        self.addCleanup(shutil.rmtree, self.folder, ignore_errors=True)
+
+    def extract(self, archive_data):
+        archive_file = os.path.join(self.folder, "upload")
+        with open(archive_file, "wb") as f:
+            f.write(archive_data)
+        destination = tempfile.mkdtemp(dir=self.folder)
+        extract_archive(archive_file, destination, 1024)
+        return destination
+
+    def test_drops_unsafe_modes(self):
+        member = tarfile.TarInfo("History")
+        member.size = 1
+        member.mode = 0o6777
+        archive_data = tar_with(member, b"x")
+
+        data_filter = getattr(tarfile, "data_filter", None)
+        try:
+            for filtered in (True, False):
+                # Without extraction filters, as before Python 3.12
+                if not filtered and data_filter is not None:
+                    del tarfile.data_filter
+                with self.subTest(filtered=filtered):
+                    mode = os.stat(os.path.join(self.extract(archive_data), "History")).st_mode
+                    self.assertFalse(mode & 0o6022, oct(mode))
+        finally:
+            if data_filter is not None:
+                tarfile.data_filter = data_filter
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from benchmarks.synthetic_profiles import generate
+from modules.disk_cache import iter_cache_entries
+from modules.parsing import find_browser_profile_files, database_files, iter_artifacts
+from modules.timeline import TimelineBuilder
+
+
+class TimelineTest(unittest.TestCase):
+    """
+    A timeline sorted in runs spilled to disk must come out exactly as one sorted
+    in memory.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.folder = tempfile.mkdtemp(prefix="bft-test-")
+        root = os.path.join(cls.folder, "root")
+        generate(root, visits=300, profiles=2, firefox_profiles=1, cache_files=40)
+        profile_files = find_browser_profile_files(root)
+        cls.batches = list(iter_artifacts(None, database_files(profile_files), None))
+        cls.batches += [("cache", rows) for rows in iter_cache_entries(profile_files["cache"], None, None)]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.folder, ignore_errors=True)
+
+    def timeline(self, run_size):
+        with TimelineBuilder(run_size, self.folder) as builder:
+            for dataset, rows in self.batches:
+                builder.add_rows(dataset, rows)
+            return list(builder), len(builder.runs)
+
+    def test_spilled_runs_match_memory(self):
+        in_memory, runs = self.timeline(10 ** 6)
+        self.assertEqual(runs, 0)
+        self.assertEqual(len({event[2] for event in in_memory}), 5)
+        times = [event[0] for event in in_memory]
+        self.assertEqual(times, sorted(times))
+
+        for run_size in (1, 97, 1000):
+            with self.subTest(run_size=run_size):
+                spilled, runs = self.timeline(run_size)
+                self.assertGreater(runs, 0)
+                self.assertEqual(spilled, in_memory)
+
+    def test_formatted_rows_match_tables(self):
+        with TimelineBuilder() as builder:
+            for dataset, rows in self.batches:
+                builder.add_rows(dataset, list(rows))
+            formatted = list(builder)
+        self.assertEqual(formatted, self.timeline(10 ** 6)[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
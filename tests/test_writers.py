@@ -0,0 +1,142 @@
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import timezone
+
+from modules.casedb import column_name
+from modules.parsing import ARTIFACT_HEADERS
+from modules.records import RecordTable
+from modules.writers import WRITERS, OUTPUT_FORMATS, open_writer, load_writer
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+HEADERS = ARTIFACT_HEADERS["history"]
+
+
+def history_row(visit_time, url, title, visit_count, duration):
+    values = {header: None for header in HEADERS}
+    values.update({
+        "Visit Time": visit_time, "URL": url, "Title": title, "Visit Count": visit_count, "Visit Type": "Link",
+        "Duration": duration, "Browser": "Chrome", "User Profile": "alice/Default", "Source": "/case/History",
+    })
+    return [values[header] for header in HEADERS]
+
+
+# Rows as extracted, with text that needs quoting or escaping in some format
+ROWS = RecordTable.from_rows(HEADERS, [
+    history_row(1700000000, "https://example.com/?a=1&b=<2>", 'Quotes "and", commas', 3, 1.5),
+    history_row(1700000060, "https://example.org/ünïcode", "Straße\tund Café", 1, 0.25),
+    history_row(1700003600, "https://example.net/", "Line\nbreak", 12, 30.0),
+])
+
+
+def baseline_output(output_format, rows, output_file):
+    """
+    Writes rows the way output_data did before the streaming writers, building the
+    whole output at once.
+    """
+    if output_format == "csv":
+        with open(output_file, mode="w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADERS)
+            writer.writerows(rows)
+    elif output_format == "json":
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump([dict(zip(HEADERS, row)) for row in rows], f, ensure_ascii=False, indent=4)
+    elif output_format == "html":
+        # Cells as text: the streaming writer formats each value on its own
+        # rather than with a format inferred for the whole column
+        pandas.DataFrame([[str(value) for value in row] for row in rows], columns=HEADERS).to_html(output_file, index=False)
+    elif output_format == "txt":
+        with open(output_file, "w", encoding="utf-8") as f:
+            f.write("\t".join(HEADERS) + "\n")
+            for row in rows:
+                f.write("\t".join(map(str, row)) + "\n")
+
+
+def read_back(output_format, output_file):
+    """
+    Returns the rows stored by a columnar or database format, with timestamps
+    formatted as the text formats write them.
+    """
+    if output_format == "sqlite":
+        conn = sqlite3.connect(output_file)
+        try:
+            columns = ", ".join(f'"{column_name(header)}"' for header in HEADERS)
+            return [list(row) for row in conn.execute(f"SELECT {columns} FROM history ORDER BY id")]
+        finally:
+            conn.close()
+    if output_format == "parquet":
+        table = pyarrow.parquet.read_table(output_file)
+    else:
+        with pyarrow.ipc.open_file(output_file) as reader:
+            table = reader.read_all()
+    rows = [list(row.values()) for row in table.to_pylist()]
+    for row in rows:
+        row[0] = row[0].astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    return rows
+
+
+class WriterRegistryTest(unittest.TestCase):
+    """
+    Every format of the lazy WRITERS registry writes what output_data wrote before
+    the writers were moved behind it.
+    """
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp(prefix="bft-test-")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder, ignore_errors=True)
+
+    def write(self, output_format):
+        output_file = os.path.join(self.folder, f"history.{output_format}")
+        with open_writer(output_format, HEADERS, output_file, "history") as writer:
+            # In several batches, as a RecordTable and as formatted rows
+            writer.write_rows(ROWS.take([0]))
+            writer.write_rows(list(ROWS)[1:])
+        return output_file
+
+    def test_every_format_is_registered(self):
+        self.assertEqual(set(WRITERS), set(OUTPUT_FORMATS))
+        for output_format in ("csv", "json", "html", "txt", "sqlite"):
+            self.assertEqual(load_writer(output_format).__name__, WRITERS[output_format][1])
+        with self.assertRaises(ValueError):
+            load_writer("xlsx")
+
+    def test_text_formats_match_baseline(self):
+        formatted = list(ROWS)
+        for output_format in ("csv", "json", "html", "txt"):
+            with self.subTest(output_format=output_format):
+                if output_format == "html" and pandas is None:
+                    self.skipTest("pandas is not installed")
+                expected_file = os.path.join(self.folder, f"expected.{output_format}")
+                baseline_output(output_format, formatted, expected_file)
+                with open(self.write(output_format), "rb") as f, open(expected_file, "rb") as expected:
+                    self.assertEqual(f.read().decode("utf-8"), expected.read().decode("utf-8"))
+
+    def test_stored_formats_match_baseline(self):
+        formatted = list(ROWS)
+        for output_format in ("sqlite", "parquet", "arrow"):
+            with self.subTest(output_format=output_format):
+                if output_format != "sqlite" and pyarrow is None:
+                    self.skipTest("pyarrow is not installed")
+                self.assertEqual(read_back(output_format, self.write(output_format)), formatted)
+
+
+if __name__ == "__main__":
+    unittest.main()